@@ -1,1288 +1,2558 @@
-from flask import Flask, jsonify, request, send_file
-from flask_cors import CORS
-import mysql.connector
-from mysql.connector import Error
-import datetime
-from fpdf import FPDF
-import os
-import json
-
-app = Flask(__name__)
-
-# Configuration CORS plus permissive
-CORS(app, resources={
-    r"/*": {
-        "origins": ["http://localhost:3000", "http://localhost:5173"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
-
-# Ajoutez ceci pour gérer les requêtes OPTIONS (pré-vol)
-# @app.after_request
-# def after_request(response):
-#     response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
-#     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-#     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-#     response.headers.add('Access-Control-Allow-Credentials', 'true')
-#     return response
-
-# Configuration pour XAMPP
-db_config = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'restaurant_db',
-    'port': 3306
-}
-
-def create_db_connection():
-    try:
-        return mysql.connector.connect(**db_config)
-    except Error as e:
-        print(f"Erreur de connexion MySQL: {e}")
-        return None
-
-# ===== TABLES =====
-@app.route('/tables', methods=['GET', 'POST'])
-def handle_tables():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            cursor.execute("SELECT * FROM restaurant_tables")
-            tables = cursor.fetchall()
-            
-            # Ajout du statut de réservation
-            for table in tables:
-                cursor.execute("""
-                    SELECT COUNT(*) as reservations 
-                    FROM reserver 
-                    WHERE idtable = %s 
-                    AND date_de_reserv <= NOW() 
-                    AND date_reserve >= NOW()
-                """, (table['idtable'],))
-                table['reservations'] = cursor.fetchone()['reservations']
-            
-            return jsonify(tables)
-
-        elif request.method == 'POST':
-            data = request.json
-            cursor.execute(
-                "INSERT INTO restaurant_tables (idtable, designation, occupation) VALUES (%s, %s, %s)",
-                (data['idtable'], data['designation'], data.get('occupation', False))
-            )
-            conn.commit()
-            return jsonify({'message': 'Table créée'}), 201
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/tables/<idtable>', methods=['GET', 'PUT', 'DELETE'])
-def manage_table(idtable):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            cursor.execute("SELECT * FROM restaurant_tables WHERE idtable = %s", (idtable,))
-            table = cursor.fetchone()
-            if not table:
-                return jsonify({'error': 'Table non trouvée'}), 404
-            
-            # Vérification des réservations
-            cursor.execute("""
-                SELECT * FROM reserver
-                WHERE idtable = %s
-                AND date_de_reserv <= NOW() 
-                AND date_reserve >= NOW()
-            """, (idtable,))
-            table['reservations'] = cursor.fetchall()
-            
-            return jsonify(table)
-            
-        elif request.method == 'PUT':
-            data = request.json
-            cursor.execute(
-                "UPDATE restaurant_tables SET designation = %s, occupation = %s WHERE idtable = %s",
-                (data['designation'], data.get('occupation', False), idtable)
-            )
-            
-            if cursor.rowcount == 0:
-                return jsonify({'error': 'Table non trouvée'}), 404
-                
-            conn.commit()
-            return jsonify({'message': f'Table {idtable} mise à jour'})
-            
-        elif request.method == 'DELETE':
-            # Vérifier si la table existe
-            cursor.execute("SELECT idtable FROM restaurant_tables WHERE idtable = %s", (idtable,))
-            if not cursor.fetchone():
-                return jsonify({'error': 'Table non trouvée'}), 404
-            
-            # Vérifier si la table est utilisée dans des commandes ou réservations
-            cursor.execute("SELECT COUNT(*) as count FROM commande WHERE idtable = %s", (idtable,))
-            if cursor.fetchone()['count'] > 0:
-                return jsonify({'error': 'Impossible de supprimer: table référencée dans des commandes'}), 400
-                
-            cursor.execute("SELECT COUNT(*) as count FROM reserver WHERE idtable = %s", (idtable,))
-            if cursor.fetchone()['count'] > 0:
-                return jsonify({'error': 'Impossible de supprimer: table référencée dans des réservations'}), 400
-            
-            # Suppression
-            cursor.execute("DELETE FROM restaurant_tables WHERE idtable = %s", (idtable,))
-            conn.commit()
-            return jsonify({'message': f'Table {idtable} supprimée'}), 200
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/tables/liberer/<idtable>', methods=['PUT'])
-def liberer_table(idtable):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        # Vérifier si la table existe
-        cursor.execute("SELECT occupation FROM restaurant_tables WHERE idtable = %s", (idtable,))
-        table = cursor.fetchone()
-        if not table:
-            return jsonify({'error': 'Table non trouvée'}), 404
-            
-        # Libérer la table
-        cursor.execute("UPDATE restaurant_tables SET occupation = FALSE WHERE idtable = %s", (idtable,))
-        conn.commit()
-        
-        return jsonify({'message': f'Table {idtable} libérée'}), 200
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# ===== MENU =====
-@app.route('/menu', methods=['GET', 'POST'])
-def handle_menu():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            search = request.args.get('search', '')
-            if search:
-                cursor.execute("SELECT * FROM menu WHERE nomplat LIKE %s", (f'%{search}%',))
-            else:
-                cursor.execute("SELECT * FROM menu")
-            return jsonify(cursor.fetchall())
-
-        elif request.method == 'POST':
-            data = request.json
-            cursor.execute(
-                "INSERT INTO menu (idplat, nomplat, pu) VALUES (%s, %s, %s)",
-                (data['idplat'], data['nomplat'], data['pu'])
-            )
-            conn.commit()
-            return jsonify({'message': 'Plat ajouté au menu'}), 201
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/menu/<idplat>', methods=['GET', 'PUT', 'DELETE'])
-def manage_menu(idplat):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            cursor.execute("SELECT * FROM menu WHERE idplat = %s", (idplat,))
-            plat = cursor.fetchone()
-            if not plat:
-                return jsonify({'error': 'Plat non trouvé'}), 404
-            return jsonify(plat)
-            
-        elif request.method == 'PUT':
-            data = request.json
-            cursor.execute(
-                "UPDATE menu SET nomplat = %s, pu = %s WHERE idplat = %s",
-                (data['nomplat'], data['pu'], idplat)
-            )
-            
-            if cursor.rowcount == 0:
-                return jsonify({'error': 'Plat non trouvé'}), 404
-                
-            conn.commit()
-            return jsonify({'message': f'Plat {idplat} mis à jour'})
-            
-        elif request.method == 'DELETE':
-            # Vérifier si le plat existe
-            cursor.execute("SELECT idplat FROM menu WHERE idplat = %s", (idplat,))
-            if not cursor.fetchone():
-                return jsonify({'error': 'Plat non trouvé'}), 404
-            
-            # Vérifier si le plat est utilisé dans des commandes
-            cursor.execute("SELECT COUNT(*) as count FROM commande_plats WHERE idplat = %s", (idplat,))
-            if cursor.fetchone()['count'] > 0:
-                return jsonify({'error': 'Impossible de supprimer: plat référencé dans des commandes'}), 400
-            
-            # Suppression
-            cursor.execute("DELETE FROM menu WHERE idplat = %s", (idplat,))
-            conn.commit()
-            return jsonify({'message': f'Plat {idplat} supprimé'}), 200
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# ===== COMMANDES =====
-@app.route('/commandes', methods=['GET', 'POST'])
-def handle_commandes():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            # Filtres par dates
-            date_debut = request.args.get('date_debut')
-            date_fin = request.args.get('date_fin')
-            
-            sql = """
-                SELECT c.*, t.designation as table_designation
-                FROM commande c
-                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
-            """
-            params = []
-            
-            # Ajout des filtres de date
-            if date_debut and date_fin:
-                sql += " WHERE c.datecom BETWEEN %s AND %s"
-                params.extend([date_debut, date_fin])
-            elif date_debut:
-                sql += " WHERE c.datecom = %s"
-                params.append(date_debut)
-                
-            sql += " ORDER BY c.datecom DESC"
-            
-            cursor.execute(sql, params)
-            commandes = cursor.fetchall()
-
-            for commande in commandes:
-                cursor.execute("""
-                    SELECT cp.idplat, m.nomplat, cp.quantite, cp.prix_unitaire
-                    FROM commande_plats cp
-                    JOIN menu m ON cp.idplat = m.idplat
-                    WHERE cp.idcom = %s
-                """, (commande['idcom'],))
-                commande['plats'] = cursor.fetchall()
-
-            return jsonify(commandes)
-
-        elif request.method == 'POST':
-            data = request.json
-            required = ['idcom', 'nomcli', 'typecom', 'plats']
-            if not all(field in data for field in required):
-                return jsonify({'error': 'Champs manquants'}), 400
-
-            # Vérification de la table pour les commandes sur place
-            if data['typecom'] == 'sur place':
-                if 'idtable' not in data:
-                    return jsonify({'error': 'Table requise pour commande sur place'}), 400
-                
-                # Vérifier si la table est disponible
-                cursor.execute("SELECT occupation FROM restaurant_tables WHERE idtable = %s", (data['idtable'],))
-                table = cursor.fetchone()
-                if not table:
-                    return jsonify({'error': 'Table introuvable'}), 404
-                if table['occupation']:
-                    return jsonify({'error': 'Table déjà occupée'}), 400
-                
-                # Vérifier si la table est réservée
-                cursor.execute("""
-                    SELECT COUNT(*) as reserved
-                    FROM reserver
-                    WHERE idtable = %s
-                    AND NOW() BETWEEN date_de_reserv AND date_reserve
-                    AND nomcli != %s
-                """, (data['idtable'], data['nomcli']))
-                
-                if cursor.fetchone()['reserved'] > 0:
-                    return jsonify({'error': 'Table réservée par un autre client'}), 400
-
-            # Calcul du montant total
-            montant_total = 0
-            for plat in data['plats']:
-                cursor.execute("SELECT pu FROM menu WHERE idplat = %s", (plat['idplat'],))
-                prix = cursor.fetchone()
-                if not prix:
-                    return jsonify({'error': f'Plat {plat["idplat"]} introuvable'}), 404
-                montant_total += prix['pu'] * plat.get('quantite', 1)
-
-            # Création de la commande
-            cursor.execute("""
-                INSERT INTO commande 
-                (idcom, nomcli, typecom, idtable, datecom, statut, montant_total)
-                VALUES (%s, %s, %s, %s, %s, 'en attente', %s)
-            """, (
-                data['idcom'],
-                data['nomcli'],
-                data['typecom'],
-                data.get('idtable'),
-                data.get('datecom', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                montant_total
-            ))
-
-            # Ajout des plats
-            for plat in data['plats']:
-                cursor.execute("""
-                    INSERT INTO commande_plats 
-                    (idcom, idplat, quantite, prix_unitaire)
-                    VALUES (%s, %s, %s, (SELECT pu FROM menu WHERE idplat = %s))
-                """, (
-                    data['idcom'],
-                    plat['idplat'],
-                    plat.get('quantite', 1),
-                    plat['idplat']
-                ))
-
-            # Mise à jour de l'occupation de la table
-            if data['typecom'] == 'sur place' and data.get('idtable'):
-                cursor.execute("""
-                    UPDATE restaurant_tables 
-                    SET occupation = TRUE 
-                    WHERE idtable = %s
-                """, (data['idtable'],))
-
-            conn.commit()
-            return jsonify({'message': 'Commande créée avec succès'}), 201
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/commandes/<idcom>', methods=['GET', 'PUT', 'DELETE'])
-def manage_commande(idcom):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            cursor.execute("""
-                SELECT c.*, t.designation as table_designation
-                FROM commande c
-                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
-                WHERE c.idcom = %s
-            """, (idcom,))
-            
-            commande = cursor.fetchone()
-            if not commande:
-                return jsonify({'error': 'Commande non trouvée'}), 404
-                
-            cursor.execute("""
-                SELECT cp.idplat, m.nomplat, cp.quantite, cp.prix_unitaire
-                FROM commande_plats cp
-                JOIN menu m ON cp.idplat = m.idplat
-                WHERE cp.idcom = %s
-            """, (idcom,))
-            commande['plats'] = cursor.fetchall()
-            
-            return jsonify(commande)
-            
-        elif request.method == 'PUT':
-            data = request.json
-            
-            # Récupérer l'ancienne commande pour vérifier si elle avait une table
-            cursor.execute("SELECT idtable, typecom FROM commande WHERE idcom = %s", (idcom,))
-            old_commande = cursor.fetchone()
-            if not old_commande:
-                return jsonify({'error': 'Commande non trouvée'}), 404
-            
-            # Mise à jour de la commande
-            cursor.execute("""
-                UPDATE commande
-                SET nomcli = %s, typecom = %s, idtable = %s, statut = %s
-                WHERE idcom = %s
-            """, (
-                data['nomcli'],
-                data['typecom'],
-                data.get('idtable'),
-                data.get('statut', 'en attente'),
-                idcom
-            ))
-            
-            # Si la commande change de statut à "terminé", libérer la table
-            if data.get('statut') == 'terminé' and old_commande['idtable']:
-                cursor.execute("""
-                    UPDATE restaurant_tables
-                    SET occupation = FALSE
-                    WHERE idtable = %s
-                """, (old_commande['idtable'],))
-            
-            # Si la commande change de table ou passe de emporter à sur place
-            if data['typecom'] == 'sur place' and data.get('idtable') != old_commande['idtable']:
-                # Libérer l'ancienne table si elle existe
-                if old_commande['idtable'] and old_commande['typecom'] == 'sur place':
-                    cursor.execute("""
-                        UPDATE restaurant_tables
-                        SET occupation = FALSE
-                        WHERE idtable = %s
-                    """, (old_commande['idtable'],))
-                
-                # Occuper la nouvelle table
-                if data.get('idtable'):
-                    cursor.execute("""
-                        UPDATE restaurant_tables
-                        SET occupation = TRUE
-                        WHERE idtable = %s
-                    """, (data['idtable'],))
-            
-            conn.commit()
-            return jsonify({'message': f'Commande {idcom} mise à jour'}), 200
-            
-        elif request.method == 'DELETE':
-            # Vérifier si la commande existe
-            cursor.execute("SELECT idtable, typecom FROM commande WHERE idcom = %s", (idcom,))
-            commande = cursor.fetchone()
-            if not commande:
-                return jsonify({'error': 'Commande non trouvée'}), 404
-            
-            # Libérer la table si c'est une commande sur place
-            if commande['idtable'] and commande['typecom'] == 'sur place':
-                cursor.execute("""
-                    UPDATE restaurant_tables
-                    SET occupation = FALSE
-                    WHERE idtable = %s
-                """, (commande['idtable'],))
-            
-            # Supprimer les plats de la commande
-            cursor.execute("DELETE FROM commande_plats WHERE idcom = %s", (idcom,))
-            
-            # Supprimer la commande
-            cursor.execute("DELETE FROM commande WHERE idcom = %s", (idcom,))
-            
-            conn.commit()
-            return jsonify({'message': f'Commande {idcom} supprimée'}), 200
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/commandes/client/<nomcli>', methods=['GET'])
-def get_commandes_client(nomcli):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        # Recherche exacte ou partielle selon le paramètre
-        search_type = request.args.get('search_type', 'exact')
-        
-        if search_type == 'partial':
-            cursor.execute("""
-                SELECT c.*, t.designation as table_designation
-                FROM commande c
-                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
-                WHERE c.nomcli LIKE %s
-                ORDER BY c.datecom DESC
-            """, (f'%{nomcli}%',))
-        else:
-            cursor.execute("""
-                SELECT c.*, t.designation as table_designation
-                FROM commande c
-                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
-                WHERE c.nomcli = %s
-                ORDER BY c.datecom DESC
-            """, (nomcli,))
-            
-        commandes = cursor.fetchall()
-
-        for commande in commandes:
-            cursor.execute("""
-                SELECT cp.idplat, m.nomplat, cp.quantite, cp.prix_unitaire
-                FROM commande_plats cp
-                JOIN menu m ON cp.idplat = m.idplat
-                WHERE cp.idcom = %s
-            """, (commande['idcom'],))
-            commande['plats'] = cursor.fetchall()
-
-        return jsonify(commandes)
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# Route pour lister les clients pour une date donnée ou entre deux dates
-@app.route('/clients', methods=['GET'])
-def get_clients():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        date_debut = request.args.get('date_debut')
-        date_fin = request.args.get('date_fin')
-        
-        sql = """
-            SELECT DISTINCT nomcli, MAX(datecom) as derniere_visite, COUNT(*) as nb_commandes
-            FROM commande
-        """
-        params = []
-        
-        # Ajout des filtres de date
-        if date_debut and date_fin:
-            sql += " WHERE datecom BETWEEN %s AND %s"
-            params.extend([date_debut, date_fin])
-        elif date_debut:
-            sql += " WHERE datecom = %s"
-            params.append(date_debut)
-            
-        sql += " GROUP BY nomcli ORDER BY derniere_visite DESC"
-        
-        cursor.execute(sql, params)
-        clients = cursor.fetchall()
-        
-        # Pour chaque client, ajouter le total dépensé
-        for client in clients:
-            cursor.execute("""
-                SELECT SUM(montant_total) as total_depense
-                FROM commande
-                WHERE nomcli = %s
-            """, (client['nomcli'],))
-            client['total_depense'] = cursor.fetchone()['total_depense'] or 0
-
-        return jsonify(clients)
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# Génération de facture PDF
-@app.route('/facture/<idcom>', methods=['GET'])
-def generate_facture(idcom):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        # Récupération de la commande
-        cursor.execute("""
-            SELECT c.*, t.designation 
-            FROM commande c
-            LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
-            WHERE c.idcom = %s
-        """, (idcom,))
-        commande = cursor.fetchone()
-        if not commande:
-            return jsonify({'error': 'Commande introuvable'}), 404
-
-        # Récupération des plats
-        cursor.execute("""
-            SELECT m.nomplat, cp.prix_unitaire, cp.quantite
-            FROM commande_plats cp
-            JOIN menu m ON cp.idplat = m.idplat
-            WHERE cp.idcom = %s
-        """, (idcom,))
-        plats = cursor.fetchall()
-
-        # Création du PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        # En-tête
-        pdf.cell(200, 10, txt="MONJA - Resto", ln=1, align='C')
-        pdf.cell(200, 10, txt=f"Code Commande : {commande['idcom']}", ln=1, align='C')
-        pdf.cell(200, 10, txt=f"Nom du Client : {commande['nomcli']}", ln=1)
-        if commande['typecom'] == 'sur place':
-            pdf.cell(200, 10, txt=f"Table : {commande.get('designation', 'Non assignée')}", ln=1)
-        else:
-            pdf.cell(200, 10, txt="À emporter", ln=1)
-        pdf.cell(200, 10, txt=f"Date : {commande['datecom'].strftime('%d/%m/%Y %H:%M') if isinstance(commande['datecom'], datetime.datetime) else commande['datecom']}", ln=1)
-        pdf.cell(200, 10, txt="Votre facture en détail", ln=1, align='C')
-        
-        # Tableau des plats
-        pdf.cell(60, 10, "Menu", 1)
-        pdf.cell(30, 10, "PU (Ar)", 1)
-        pdf.cell(30, 10, "Unité", 1)
-        pdf.cell(40, 10, "Total (Ar)", 1)
-        pdf.ln()
-        
-        total = 0
-        for plat in plats:
-            subtotal = plat['prix_unitaire'] * plat['quantite']
-            total += subtotal
-            
-            pdf.cell(60, 10, plat['nomplat'], 1)
-            pdf.cell(30, 10, f"{plat['prix_unitaire']:,}", 1, 0, 'R')
-            pdf.cell(30, 10, str(plat['quantite']), 1, 0, 'C')
-            pdf.cell(40, 10, f"{subtotal:,}", 1, 0, 'R')
-            pdf.ln()
-        
-        # Total
-        pdf.cell(120, 10, "TOTAL :", 1)
-        pdf.cell(40, 10, f"{total:,} Ariary", 1)
-
-        # Sauvegarde
-        if not os.path.exists('factures'):
-            os.makedirs('factures')
-        
-        filename = f"factures/facture_{idcom}.pdf"
-        pdf.output(filename)
-        
-        # Mise à jour du statut de la commande
-        cursor.execute("UPDATE commande SET statut = 'payé' WHERE idcom = %s", (idcom,))
-        
-        # Si la commande était sur table, libérer la table
-        if commande['idtable'] and commande['typecom'] == 'sur place':
-            cursor.execute("UPDATE restaurant_tables SET occupation = FALSE WHERE idtable = %s", (commande['idtable'],))
-        
-        conn.commit()
-        
-        # Renvoyer le fichier au lieu du JSON
-        if request.args.get('download', 'false').lower() == 'true':
-            return send_file(filename, as_attachment=True)
-        
-        return jsonify({
-            'message': 'Facture générée',
-            'filename': filename,
-            'total': total
-        })
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# ===== RÉSERVATIONS =====
-@app.route('/reservations', methods=['GET', 'POST'])
-def handle_reservations():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            date = request.args.get('date')
-            client = request.args.get('client')
-            
-            sql = """
-                SELECT r.*, t.designation 
-                FROM reserver r
-                JOIN restaurant_tables t ON r.idtable = t.idtable
-            """
-            params = []
-            
-            # Filtrage par date ou client
-            conditions = []
-            if date:
-                conditions.append("DATE(r.date_de_reserv) = %s")
-                params.append(date)
-            if client:
-                conditions.append("r.nomcli LIKE %s")
-                params.append(f"%{client}%")
-                
-            if conditions:
-                sql += " WHERE " + " AND ".join(conditions)
-                
-            sql += " ORDER BY r.date_de_reserv"
-            
-            cursor.execute(sql, params)
-            return jsonify(cursor.fetchall())
-
-        elif request.method == 'POST':
-            data = request.json
-            required = ['idreserv', 'idtable', 'date_de_reserv', 'nomcli']
-            if not all(field in data for field in required):
-                return jsonify({'error': 'Champs manquants'}), 400
-                
-            # Vérification que la table existe
-            cursor.execute("SELECT * FROM restaurant_tables WHERE idtable = %s", (data['idtable'],))
-            if not cursor.fetchone():
-                return jsonify({'error': 'Table introuvable'}), 404
-
-            # Date de fin de réservation (par défaut +2h si non fournie)
-            date_reserve = data.get('date_reserve')
-            if not date_reserve:
-                date_de_reserv = datetime.datetime.fromisoformat(data['date_de_reserv'].replace('Z', '+00:00'))
-                date_reserve = (date_de_reserv + datetime.timedelta(hours=2)).isoformat()
-
-            # Vérification des conflits de réservation
-            cursor.execute("""
-                SELECT COUNT(*) as conflicts 
-                FROM reserver 
-                WHERE idtable = %s AND (
-                    (%s BETWEEN date_de_reserv AND date_reserve) OR
-                    (%s BETWEEN date_de_reserv AND date_reserve) OR
-                    (date_de_reserv BETWEEN %s AND %s)
-                )
-                AND idreserv != %s
-            """, (
-                data['idtable'],
-                data['date_de_reserv'],
-                date_reserve,
-                data['date_de_reserv'],
-                date_reserve,
-                data.get('idreserv', '')  # Pour éviter les conflits lors de la mise à jour
-            ))
-            
-            if cursor.fetchone()['conflicts'] > 0:
-                return jsonify({'error': 'Conflit de réservation: la table est déjà réservée pour cette période'}), 400
-
-            # Création de la réservation
-            cursor.execute("""
-                INSERT INTO reserver 
-                (idreserv, idtable, date_de_reserv, date_reserve, nomcli)
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                idtable = VALUES(idtable),
-                date_de_reserv = VALUES(date_de_reserv),
-                date_reserve = VALUES(date_reserve),
-                nomcli = VALUES(nomcli)
-            """, (
-                data['idreserv'],
-                data['idtable'],
-                data['date_de_reserv'],
-                date_reserve,
-                data['nomcli']
-            ))
-
-            conn.commit()
-            return jsonify({'message': 'Réservation créée'}), 201
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/reservations/<idreserv>', methods=['GET', 'PUT', 'DELETE'])
-def manage_reservation(idreserv):
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        if request.method == 'GET':
-            cursor.execute("""
-                SELECT r.*, t.designation 
-                FROM reserver r
-                JOIN restaurant_tables t ON r.idtable = t.idtable
-                WHERE r.idreserv = %s
-            """, (idreserv,))
-            
-            reservation = cursor.fetchone()
-            if not reservation:
-                return jsonify({'error': 'Réservation non trouvée'}), 404
-                
-            return jsonify(reservation)
-            
-        elif request.method == 'PUT':
-            data = request.json
-            
-            # Vérifier si la réservation existe
-            cursor.execute("SELECT * FROM reserver WHERE idreserv = %s", (idreserv,))
-            if not cursor.fetchone():
-                return jsonify({'error': 'Réservation non trouvée'}), 404
-                
-            # Vérification que la table existe
-            if 'idtable' in data:
-                cursor.execute("SELECT * FROM restaurant_tables WHERE idtable = %s", (data['idtable'],))
-                if not cursor.fetchone():
-                    return jsonify({'error': 'Table introuvable'}), 404
-            
-            # Date de fin de réservation (par défaut +2h si non fournie)
-            date_de_reserv = data.get('date_de_reserv')
-            date_reserve = data.get('date_reserve')
-            
-            if date_de_reserv and not date_reserve:
-                try:
-                    date_obj = datetime.datetime.fromisoformat(date_de_reserv.replace('Z', '+00:00'))
-                except ValueError:
-                    return jsonify({'error': 'Format de date invalide'}), 400
-
-                date_reserve = (date_obj + datetime.timedelta(hours=2)).isoformat()
-            
-            # Vérification des conflits si les dates ou tables ont changé
-            if (date_de_reserv or date_reserve or 'idtable' in data):
-                # Récupérer les valeurs actuelles pour comparaison
-                cursor.execute("""
-                    SELECT idtable, date_de_reserv, date_reserve
-                    FROM reserver
-                    WHERE idreserv = %s
-                """, (idreserv,))
-                current = cursor.fetchone()
-                
-                # N'utiliser les nouvelles valeurs que si elles sont fournies
-                new_idtable = data.get('idtable', current['idtable'])
-                new_date_de_reserv = date_de_reserv or current['date_de_reserv'].isoformat() if isinstance(current['date_de_reserv'], datetime.datetime) else current['date_de_reserv']
-                new_date_reserve = date_reserve or current['date_reserve'].isoformat() if isinstance(current['date_reserve'], datetime.datetime) else current['date_reserve']
-                
-                # Vérifier les conflits uniquement si quelque chose a changé
-                if (new_idtable != current['idtable'] or 
-                    new_date_de_reserv != current['date_de_reserv'] or 
-                    new_date_reserve != current['date_reserve']):
-                    
-                    cursor.execute("""
-                        SELECT COUNT(*) as conflicts 
-                        FROM reserver 
-                        WHERE idtable = %s 
-                        AND (
-                            (%s BETWEEN date_de_reserv AND date_reserve) OR
-                            (%s BETWEEN date_de_reserv AND date_reserve) OR
-                            (date_de_reserv BETWEEN %s AND %s)
-                        )
-                        AND idreserv != %s
-                    """, (
-                        new_idtable,
-                        new_date_de_reserv,
-                        new_date_reserve,
-                        new_date_de_reserv,
-                        new_date_reserve,
-                        idreserv
-                    ))
-                    
-                    if cursor.fetchone()['conflicts'] > 0:
-                        return jsonify({'error': 'Conflit de réservation: la table est déjà réservée pour cette période'}), 400
-            
-            # Construction dynamique de la requête de mise à jour
-            update_fields = []
-            params = []
-            
-            if 'idtable' in data:
-                update_fields.append("idtable = %s")
-                params.append(data['idtable'])
-            
-            if date_de_reserv:
-                update_fields.append("date_de_reserv = %s")
-                params.append(date_de_reserv)
-            
-            if date_reserve:
-                update_fields.append("date_reserve = %s")
-                params.append(date_reserve)
-            
-            if 'nomcli' in data:
-                update_fields.append("nomcli = %s")
-                params.append(data['nomcli'])
-            
-            if not update_fields:
-                return jsonify({'message': 'Aucune modification effectuée'}), 200
-            
-            # Ajout de l'ID de réservation à la fin des paramètres
-            params.append(idreserv)
-            
-            # Exécution de la requête de mise à jour
-            cursor.execute(
-                f"UPDATE reserver SET {', '.join(update_fields)} WHERE idreserv = %s",
-                params
-            )
-            
-            conn.commit()
-            return jsonify({'message': f'Réservation {idreserv} mise à jour'})
-            
-        elif request.method == 'DELETE':
-            # Vérifier si la réservation existe
-            cursor.execute("SELECT * FROM reserver WHERE idreserv = %s", (idreserv,))
-            if not cursor.fetchone():
-                return jsonify({'error': 'Réservation non trouvée'}), 404
-            
-            # Suppression
-            cursor.execute("DELETE FROM reserver WHERE idreserv = %s", (idreserv,))
-            conn.commit()
-            return jsonify({'message': f'Réservation {idreserv} supprimée'}), 200
-
-    except Error as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# Route pour vérifier la disponibilité des tables pour une période donnée
-@app.route('/disponibilite-tables', methods=['GET'])
-def check_disponibilite():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        date_debut = request.args.get('date_debut')
-        date_fin = request.args.get('date_fin')
-        
-        if not date_debut:
-            return jsonify({'error': 'date_debut est requise'}), 400
-            
-        if not date_fin:
-            # Par défaut, fin = début + 2h
-            date_debut_obj = datetime.datetime.fromisoformat(date_debut.replace('Z', '+00:00'))
-            date_fin = (date_debut_obj + datetime.timedelta(hours=2)).isoformat()
-        
-        # Récupérer toutes les tables
-        cursor.execute("SELECT * FROM restaurant_tables")
-        tables = cursor.fetchall()
-        
-        # for table in tables:
-        #     # Vérifier si la table est occupée actuellement
-        #     cursor.execute("""
-        #         SELECT occupation FROM restaurant_tables
-        #         WHERE idtable = %s
-        #     """, (table['idtable'],))
-        #     table_status = cursor.fetchone()
-        #     table['est_occupee'] = table_status['occupation'] if table_status else False
-            
-        #     # Vérifier si la table a des réservations pour la période
-        #     cursor.execute("""
-        #         SELECT * FROM reserver
-        #         WHERE idtable = %s
-        #         AND (
-        #             (%s BETWEEN date_de_reserv AND date_reserve) OR
-        #             (%s BETWEEN date_de_reserv AND date_reserve) OR
-        #             (date_de_reserv BETWEEN %s AND %s)
-        #         )
-        #     """, (
-        #         table['idtable'],
-        #         date_debut,
-        #         date_fin,
-        #         date_debut,
-        #         date_fin
-        #     ))
-        #     reservations = cursor.fetchall()
-        #     table['reservations'] = reservations
-        #     table['est_disponible'] = not table['est_occupee'] and len(reservations) == 0
-
-        for table in tables:
-            # Vérifier s’il y a des réservations actives pour cette table à la date donnée
-            cursor.execute("""
-                SELECT COUNT(*) as nb_reservations FROM reserver
-                WHERE idtable = %s
-                AND (
-                    (%s BETWEEN date_de_reserv AND date_reserve)
-                    OR
-                    (%s BETWEEN date_de_reserv AND date_reserve)
-                    OR
-                    (date_de_reserv BETWEEN %s AND %s)
-                )
-            """, (
-                table['idtable'],
-                date_debut,
-                date_fin,
-                date_debut,
-                date_fin
-            ))
-            nb_reservations = cursor.fetchone()['nb_reservations']
-
-            # Statut estimé selon les réservations
-            est_occupee = nb_reservations > 0
-
-            # Mise à jour du champ occupation dans restaurant_tables
-            cursor.execute("""
-                UPDATE restaurant_tables
-                SET occupation = %s
-                WHERE idtable = %s
-            """, (est_occupee, table['idtable']))
-
-            # Ajouter les infos à la réponse JSON
-            table['est_occupee'] = est_occupee
-            table['est_disponible'] = not est_occupee
-
-
-        
-        return jsonify(tables)
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# ===== STATISTIQUES =====
-@app.route('/stats/recettes', methods=['GET'])
-def get_stats():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        # Recette totale
-        cursor.execute("""
-            SELECT SUM(cp.quantite * cp.prix_unitaire) as total
-            FROM commande c
-            JOIN commande_plats cp ON c.idcom = cp.idcom
-        """)
-        total = cursor.fetchone()['total'] or 0
-
-        # Recettes des 6 derniers mois
-        cursor.execute("""
-            SELECT 
-                DATE_FORMAT(c.datecom, '%Y-%m') as mois,
-                SUM(cp.quantite * cp.prix_unitaire) as montant
-            FROM commande c
-            JOIN commande_plats cp ON c.idcom = cp.idcom
-            WHERE c.datecom >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
-            GROUP BY DATE_FORMAT(c.datecom, '%Y-%m')
-            ORDER BY mois
-        """)
-        recettes_6mois = cursor.fetchall()
-
-        # Plats les plus vendus (déjà correct)
-        cursor.execute("""
-            SELECT 
-                m.idplat,
-                m.nomplat,
-                SUM(cp.quantite) as quantite,
-                SUM(cp.quantite * cp.prix_unitaire) as chiffre_affaires
-            FROM commande_plats cp
-            JOIN menu m ON cp.idplat = m.idplat
-            GROUP BY m.idplat, m.nomplat
-            ORDER BY quantite DESC
-            LIMIT 10
-        """)
-        top_plats = cursor.fetchall()
-
-        # Statistiques par type de commande
-        cursor.execute("""
-            SELECT 
-                c.typecom,
-                COUNT(*) as nombre,
-                SUM(cp.quantite * cp.prix_unitaire) as montant
-            FROM commande c
-            JOIN commande_plats cp ON c.idcom = cp.idcom
-            GROUP BY c.typecom
-        """)
-        stats_par_type = cursor.fetchall()
-
-        # Statistiques par jour de la semaine
-        cursor.execute("""
-            SELECT 
-                DAYNAME(c.datecom) as jour,
-                COUNT(*) as nombre,
-                SUM(cp.quantite * cp.prix_unitaire) as montant
-            FROM commande c
-            JOIN commande_plats cp ON c.idcom = cp.idcom
-            GROUP BY DAYNAME(c.datecom)
-            ORDER BY FIELD(DAYNAME(c.datecom), 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
-        """)
-        stats_par_jour = cursor.fetchall()
-
-        return jsonify({
-            'total': total,
-            'recettes_6mois': recettes_6mois,
-            'top_plats': top_plats,
-            'stats_par_type': stats_par_type,
-            'stats_par_jour': stats_par_jour
-        })
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/stats/histogramme', methods=['GET'])
-def get_histogramme():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        # Recettes par mois (6 derniers mois)
-        cursor.execute("""
-            SELECT 
-                DATE_FORMAT(c.datecom, '%Y-%m') as mois,
-                DATE_FORMAT(c.datecom, '%b %Y') as mois_format,
-                SUM(cp.quantite * cp.prix_unitaire) as montant
-            FROM commande c
-            JOIN commande_plats cp ON c.idcom = cp.idcom
-            WHERE c.datecom >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
-            GROUP BY mois, mois_format
-            ORDER BY mois
-        """)
-        recettes_mensuelles = cursor.fetchall()
-        
-        # S'assurer que tous les 6 derniers mois sont présents
-        date_actuelle = datetime.datetime.now()
-        mois_requis = []
-        
-        for i in range(5, -1, -1):
-            date_mois = date_actuelle - datetime.timedelta(days=30 * i)
-            mois_requis.append({
-                'mois': date_mois.strftime('%Y-%m'),
-                'mois_format': date_mois.strftime('%b %Y'),
-                'montant': 0
-            })
-        
-        # Fusionner avec les résultats réels
-        recettes_completes = []
-        mois_existants = [r['mois'] for r in recettes_mensuelles]
-        
-        for mois in mois_requis:
-            if mois['mois'] in mois_existants:
-                for recette in recettes_mensuelles:
-                    if recette['mois'] == mois['mois']:
-                        recettes_completes.append(recette)
-                        break
-            else:
-                recettes_completes.append(mois)
-
-        return jsonify(recettes_completes)
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# ===== RECHERCHE =====
-@app.route('/recherche/menu', methods=['GET'])
-def recherche_menu():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        terme = request.args.get('terme', '')
-        
-        if not terme:
-            return jsonify([])
-            
-        cursor.execute("""
-            SELECT * FROM menu
-            WHERE nomplat LIKE %s
-            ORDER BY nomplat
-        """, (f'%{terme}%',))
-        
-        resultats = cursor.fetchall()
-        
-        # Ajouter statistiques de vente pour chaque plat
-        for plat in resultats:
-            cursor.execute("""
-                SELECT SUM(quantite) as nb_ventes
-                FROM commande_plats
-                WHERE idplat = %s
-            """, (plat['idplat'],))
-            stats = cursor.fetchone()
-            plat['nb_ventes'] = stats['nb_ventes'] if stats and stats['nb_ventes'] else 0
-        
-        return jsonify(resultats)
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.route('/recherche/clients', methods=['GET'])
-def recherche_clients():
-    conn = create_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        terme = request.args.get('terme', '')
-        
-        if not terme:
-            return jsonify([])
-            
-        cursor.execute("""
-            SELECT DISTINCT nomcli,
-                COUNT(idcom) as nb_commandes,
-                MAX(datecom) as derniere_visite,
-                SUM(montant_total) as total_depense
-            FROM commande
-            WHERE nomcli LIKE %s
-            GROUP BY nomcli
-            ORDER BY derniere_visite DESC
-        """, (f'%{terme}%',))
-        
-        clients = cursor.fetchall()
-        
-        # Pour chaque client, récupérer ses réservations
-        for client in clients:
-            cursor.execute("""
-                SELECT COUNT(*) as nb_reservations
-                FROM reserver
-                WHERE nomcli = %s
-            """, (client['nomcli'],))
-            reservations = cursor.fetchone()
-            client['nb_reservations'] = reservations['nb_reservations'] if reservations else 0
-        
-        return jsonify(clients)
-
-    except Error as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-# Point d'entrée de l'application
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+from flask import Blueprint, Flask, current_app, has_request_context, jsonify, request, g, Response, stream_with_context, make_response
+from flask_cors import CORS
+from werkzeug.wsgi import wrap_file
+import click
+import mysql.connector
+from mysql.connector import Error
+import datetime
+import base64
+import os
+import json
+import threading
+import functools
+import hashlib
+import csv
+import io
+import zlib
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from db_pool import ConnectionPool, PoolTimeout
+from menu_cache import MenuCache
+from floor_state import FloorState
+from versions import DataVersions
+from clients import TRIS, ClientSearch, maj_clients, reconstruire_clients
+from ventes import GRANULARITES, derniers_mois, maj_ventes, nombre_periodes, reconstruire_ventes, serie_recettes
+from factures import FactureWorker, empreinte_facture, exporter_zip, total_facture
+from archive_factures import ArchiveFactures
+from imports import ENTITES, FORMATS, importer, lire_lignes
+from evenements import SUJETS, EventBus
+from cuisine import FileCuisine
+from fanout import LecturesParalleles, requete
+from metriques import EcritureInstantanes, Metriques, sql_requete
+from requetes_lentes import JournalRequetes
+
+routes = Blueprint('restaurant', __name__, cli_group=None)
+
+# Configuration par défaut, surchargée dans l'ordre par le fichier désigné par
+# RESTO_CONFIG (module Python), les variables d'environnement de même nom
+# puis le dictionnaire passé à create_app()
+CONFIG_DEFAUT = {
+    # Connexion MySQL (valeurs de XAMPP)
+    'DB_HOST': 'localhost',
+    'DB_USER': 'root',
+    'DB_PASSWORD': '',
+    'DB_NAME': 'restaurant_db',
+    'DB_PORT': 3306,
+
+    # Pool de connexions (par processus)
+    'DB_POOL_SIZE': 5,
+    'DB_POOL_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 5.0,
+    'DB_POOL_RECYCLE': 3600,
+    'DB_POOL_PRE_PING': True,
+
+    # Intervalles de contrôle des versions des caches
+    'MENU_CACHE_CHECK_INTERVAL': 2.0,
+    'FLOOR_STATE_CHECK_INTERVAL': 2.0,
+    'FLOOR_STATE_RECONCILE_INTERVAL': 60.0,
+    'DATA_VERSION_CHECK_INTERVAL': 2.0,
+    'CLIENT_SEARCH_CHECK_INTERVAL': 2.0,
+
+    # Flux d'événements (SSE)
+    'EVENTS_KEEPALIVE': 15.0,
+    'EVENTS_HISTORY': 1000,
+    'EVENTS_CLIENT_BUFFER': 100,
+
+    # Connexions longues simultanées par processus (flux SSE et attentes de la
+    # cuisine), à garder sous le nombre de threads : au-delà, réponse 503
+    'LONG_CONNECTIONS_MAX': 8,
+
+    # File de la cuisine
+    'CUISINE_POLL_TIMEOUT': 25.0,
+    'CUISINE_CHECK_INTERVAL': 2.0,
+    'CUISINE_HISTORY': 1000,
+
+    # Factures
+    'FACTURES_DIR': 'factures',
+    'FACTURE_DOWNLOAD_TIMEOUT': 30.0,
+    'FACTURES_PACK_MAX_MB': 256,
+    # Taille totale et âge maximal de l'archive (0 : sans limite), les plus anciennes évincées
+    'FACTURES_ARCHIVE_MAX_MB': 2048,
+    'FACTURES_ARCHIVE_MAX_AGE_DAYS': 0,
+    'FACTURE_WORKERS': 2,
+    'FACTURES_EXPORT_PROCESSES': 0,
+
+    # Import en masse
+    'IMPORT_BATCH_SIZE': 1000,
+
+    # Lectures indépendantes en parallèle (tableau de bord, factures) ; au plus
+    # DB_POOL_SIZE à la fois
+    'FANOUT_WORKERS': 8,
+    'FANOUT_TIMEOUT': 5.0,
+
+    # Chargement des caches du menu et de la salle au démarrage
+    'WARMUP': False,
+
+    # Métriques (GET /metrics) : dossier des instantanés partagés entre processus
+    'METRICS_DIR': '',
+    'METRICS_SNAPSHOT_INTERVAL': 1.0,
+
+    # Journal des requêtes lentes (une ligne JSON par requête, avec son plan)
+    'SLOW_QUERY_MS': 200.0,
+    'SLOW_QUERY_LOG': 'requetes_lentes.log',
+    'SLOW_QUERY_LOG_MAX_MB': 10,
+    'SLOW_QUERY_LOG_BACKUPS': 5,
+    'SLOW_QUERY_EXPLAIN_INTERVAL': 300.0,
+}
+
+def lire_config(app, config=None):
+    app.config.from_mapping(CONFIG_DEFAUT)
+    app.config.from_envvar('RESTO_CONFIG', silent=True)
+    for cle, defaut in CONFIG_DEFAUT.items():
+        valeur = os.environ.get(cle)
+        if valeur is None:
+            continue
+        if isinstance(defaut, bool):
+            app.config[cle] = valeur.lower() == 'true'
+        else:
+            app.config[cle] = type(defaut)(valeur)
+    app.config.update(config or {})
+
+# État du processus (caches, pools, files), créé par initialiser() ;
+# les routes y accèdent par ces variables de module
+db_config = pool_config = None
+menu_cache = floor_state = data_versions = client_search = None
+event_bus = file_cuisine = facture_archive = facture_worker = None
+metriques = journal_requetes = ecriture_instantanes = None
+connexions_longues = None
+EVENTS_KEEPALIVE = CUISINE_POLL_TIMEOUT = LONG_CONNECTIONS_MAX = None
+FACTURES_DIR = FACTURE_DOWNLOAD_TIMEOUT = FACTURES_EXPORT_PROCESSES = None
+IMPORT_BATCH_SIZE = FANOUT_WORKERS = FANOUT_TIMEOUT = None
+
+_export_executor = None
+_export_executor_lock = threading.Lock()
+
+_lectures = None
+_lectures_lock = threading.Lock()
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def initialiser(config):
+    global db_config, pool_config, menu_cache, floor_state, data_versions, client_search
+    global event_bus, file_cuisine, facture_archive, facture_worker, metriques, journal_requetes
+    global ecriture_instantanes, connexions_longues
+    global EVENTS_KEEPALIVE, CUISINE_POLL_TIMEOUT, LONG_CONNECTIONS_MAX, FACTURES_DIR, FACTURE_DOWNLOAD_TIMEOUT
+    global FACTURES_EXPORT_PROCESSES, IMPORT_BATCH_SIZE, FANOUT_WORKERS, FANOUT_TIMEOUT
+
+    db_config = {
+        'host': config['DB_HOST'],
+        'user': config['DB_USER'],
+        'password': config['DB_PASSWORD'],
+        'database': config['DB_NAME'],
+        'port': int(config['DB_PORT'])
+    }
+
+    # Paramètres du pool de connexions
+    pool_config = {
+        'size': int(config['DB_POOL_SIZE']),
+        'max_overflow': int(config['DB_POOL_MAX_OVERFLOW']),
+        'timeout': float(config['DB_POOL_TIMEOUT']),
+        'recycle': int(config['DB_POOL_RECYCLE']),
+        'pre_ping': bool(config['DB_POOL_PRE_PING'])
+    }
+
+    # Cache du menu partagé par les lectures /menu et le calcul des prix des commandes
+    menu_cache = MenuCache(check_interval=float(config['MENU_CACHE_CHECK_INTERVAL']))
+
+    # État de la salle (tables, occupation, réservations) servi par /tables
+    floor_state = FloorState(
+        check_interval=float(config['FLOOR_STATE_CHECK_INTERVAL']),
+        reconcile_interval=float(config['FLOOR_STATE_RECONCILE_INTERVAL'])
+    )
+
+    # Versions des données (ETag des routes de lecture)
+    data_versions = DataVersions(check_interval=float(config['DATA_VERSION_CHECK_INTERVAL']))
+
+    # Index de recherche des noms de clients
+    client_search = ClientSearch(check_interval=float(config['CLIENT_SEARCH_CHECK_INTERVAL']))
+
+    # Flux d'événements (SSE) des écrans de salle et de cuisine
+    EVENTS_KEEPALIVE = float(config['EVENTS_KEEPALIVE'])
+    event_bus = EventBus(
+        historique=int(config['EVENTS_HISTORY']),
+        taille_file=int(config['EVENTS_CLIENT_BUFFER'])
+    )
+
+    # Places pour les connexions longues : les autres requêtes gardent des threads libres
+    LONG_CONNECTIONS_MAX = int(config['LONG_CONNECTIONS_MAX'])
+    connexions_longues = threading.BoundedSemaphore(LONG_CONNECTIONS_MAX)
+
+    # File de la cuisine (GET /cuisine/queue en attente longue, au plus CUISINE_POLL_TIMEOUT secondes)
+    CUISINE_POLL_TIMEOUT = float(config['CUISINE_POLL_TIMEOUT'])
+    file_cuisine = FileCuisine(
+        check_interval=float(config['CUISINE_CHECK_INTERVAL']),
+        historique=int(config['CUISINE_HISTORY'])
+    )
+
+    # Rendu des factures PDF en arrière-plan, archivées par commande
+    FACTURES_DIR = os.path.abspath(config['FACTURES_DIR'])
+    FACTURE_DOWNLOAD_TIMEOUT = float(config['FACTURE_DOWNLOAD_TIMEOUT'])
+    facture_archive = ArchiveFactures(
+        os.path.join(FACTURES_DIR, 'archive'),
+        pack_max=int(config['FACTURES_PACK_MAX_MB']) * 1024 * 1024,
+        max_bytes=int(config['FACTURES_ARCHIVE_MAX_MB']) * 1024 * 1024,
+        max_age=float(config['FACTURES_ARCHIVE_MAX_AGE_DAYS']) * 86400
+    )
+    facture_worker = FactureWorker(facture_archive.put, workers=int(config['FACTURE_WORKERS']))
+
+    # Export groupé : rendu sur un pool de processus (un par cœur par défaut)
+    FACTURES_EXPORT_PROCESSES = int(config['FACTURES_EXPORT_PROCESSES']) or os.cpu_count()
+
+    # Nombre d'enregistrements écrits par transaction (un INSERT multi-lignes par lot)
+    IMPORT_BATCH_SIZE = int(config['IMPORT_BATCH_SIZE'])
+
+    # Durées par route, requêtes SQL et attente du pool (GET /metrics)
+    metriques = Metriques(dossier=os.path.abspath(config['METRICS_DIR']) if config['METRICS_DIR'] else None)
+
+    # Requêtes SQL par empreinte (GET /requetes/top) ; au-delà de SLOW_QUERY_MS,
+    # écrites dans SLOW_QUERY_LOG avec leur plan (EXPLAIN sur une autre connexion)
+    journal_requetes = JournalRequetes(
+        lambda: get_db_pool().acquire(),
+        seuil=float(config['SLOW_QUERY_MS']) / 1000,
+        fichier=os.path.abspath(config['SLOW_QUERY_LOG']) if config['SLOW_QUERY_LOG'] else None,
+        taille_max=int(config['SLOW_QUERY_LOG_MAX_MB']) * 1024 * 1024,
+        sauvegardes=int(config['SLOW_QUERY_LOG_BACKUPS']),
+        intervalle_explain=float(config['SLOW_QUERY_EXPLAIN_INTERVAL']),
+        dossier=os.path.join(metriques.dossier, 'requetes') if metriques.dossier else None
+    )
+
+    # Instantanés écrits par un thread à part, démarré à la première requête du processus
+    ecriture_instantanes = EcritureInstantanes(
+        [metriques, journal_requetes],
+        intervalle=float(config['METRICS_SNAPSHOT_INTERVAL'])
+    ) if metriques.dossier else None
+
+    # Chaque lecture parallèle emprunte sa propre connexion au pool
+    FANOUT_WORKERS = int(config['FANOUT_WORKERS'])
+    FANOUT_TIMEOUT = float(config['FANOUT_TIMEOUT'])
+
+def apres_fork():
+    # Processus fils d'un serveur pré-forké : les caches chargés par le parent
+    # sont conservés, mais ni ses connexions (sockets partagées) ni ses threads
+    global _db_pool, _db_pool_lock, _export_executor, _export_executor_lock, facture_worker
+    global _lectures, _lectures_lock, connexions_longues
+    _db_pool = None
+    _db_pool_lock = threading.Lock()
+    _export_executor = None
+    _export_executor_lock = threading.Lock()
+    _lectures = None
+    _lectures_lock = threading.Lock()
+    if metriques is not None:
+        metriques.reinitialiser()
+    if journal_requetes is not None:
+        journal_requetes.reinitialiser()
+    if ecriture_instantanes is not None:
+        ecriture_instantanes.reinitialiser()
+    if event_bus is not None:
+        event_bus.reinitialiser()
+    if file_cuisine is not None:
+        file_cuisine.reinitialiser()
+    if connexions_longues is not None:
+        connexions_longues = threading.BoundedSemaphore(LONG_CONNECTIONS_MAX)
+    if facture_archive is not None:
+        facture_archive.reinitialiser()
+    if facture_worker is not None:
+        facture_worker = FactureWorker(facture_archive.put, workers=facture_worker.workers)
+
+def prechauffer(app):
+    # Caches du menu, de la salle, des versions et de la cuisine chargés avant
+    # la première requête ; une base injoignable ne bloque pas le démarrage
+    with app.app_context():
+        try:
+            menu_cache.plats(get_db_connection)
+            floor_state.tables(get_db_connection)
+            data_versions.get(get_db_connection, ())
+            file_cuisine.synchroniser(get_db_connection)
+        except Error as e:
+            print(f"Préchauffage incomplet : {e}")
+    # Connexions fermées avant le fork des processus de travail
+    if _db_pool is not None:
+        _db_pool.dispose()
+
+def arreter():
+    # Fin d'un processus : rendus de factures en cours terminés, puis ressources libérées
+    global _db_pool, _export_executor, _lectures
+    if facture_worker is not None:
+        facture_worker.shutdown(wait=True)
+    if _export_executor is not None:
+        _export_executor.shutdown(wait=True)
+        _export_executor = None
+    if _lectures is not None:
+        _lectures.shutdown(wait=True)
+        _lectures = None
+    if _db_pool is not None:
+        _db_pool.dispose()
+        _db_pool = None
+    if ecriture_instantanes is not None:
+        ecriture_instantanes.arreter()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=apres_fork)
+
+def create_app(config=None):
+    app = Flask(__name__)
+    lire_config(app, config)
+    initialiser(app.config)
+
+    # Configuration CORS plus permissive
+    CORS(app, resources={
+        r"/*": {
+            "origins": ["http://localhost:3000", "http://localhost:5173"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"]
+        }
+    })
+
+    # Ajoutez ceci pour gérer les requêtes OPTIONS (pré-vol)
+    # @app.after_request
+    # def after_request(response):
+    #     response.headers.add('Access-Control-Allow-Origin', 'http://localhost:5173')
+    #     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    #     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    #     response.headers.add('Access-Control-Allow-Credentials', 'true')
+    #     return response
+
+    app.register_blueprint(routes)
+    app.before_request(debut_mesure)
+    app.after_request(fin_mesure)
+    app.teardown_appcontext(release_db_connection)
+
+    if app.config['WARMUP']:
+        prechauffer(app)
+    return app
+
+def get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(lambda: mysql.connector.connect(**db_config), **pool_config,
+                                          on_acquire=mesurer_attente, on_execute=mesurer_sql)
+    return _db_pool
+
+def mesurer_attente(attente):
+    metriques.observer('resto_db_pool_acquire_wait_seconds', (), attente)
+
+def mesurer_sql(operation, params, duree, cursor):
+    # Requêtes de la requête HTTP en cours (threads de lectures parallèles compris)
+    durees = sql_requete.get()
+    if durees is not None:
+        durees.append(duree)
+    route = None
+    if has_request_context() and request.url_rule:
+        route = f"{request.method} {request.url_rule.rule}"
+    journal_requetes.observer(operation, params, duree, cursor, route)
+
+def debut_mesure():
+    g.debut_mesure = time.perf_counter()
+    sql_requete.set([])
+
+def fin_mesure(response):
+    duree = time.perf_counter() - g.pop('debut_mesure', time.perf_counter())
+    durees_sql = sql_requete.get() or []
+    sql_requete.set(None)
+
+    # Route déclarée (/commandes/<idcom>) plutôt que l'URL : nombre de séries borné
+    route = request.url_rule.rule if request.url_rule else 'inconnue'
+    labels = (('route', route), ('method', request.method))
+    taille = response.content_length
+    if taille is None and response.is_streamed:
+        response.response = mesurer_flux(response.response, labels)
+    else:
+        taille = taille or 0
+    metriques.requete(labels, response.status_code, duree, durees_sql, taille)
+    if ecriture_instantanes is not None:
+        ecriture_instantanes.demarrer()
+    return response
+
+def mesurer_flux(corps, labels):
+    # Corps envoyé en flux : taille (en caractères pour les morceaux texte) connue à la fin
+    taille = 0
+    try:
+        for morceau in corps:
+            taille += len(morceau)
+            yield morceau
+    finally:
+        if hasattr(corps, 'close'):
+            corps.close()
+        metriques.observer('resto_http_response_size_bytes', labels, taille)
+
+def get_export_executor():
+    global _export_executor
+    if _export_executor is None:
+        with _export_executor_lock:
+            if _export_executor is None:
+                # Processus lancés par un serveur dédié (forkserver), pas par fork()
+                # d'un processus de travail multithreadé : ni verrous copiés
+                # verrouillés, ni apres_fork dans les processus de rendu
+                methode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _export_executor = ProcessPoolExecutor(max_workers=FACTURES_EXPORT_PROCESSES,
+                                                       mp_context=multiprocessing.get_context(methode))
+    return _export_executor
+
+def get_lectures():
+    global _lectures
+    if _lectures is None:
+        with _lectures_lock:
+            if _lectures is None:
+                # Pas plus de lectures simultanées que de connexions gardées par le pool
+                _lectures = LecturesParalleles(lambda: get_db_pool().acquire(),
+                                               workers=min(FANOUT_WORKERS, pool_config['size']),
+                                               timeout=FANOUT_TIMEOUT)
+    return _lectures
+
+def lectures_paralleles(lectures, **kwargs):
+    # Voir fanout.py ; une réponse partielle ne reçoit pas d'ETag (conditional_get).
+    # La connexion de la requête (celle de conditional_get par exemple) est rendue
+    # avant l'attente : un thread qui attend des connexions n'en garde aucune,
+    # sinon le pool s'épuise sous charge et toutes les requêtes attendent
+    rendre_connexion()
+    resultats, erreurs = get_lectures().executer(lectures, **kwargs)
+    if erreurs:
+        g.reponse_partielle = True
+    return resultats, erreurs
+
+def get_db_connection():
+    # Une seule connexion empruntée par requête, rendue au pool par conn.close()
+    # ou, à défaut, à la fin du contexte de la requête
+    conn = g.get('db_conn')
+    if conn is None or conn.closed:
+        try:
+            conn = get_db_pool().acquire()
+        except (Error, PoolTimeout) as e:
+            print(f"Erreur de connexion MySQL: {e}")
+            return None
+        g.db_conn = conn
+    return conn
+
+def bump_version(cursor, entity):
+    # Incrémente la version d'une entité dans la même transaction que l'écriture,
+    # pour que les autres processus invalident leurs caches.
+    # LAST_INSERT_ID(expr) permet de récupérer la nouvelle version sans relecture.
+    cursor.execute("""
+        INSERT INTO data_version (entity, version) VALUES (%s, LAST_INSERT_ID(1))
+        ON DUPLICATE KEY UPDATE version = LAST_INSERT_ID(version + 1)
+    """, (entity,))
+    g.versions_modifiees = True
+    return cursor.lastrowid
+
+def commit_occupations(conn, cursor, occupations):
+    # Valide la transaction et répercute les changements d'occupation
+    # [(idtable, occupation)] sur l'état de la salle en mémoire
+    version = bump_version(cursor, 'tables') if occupations else None
+    conn.commit()
+    if occupations:
+        floor_state.set_occupations(occupations, version)
+        for idtable, occupation in occupations:
+            event_bus.publier('tables', 'occupation', {'idtable': idtable, 'occupation': occupation}, version)
+
+def release_db_connection(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn.close()
+    if g.pop('versions_modifiees', False):
+        data_versions.invalidate()
+        client_search.invalidate()
+
+def conditional_get(*entites, horodatage=None):
+    # ETag dérivé des versions des entités lues et des paramètres de la requête.
+    # Un GET conditionnel à jour reçoit 304 sans exécuter la route (ni SQL ni JSON).
+    # horodatage : format strftime ajouté à l'ETag pour les réponses qui dépendent
+    # aussi de l'heure (réservations en cours, 6 derniers mois...)
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            try:
+                versions = data_versions.get(get_db_connection, entites)
+            except Error:
+                return view(*args, **kwargs)
+
+            empreinte = '|'.join([
+                request.path,
+                '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True))),
+                ','.join(f'{e}={v}' for e, v in zip(entites, versions)),
+                datetime.datetime.now().strftime(horodatage) if horodatage else ''
+            ])
+            etag = hashlib.sha1(empreinte.encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or g.pop('reponse_partielle', False):
+                    return response
+            response.set_etag(etag)
+            # Le navigateur garde la réponse mais revalide à chaque fois
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+@routes.route('/metrics', methods=['GET'])
+def exposer_metriques():
+    # Format texte de Prometheus, tous processus confondus
+    return Response(metriques.exposer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@routes.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    stats = get_db_pool().stats()
+    stats['lectures_paralleles'] = get_lectures().stats()
+    stats['requetes'] = journal_requetes.stats()
+    return jsonify(stats)
+
+TRIS_REQUETES = {'total': 'total_ms', 'moyenne': 'moyenne_ms', 'max': 'max_ms', 'nombre': 'nombre', 'lentes': 'lentes'}
+
+@routes.route('/requetes/top', methods=['GET'])
+def requetes_top():
+    # Empreintes SQL les plus coûteuses, tous processus confondus
+    tri = request.args.get('tri', 'total')
+    if tri not in TRIS_REQUETES:
+        return jsonify({'error': f"Tri invalide (valeurs possibles : {', '.join(TRIS_REQUETES)})"}), 400
+    limite = request.args.get('limit', '20')
+    if not limite.isdigit() or int(limite) < 1:
+        return jsonify({'error': 'Paramètre limit invalide'}), 400
+    limite = int(limite)
+    return jsonify(journal_requetes.top(TRIS_REQUETES[tri], min(limite, 500)))
+
+# ===== ÉVÉNEMENTS =====
+def connexion_longue_refusee():
+    # Toutes les places de connexion longue du processus sont prises : sans cette
+    # limite, quelques écrans de cuisine occuperaient tous les threads
+    if connexions_longues.acquire(blocking=False):
+        return None
+    reponse = jsonify({'error': 'Trop de connexions longues sur ce processus, réessayer plus tard'})
+    reponse.status_code = 503
+    reponse.headers['Retry-After'] = '5'
+    return reponse
+
+def rendre_connexion():
+    # Attentes longues (SSE, file de la cuisine) : la connexion de la requête
+    # est rendue au pool au lieu d'être gardée jusqu'à la fin de la réponse
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn.close()
+
+def verifier_versions_evenements(sujets):
+    # Écritures d'autres processus, non diffusées par ce bus : resync des sujets concernés.
+    # La connexion n'est gardée que le temps de la lecture des versions
+    try:
+        versions = data_versions.get(get_db_connection, sujets)
+    except Error:
+        return
+    finally:
+        rendre_connexion()
+    for sujet, version in zip(sujets, versions):
+        event_bus.resynchroniser(sujet, version)
+
+@routes.route('/evenements', methods=['GET'])
+def flux_evenements():
+    # Server-Sent Events : ?sujets=tables,commandes,reservations (tous par défaut),
+    # reprise après le dernier événement reçu (en-tête Last-Event-ID ou ?last_event_id=)
+    sujets = [s for s in request.args.get('sujets', ','.join(SUJETS)).split(',') if s]
+    inconnus = [s for s in sujets if s not in SUJETS]
+    if inconnus or not sujets:
+        return jsonify({'error': f"sujets parmi {', '.join(SUJETS)}"}), 400
+
+    refus = connexion_longue_refusee()
+    if refus:
+        return refus
+
+    dernier_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        verifier_versions_evenements(sujets)
+        abonnement = event_bus.abonner(sujets, dernier_id)
+    except BaseException:
+        connexions_longues.release()
+        raise
+
+    def generate():
+        yield 'retry: 3000\n\n'
+        while True:
+            evenements = abonnement.attendre(EVENTS_KEEPALIVE)
+            if abonnement.ferme:
+                break
+            if not evenements:
+                # Commentaire de maintien de la connexion, et contrôle des autres processus
+                verifier_versions_evenements(sujets)
+                yield ': keepalive\n\n'
+                continue
+            yield ''.join(
+                f"id: {e['id']}\nevent: {e['sujet']}\n"
+                f"data: {current_app.json.dumps({'type': e['type'], **e['donnees']})}\n\n"
+                for e in evenements
+            )
+
+    def fermer():
+        # Fin du flux ou client parti, même avant la première lecture
+        event_bus.desabonner(abonnement)
+        connexions_longues.release()
+
+    reponse = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    reponse.call_on_close(fermer)
+    return reponse
+
+@routes.route('/evenements/stats', methods=['GET'])
+def evenements_stats():
+    return jsonify(event_bus.stats())
+
+# ===== TABLES =====
+@routes.route('/tables', methods=['GET', 'POST'])
+@conditional_get('tables', 'reservations', horodatage='%Y-%m-%d %H:%M')
+def handle_tables():
+    # Lecture servie par l'état de la salle en mémoire
+    if request.method == 'GET':
+        try:
+            return jsonify(floor_state.tables(get_db_connection))
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'POST':
+            data = request.json
+            cursor.execute(
+                "INSERT INTO restaurant_tables (idtable, designation, occupation) VALUES (%s, %s, %s)",
+                (data['idtable'], data['designation'], data.get('occupation', False))
+            )
+            version = bump_version(cursor, 'tables')
+            conn.commit()
+            floor_state.upsert_table(data, version)
+            event_bus.publier('tables', 'table', {
+                'idtable': data['idtable'],
+                'designation': data['designation'],
+                'occupation': data.get('occupation', False)
+            }, version)
+            return jsonify({'message': 'Table créée'}), 201
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 400
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/tables/<idtable>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get('tables', 'reservations', horodatage='%Y-%m-%d %H:%M')
+def manage_table(idtable):
+    if request.method == 'GET':
+        try:
+            table = floor_state.table(get_db_connection, idtable)
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        if not table:
+            return jsonify({'error': 'Table non trouvée'}), 404
+        return jsonify(table)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'PUT':
+            data = request.json
+            cursor.execute(
+                "UPDATE restaurant_tables SET designation = %s, occupation = %s WHERE idtable = %s",
+                (data['designation'], data.get('occupation', False), idtable)
+            )
+            
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'Table non trouvée'}), 404
+                
+            version = bump_version(cursor, 'tables')
+            conn.commit()
+            floor_state.upsert_table(dict(data, idtable=idtable), version)
+            event_bus.publier('tables', 'table', {
+                'idtable': idtable,
+                'designation': data['designation'],
+                'occupation': data.get('occupation', False)
+            }, version)
+            return jsonify({'message': f'Table {idtable} mise à jour'})
+            
+        elif request.method == 'DELETE':
+            # Vérifier si la table existe
+            cursor.execute("SELECT idtable FROM restaurant_tables WHERE idtable = %s", (idtable,))
+            if not cursor.fetchone():
+                return jsonify({'error': 'Table non trouvée'}), 404
+            
+            # Vérifier si la table est utilisée dans des commandes ou réservations
+            cursor.execute("SELECT COUNT(*) as count FROM commande WHERE idtable = %s", (idtable,))
+            if cursor.fetchone()['count'] > 0:
+                return jsonify({'error': 'Impossible de supprimer: table référencée dans des commandes'}), 400
+                
+            cursor.execute("SELECT COUNT(*) as count FROM reserver WHERE idtable = %s", (idtable,))
+            if cursor.fetchone()['count'] > 0:
+                return jsonify({'error': 'Impossible de supprimer: table référencée dans des réservations'}), 400
+            
+            # Suppression
+            cursor.execute("DELETE FROM restaurant_tables WHERE idtable = %s", (idtable,))
+            version = bump_version(cursor, 'tables')
+            conn.commit()
+            floor_state.remove_table(idtable, version)
+            event_bus.publier('tables', 'table_supprimee', {'idtable': idtable}, version)
+            return jsonify({'message': f'Table {idtable} supprimée'}), 200
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/tables/liberer/<idtable>', methods=['PUT'])
+def liberer_table(idtable):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # Vérifier si la table existe
+        cursor.execute("SELECT occupation FROM restaurant_tables WHERE idtable = %s", (idtable,))
+        table = cursor.fetchone()
+        if not table:
+            return jsonify({'error': 'Table non trouvée'}), 404
+            
+        # Libérer la table
+        cursor.execute("UPDATE restaurant_tables SET occupation = FALSE WHERE idtable = %s", (idtable,))
+        version = bump_version(cursor, 'tables')
+        conn.commit()
+        floor_state.set_occupations([(idtable, False)], version)
+        event_bus.publier('tables', 'occupation', {'idtable': idtable, 'occupation': False}, version)
+        
+        return jsonify({'message': f'Table {idtable} libérée'}), 200
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# ===== MENU =====
+@routes.route('/menu', methods=['GET', 'POST'])
+@conditional_get('menu')
+def handle_menu():
+    # Lecture servie par le cache du menu, sans aller-retour MySQL en régime établi
+    if request.method == 'GET':
+        try:
+            return jsonify(menu_cache.plats(get_db_connection, request.args.get('search', '')))
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'POST':
+            data = request.json
+            cursor.execute(
+                "INSERT INTO menu (idplat, nomplat, pu) VALUES (%s, %s, %s)",
+                (data['idplat'], data['nomplat'], data['pu'])
+            )
+            bump_version(cursor, 'menu')
+            conn.commit()
+            menu_cache.invalidate()
+            return jsonify({'message': 'Plat ajouté au menu'}), 201
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 400
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/menu/<idplat>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get('menu')
+def manage_menu(idplat):
+    if request.method == 'GET':
+        try:
+            plat = menu_cache.plat(get_db_connection, idplat)
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        if not plat:
+            return jsonify({'error': 'Plat non trouvé'}), 404
+        return jsonify(plat)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'PUT':
+            data = request.json
+            cursor.execute(
+                "UPDATE menu SET nomplat = %s, pu = %s WHERE idplat = %s",
+                (data['nomplat'], data['pu'], idplat)
+            )
+            
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'Plat non trouvé'}), 404
+                
+            bump_version(cursor, 'menu')
+            conn.commit()
+            menu_cache.invalidate()
+            return jsonify({'message': f'Plat {idplat} mis à jour'})
+            
+        elif request.method == 'DELETE':
+            # Vérifier si le plat existe
+            cursor.execute("SELECT idplat FROM menu WHERE idplat = %s", (idplat,))
+            if not cursor.fetchone():
+                return jsonify({'error': 'Plat non trouvé'}), 404
+            
+            # Vérifier si le plat est utilisé dans des commandes
+            cursor.execute("SELECT COUNT(*) as count FROM commande_plats WHERE idplat = %s", (idplat,))
+            if cursor.fetchone()['count'] > 0:
+                return jsonify({'error': 'Impossible de supprimer: plat référencé dans des commandes'}), 400
+            
+            # Suppression
+            cursor.execute("DELETE FROM menu WHERE idplat = %s", (idplat,))
+            bump_version(cursor, 'menu')
+            conn.commit()
+            menu_cache.invalidate()
+            return jsonify({'message': f'Plat {idplat} supprimé'}), 200
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# ===== COMMANDES =====
+# Taille maximale d'une page de GET /commandes?limit=
+COMMANDES_MAX_LIMIT = 1000
+
+# Nombre maximal d'identifiants par requête IN (...) lors du chargement des plats
+ORDER_LINES_CHUNK = 500
+
+# Nombre de lignes lues à la fois sur les curseurs serveur des exports en flux
+STREAM_FETCH_SIZE = 500
+
+def encode_commandes_cursor(commande):
+    datecom = commande['datecom']
+    if isinstance(datecom, (datetime.date, datetime.datetime)):
+        datecom = datecom.isoformat()
+    token = f"{datecom}|{commande['idcom']}".encode('utf-8')
+    return base64.urlsafe_b64encode(token).decode('ascii')
+
+def decode_commandes_cursor(token):
+    try:
+        datecom, idcom = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8').split('|', 1)
+    except (ValueError, UnicodeError):
+        raise ValueError('Curseur invalide')
+    return datecom, idcom
+
+def commandes_conditions(args):
+    # Filtres communs de GET /commandes (dates et curseur de pagination)
+    conditions = []
+    params = []
+
+    date_debut = args.get('date_debut')
+    date_fin = args.get('date_fin')
+    if date_debut and date_fin:
+        conditions.append("c.datecom BETWEEN %s AND %s")
+        params.extend([date_debut, date_fin])
+    elif date_debut:
+        conditions.append("c.datecom = %s")
+        params.append(date_debut)
+
+    # Reprise après le dernier élément vu, dans l'ordre (datecom DESC, idcom DESC)
+    after = args.get('after')
+    if after:
+        datecom, idcom = decode_commandes_cursor(after)
+        conditions.append("(c.datecom < %s OR (c.datecom = %s AND c.idcom < %s))")
+        params.extend([datecom, datecom, idcom])
+
+    return conditions, params
+
+def fermer_flux(conn, cursor):
+    # Fin d'un export en flux, y compris après une déconnexion du client en cours de
+    # lecture : le reste du résultat non bufferisé n'est pas lu (close() lève « Unread
+    # result found ») et la connexion, inutilisable en l'état, n'est pas rendue au pool
+    try:
+        cursor.close()
+    except Error:
+        conn.discard()
+    finally:
+        conn.close()
+
+def reponse_en_flux(conn, cursor, generate, **kwargs):
+    # Flask exécute le teardown de la requête dès le retour de la vue, avant l'envoi
+    # du flux : la connexion est retirée de g et n'est rendue qu'à la fermeture de la
+    # réponse (fin du flux ou client parti, même avant la première lecture)
+    g.pop('db_conn', None)
+    reponse = Response(stream_with_context(generate()), **kwargs)
+    reponse.call_on_close(lambda: fermer_flux(conn, cursor))
+    return reponse
+
+def stream_commandes():
+    # Export en flux : une seule requête non bufferisée, les lignes de commande
+    # sont regroupées à la volée et chaque commande est écrite dès qu'elle est complète.
+    # Mêmes lignes que attach_plats : la commande reste sans ses plats absents du menu
+    try:
+        conditions, params = commandes_conditions(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    sql = """
+        SELECT c.*, t.designation as table_designation,
+            cp.idplat as ligne_idplat, m.nomplat as ligne_nomplat,
+            cp.quantite as ligne_quantite, cp.prix_unitaire as ligne_prix_unitaire
+        FROM commande c
+        LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+        LEFT JOIN (commande_plats cp JOIN menu m ON cp.idplat = m.idplat) ON cp.idcom = c.idcom
+    """
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY c.datecom DESC, c.idcom DESC, cp.id"
+
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(sql, params)
+    except Error as e:
+        cursor.close()
+        conn.close()
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        commande = None
+        first = True
+        yield '['
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if commande is None or row['idcom'] != commande['idcom']:
+                    if commande is not None:
+                        yield ('' if first else ',') + current_app.json.dumps(commande)
+                        first = False
+                    commande = {k: v for k, v in row.items() if not k.startswith('ligne_')}
+                    commande['plats'] = []
+                if row['ligne_idplat'] is not None:
+                    commande['plats'].append({
+                        'idplat': row['ligne_idplat'],
+                        'nomplat': row['ligne_nomplat'],
+                        'quantite': row['ligne_quantite'],
+                        'prix_unitaire': row['ligne_prix_unitaire']
+                    })
+        if commande is not None:
+            yield ('' if first else ',') + current_app.json.dumps(commande)
+        yield ']'
+
+    return reponse_en_flux(conn, cursor, generate, mimetype='application/json')
+
+def attach_plats(cursor, commandes):
+    # Charge les plats de toutes les commandes en quelques requêtes groupées
+    # (au lieu d'une requête par commande) et les range dans commande['plats'].
+    # Clés en minuscules : la collation MySQL compare idcom sans tenir compte de la casse
+    plats_par_commande = {commande['idcom'].lower(): [] for commande in commandes}
+    ids = list(plats_par_commande)
+
+    for i in range(0, len(ids), ORDER_LINES_CHUNK):
+        chunk = ids[i:i + ORDER_LINES_CHUNK]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(f"""
+            SELECT cp.idcom, cp.idplat, m.nomplat, cp.quantite, cp.prix_unitaire
+            FROM commande_plats cp
+            JOIN menu m ON cp.idplat = m.idplat
+            WHERE cp.idcom IN ({placeholders})
+            ORDER BY cp.id
+        """, chunk)
+        for ligne in cursor.fetchall():
+            plats_par_commande[ligne.pop('idcom').lower()].append(ligne)
+
+    for commande in commandes:
+        commande['plats'] = plats_par_commande[commande['idcom'].lower()]
+    return commandes
+
+@routes.route('/commandes', methods=['GET', 'POST'])
+@conditional_get('commandes', 'tables', 'menu')
+def handle_commandes():
+    if request.method == 'GET' and request.args.get('stream', 'false').lower() == 'true':
+        return stream_commandes()
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'GET':
+            try:
+                conditions, params = commandes_conditions(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            limit = request.args.get('limit', type=int)
+            if 'limit' in request.args and (limit is None or limit <= 0):
+                return jsonify({'error': 'Paramètre limit invalide'}), 400
+
+            sql = """
+                SELECT c.*, t.designation as table_designation
+                FROM commande c
+                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+            """
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += " ORDER BY c.datecom DESC, c.idcom DESC"
+
+            # Sans pagination : liste complète (comportement historique)
+            if limit is None and 'after' not in request.args:
+                cursor.execute(sql, params)
+                commandes = cursor.fetchall()
+                attach_plats(cursor, commandes)
+                return jsonify(commandes)
+
+            # Pagination par clé (datecom, idcom) : une ligne de plus pour savoir s'il reste une page
+            limit = min(limit or COMMANDES_MAX_LIMIT, COMMANDES_MAX_LIMIT)
+            cursor.execute(sql + " LIMIT %s", params + [limit + 1])
+            commandes = cursor.fetchall()
+            next_cursor = None
+            if len(commandes) > limit:
+                commandes = commandes[:limit]
+                next_cursor = encode_commandes_cursor(commandes[-1])
+            attach_plats(cursor, commandes)
+
+            return jsonify({'commandes': commandes, 'next_cursor': next_cursor})
+
+        elif request.method == 'POST':
+            data = request.json
+            required = ['idcom', 'nomcli', 'typecom', 'plats']
+            if not all(field in data for field in required):
+                return jsonify({'error': 'Champs manquants'}), 400
+
+            # Plats lus une seule fois dans le cache du menu (avant toute requête sur le
+            # curseur de la route) : prix et noms viennent du même instantané
+            menu = {plat['idplat']: menu_cache.plat(get_db_connection, plat['idplat'])
+                    for plat in data['plats']}
+
+            # Vérification de la table pour les commandes sur place
+            if data['typecom'] == 'sur place':
+                if 'idtable' not in data:
+                    return jsonify({'error': 'Table requise pour commande sur place'}), 400
+                
+                # Vérifier en une requête si la table existe, est libre et non réservée
+                # par un autre client ; la ligne reste verrouillée jusqu'au commit
+                cursor.execute("""
+                    SELECT t.occupation,
+                        EXISTS (
+                            SELECT 1 FROM reserver r
+                            WHERE r.idtable = t.idtable
+                            AND NOW() BETWEEN r.date_de_reserv AND r.date_reserve
+                            AND r.nomcli != %s
+                        ) as reserved
+                    FROM restaurant_tables t
+                    WHERE t.idtable = %s
+                    FOR UPDATE
+                """, (data['nomcli'], data['idtable']))
+                table = cursor.fetchone()
+                if not table:
+                    return jsonify({'error': 'Table introuvable'}), 404
+                if table['occupation']:
+                    return jsonify({'error': 'Table déjà occupée'}), 400
+                if table['reserved']:
+                    return jsonify({'error': 'Table réservée par un autre client'}), 400
+
+            # Calcul du montant total
+            montant_total = 0
+            for plat in data['plats']:
+                if not menu[plat['idplat']]:
+                    return jsonify({'error': f'Plat {plat["idplat"]} introuvable'}), 404
+                montant_total += menu[plat['idplat']]['pu'] * plat.get('quantite', 1)
+
+            # Plats tels qu'affichés en cuisine
+            plats_cuisine = [{
+                'idplat': plat['idplat'],
+                'nomplat': menu[plat['idplat']]['nomplat'],
+                'quantite': plat.get('quantite', 1)
+            } for plat in data['plats']]
+
+            # Création de la commande
+            datecom = data.get('datecom', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            # Heure d'arrivée (ordre de la file de la cuisine), la même en base et en mémoire
+            creee_le = datetime.datetime.now()
+            cursor.execute("""
+                INSERT INTO commande 
+                (idcom, nomcli, typecom, idtable, datecom, creee_le, statut, montant_total)
+                VALUES (%s, %s, %s, %s, %s, %s, 'en attente', %s)
+            """, (
+                data['idcom'],
+                data['nomcli'],
+                data['typecom'],
+                data.get('idtable'),
+                datecom,
+                creee_le,
+                montant_total
+            ))
+
+            # Ajout des plats : executemany regroupe les lignes en un seul INSERT multi-lignes
+            if data['plats']:
+                cursor.executemany("""
+                    INSERT INTO commande_plats 
+                    (idcom, idplat, quantite, prix_unitaire)
+                    VALUES (%s, %s, %s, %s)
+                """, [(
+                    data['idcom'],
+                    plat['idplat'],
+                    plat.get('quantite', 1),
+                    menu[plat['idplat']]['pu']
+                ) for plat in data['plats']])
+
+            # Agrégats de ventes et résumé client
+            maj_ventes(cursor, data['idcom'], 1)
+            maj_clients(cursor, data['nomcli'])
+
+            # Mise à jour de l'occupation de la table
+            occupations = []
+            if data['typecom'] == 'sur place' and data.get('idtable'):
+                cursor.execute("""
+                    UPDATE restaurant_tables 
+                    SET occupation = TRUE 
+                    WHERE idtable = %s
+                """, (data['idtable'],))
+                occupations.append((data['idtable'], True))
+
+            version = bump_version(cursor, 'commandes')
+            commit_occupations(conn, cursor, occupations)
+            file_cuisine.ajouter({
+                'idcom': data['idcom'],
+                'nomcli': data['nomcli'],
+                'typecom': data['typecom'],
+                'idtable': data.get('idtable'),
+                'datecom': datecom,
+                'creee_le': creee_le,
+                'statut': 'en attente',
+                'plats': plats_cuisine
+            }, version)
+            event_bus.publier('commandes', 'commande', {
+                'idcom': data['idcom'],
+                'nomcli': data['nomcli'],
+                'typecom': data['typecom'],
+                'idtable': data.get('idtable'),
+                'statut': 'en attente'
+            }, version)
+            return jsonify({'message': 'Commande créée avec succès'}), 201
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/commandes/<idcom>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get('commandes', 'tables', 'menu')
+def manage_commande(idcom):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'GET':
+            cursor.execute("""
+                SELECT c.*, t.designation as table_designation
+                FROM commande c
+                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+                WHERE c.idcom = %s
+            """, (idcom,))
+            
+            commande = cursor.fetchone()
+            if not commande:
+                return jsonify({'error': 'Commande non trouvée'}), 404
+                
+            attach_plats(cursor, [commande])
+            
+            return jsonify(commande)
+            
+        elif request.method == 'PUT':
+            data = request.json
+            
+            # Récupérer l'ancienne commande pour vérifier si elle avait une table
+            cursor.execute("SELECT idtable, typecom, nomcli FROM commande WHERE idcom = %s", (idcom,))
+            old_commande = cursor.fetchone()
+            if not old_commande:
+                return jsonify({'error': 'Commande non trouvée'}), 404
+            
+            # Un changement de type de commande déplace ses ventes dans les agrégats
+            typecom_change = data['typecom'] != old_commande['typecom']
+            if typecom_change:
+                maj_ventes(cursor, idcom, -1, compteurs=False)
+
+            # Mise à jour de la commande
+            occupations = []
+            cursor.execute("""
+                UPDATE commande
+                SET nomcli = %s, typecom = %s, idtable = %s, statut = %s
+                WHERE idcom = %s
+            """, (
+                data['nomcli'],
+                data['typecom'],
+                data.get('idtable'),
+                data.get('statut', 'en attente'),
+                idcom
+            ))
+
+            if typecom_change:
+                maj_ventes(cursor, idcom, 1, compteurs=False)
+
+            # La commande peut changer de client
+            if data['nomcli'] != old_commande['nomcli']:
+                maj_clients(cursor, old_commande['nomcli'], data['nomcli'])
+            
+            # Si la commande change de statut à "terminé", libérer la table
+            if data.get('statut') == 'terminé' and old_commande['idtable']:
+                cursor.execute("""
+                    UPDATE restaurant_tables
+                    SET occupation = FALSE
+                    WHERE idtable = %s
+                """, (old_commande['idtable'],))
+                occupations.append((old_commande['idtable'], False))
+            
+            # Si la commande change de table ou passe de emporter à sur place
+            if data['typecom'] == 'sur place' and data.get('idtable') != old_commande['idtable']:
+                # Libérer l'ancienne table si elle existe
+                if old_commande['idtable'] and old_commande['typecom'] == 'sur place':
+                    cursor.execute("""
+                        UPDATE restaurant_tables
+                        SET occupation = FALSE
+                        WHERE idtable = %s
+                    """, (old_commande['idtable'],))
+                    occupations.append((old_commande['idtable'], False))
+                
+                # Occuper la nouvelle table
+                if data.get('idtable'):
+                    cursor.execute("""
+                        UPDATE restaurant_tables
+                        SET occupation = TRUE
+                        WHERE idtable = %s
+                    """, (data['idtable'],))
+                    occupations.append((data['idtable'], True))
+            
+            version = bump_version(cursor, 'commandes')
+            commit_occupations(conn, cursor, occupations)
+            file_cuisine.modifier(idcom, {
+                'nomcli': data['nomcli'],
+                'typecom': data['typecom'],
+                'idtable': data.get('idtable'),
+                'statut': data.get('statut', 'en attente')
+            }, version)
+            event_bus.publier('commandes', 'commande', {
+                'idcom': idcom,
+                'nomcli': data['nomcli'],
+                'typecom': data['typecom'],
+                'idtable': data.get('idtable'),
+                'statut': data.get('statut', 'en attente')
+            }, version)
+            return jsonify({'message': f'Commande {idcom} mise à jour'}), 200
+            
+        elif request.method == 'DELETE':
+            # Vérifier si la commande existe
+            cursor.execute("SELECT idtable, typecom, nomcli FROM commande WHERE idcom = %s", (idcom,))
+            commande = cursor.fetchone()
+            if not commande:
+                return jsonify({'error': 'Commande non trouvée'}), 404
+            
+            # Libérer la table si c'est une commande sur place
+            occupations = []
+            if commande['idtable'] and commande['typecom'] == 'sur place':
+                cursor.execute("""
+                    UPDATE restaurant_tables
+                    SET occupation = FALSE
+                    WHERE idtable = %s
+                """, (commande['idtable'],))
+                occupations.append((commande['idtable'], False))
+            
+            # Retirer la commande des agrégats de ventes, puis supprimer ses plats
+            maj_ventes(cursor, idcom, -1)
+            cursor.execute("DELETE FROM commande_plats WHERE idcom = %s", (idcom,))
+            
+            # Supprimer la commande
+            cursor.execute("DELETE FROM commande WHERE idcom = %s", (idcom,))
+            maj_clients(cursor, commande['nomcli'])
+            
+            version = bump_version(cursor, 'commandes')
+            commit_occupations(conn, cursor, occupations)
+            file_cuisine.retirer(idcom, version)
+            event_bus.publier('commandes', 'commande_supprimee', {'idcom': idcom}, version)
+            return jsonify({'message': f'Commande {idcom} supprimée'}), 200
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/commandes/client/<nomcli>', methods=['GET'])
+@conditional_get('commandes', 'tables', 'menu')
+def get_commandes_client(nomcli):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # Recherche exacte ou partielle selon le paramètre
+        search_type = request.args.get('search_type', 'exact')
+        
+        if search_type == 'partial':
+            cursor.execute("""
+                SELECT c.*, t.designation as table_designation
+                FROM commande c
+                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+                WHERE c.nomcli LIKE %s
+                ORDER BY c.datecom DESC
+            """, (f'%{nomcli}%',))
+        else:
+            cursor.execute("""
+                SELECT c.*, t.designation as table_designation
+                FROM commande c
+                LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+                WHERE c.nomcli = %s
+                ORDER BY c.datecom DESC
+            """, (nomcli,))
+            
+        commandes = cursor.fetchall()
+
+        attach_plats(cursor, commandes)
+
+        return jsonify(commandes)
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# ===== CUISINE =====
+# Transitions de la cuisine : action -> (statuts de départ, nouveau statut)
+TRANSITIONS_CUISINE = {
+    'commencer': (('en attente',), 'en cours'),
+    'terminer': (('en attente', 'en cours'), 'terminé'),
+}
+
+@routes.route('/cuisine/queue', methods=['GET'])
+def cuisine_queue():
+    # Attente longue : ?since=<curseur> renvoie les changements dès qu'il y en a,
+    # ou une liste vide après ?timeout= secondes ; sans curseur valide, la file complète
+    since = request.args.get('since')
+    timeout = request.args.get('timeout', CUISINE_POLL_TIMEOUT, type=float)
+    fin = time.monotonic() + max(0.0, min(timeout, CUISINE_POLL_TIMEOUT))
+
+    refus = connexion_longue_refusee()
+    if refus:
+        return refus
+    try:
+        while True:
+            try:
+                file_cuisine.synchroniser(get_db_connection)
+            except Error as e:
+                return jsonify({'error': str(e)}), 500
+            finally:
+                rendre_connexion()
+
+            reponse = file_cuisine.depuis(since)
+            restant = fin - time.monotonic()
+            if reponse['complet'] or reponse['changements'] or restant <= 0:
+                return jsonify(reponse)
+            # Réveil au premier changement local, contrôle des autres processus entre deux attentes
+            file_cuisine.attendre(since, min(restant, file_cuisine.check_interval))
+    finally:
+        connexions_longues.release()
+
+@routes.route('/cuisine/<idcom>/<action>', methods=['POST'])
+def transition_cuisine(idcom, action):
+    # Ne modifie que la colonne statut : pas de relecture de la commande ni de ses plats
+    if action not in TRANSITIONS_CUISINE:
+        return jsonify({'error': f"Action inconnue : {action}"}), 404
+    depart, statut = TRANSITIONS_CUISINE[action]
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        placeholders = ', '.join(['%s'] * len(depart))
+        cursor.execute(f"""
+            UPDATE commande SET statut = %s
+            WHERE idcom = %s AND statut IN ({placeholders})
+        """, (statut, idcom) + depart)
+
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT statut FROM commande WHERE idcom = %s", (idcom,))
+            commande = cursor.fetchone()
+            conn.rollback()
+            if not commande:
+                return jsonify({'error': 'Commande non trouvée'}), 404
+            return jsonify({'error': f"Commande {commande['statut']} : action {action} impossible"}), 409
+
+        version = bump_version(cursor, 'commandes')
+        conn.commit()
+        file_cuisine.modifier(idcom, {'statut': statut}, version)
+        event_bus.publier('commandes', 'statut', {'idcom': idcom, 'statut': statut}, version)
+        return jsonify({'idcom': idcom, 'statut': statut}), 200
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/cuisine/stats', methods=['GET'])
+def cuisine_stats():
+    return jsonify(file_cuisine.stats())
+
+def tri_pagination_clients(args):
+    # ?tri=recence|depense&limit=&offset= communs à /clients et /recherche/clients
+    tri = args.get('tri', 'recence')
+    if tri not in TRIS:
+        raise ValueError(f"tri doit valoir {', '.join(TRIS)}")
+
+    limit = args.get('limit', type=int)
+    offset = args.get('offset', type=int)
+    if ('limit' in args and (limit is None or limit <= 0)) or \
+            ('offset' in args and (offset is None or offset < 0)):
+        raise ValueError('Paramètres de pagination invalides')
+
+    if limit is None:
+        return TRIS[tri], '', []
+    return TRIS[tri], " LIMIT %s OFFSET %s", [limit, offset or 0]
+
+# Route pour lister les clients pour une date donnée ou entre deux dates
+@routes.route('/clients', methods=['GET'])
+@conditional_get('commandes')
+def get_clients():
+    try:
+        order_by, pagination, pagination_params = tri_pagination_clients(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        date_debut = request.args.get('date_debut')
+        date_fin = request.args.get('date_fin')
+
+        if date_debut:
+            # Commandes de la période, total dépensé tous temps confondus (résumé client)
+            sql = """
+                SELECT c.nomcli, MAX(c.datecom) as derniere_visite, COUNT(*) as nb_commandes,
+                    r.total_depense
+                FROM commande c
+                JOIN clients_resume r ON r.nomcli = c.nomcli
+            """
+            params = []
+
+            # Ajout des filtres de date
+            if date_fin:
+                sql += " WHERE c.datecom BETWEEN %s AND %s"
+                params.extend([date_debut, date_fin])
+            else:
+                sql += " WHERE c.datecom = %s"
+                params.append(date_debut)
+
+            sql += " GROUP BY c.nomcli, r.total_depense"
+        else:
+            sql = """
+                SELECT nomcli, derniere_visite, nb_commandes, total_depense
+                FROM clients_resume
+                WHERE nb_commandes > 0
+            """
+            params = []
+
+        cursor.execute(sql + f" ORDER BY {order_by}" + pagination, params + pagination_params)
+        return jsonify(cursor.fetchall())
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# Génération de facture PDF
+def requetes_facture(idcom):
+    # En-tête et lignes imprimés sur la facture
+    entete = requete("""
+        SELECT c.*, t.designation 
+        FROM commande c
+        LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+        WHERE c.idcom = %s
+    """, (idcom,), un=True)
+    lignes = requete("""
+        SELECT m.nomplat, cp.prix_unitaire, cp.quantite
+        FROM commande_plats cp
+        JOIN menu m ON cp.idplat = m.idplat
+        WHERE cp.idcom = %s
+    """, (idcom,))
+    return entete, lignes
+
+def charger_facture(cursor, idcom):
+    # (commande, plats), ou (None, None) si la commande n'existe pas
+    entete, lignes = requetes_facture(idcom)
+    commande = entete(cursor)
+    if not commande:
+        return None, None
+    return commande, lignes(cursor)
+
+def charger_facture_parallele(idcom):
+    # Comme charger_facture, l'en-tête et les lignes étant lus en même temps
+    entete, lignes = requetes_facture(idcom)
+    resultats, erreurs = lectures_paralleles({'commande': entete, 'plats': lignes})
+    if erreurs:
+        raise Error('; '.join(f"{nom} : {message}" for nom, message in erreurs.items()))
+    if not resultats['commande']:
+        return None, None
+    return resultats['commande'], resultats['plats']
+
+def envoyer_facture(tranche, idcom, empreinte):
+    # Lue directement dans le pack de l'archive ; l'empreinte sert d'ETag
+    # pour les requêtes conditionnelles et les plages (Range)
+    rv = current_app.response_class(wrap_file(request.environ, tranche), mimetype='application/pdf',
+                            direct_passthrough=True)
+    rv.content_length = len(tranche)
+    rv.headers.set('Content-Disposition', 'attachment', filename=f"facture_{idcom}.pdf")
+    rv.cache_control.no_cache = True
+    rv.set_etag(empreinte)
+    return rv.make_conditional(request.environ, accept_ranges=True, complete_length=len(tranche))
+
+def reponse_facture(job):
+    # PDF si le rendu est terminé, sinon l'état du travail
+    if job['statut'] == 'terminé':
+        tranche = facture_archive.get(job['idcom'], job['empreinte'])
+        if tranche:
+            return envoyer_facture(tranche, job['idcom'], job['empreinte'])
+        return jsonify({'error': 'Facture introuvable'}), 404
+    if job['statut'] == 'erreur':
+        return jsonify({'error': job['erreur'], 'job': facture_worker.public(job)}), 500
+    return jsonify(facture_worker.public(job)), 202
+
+@routes.route('/facture/<idcom>', methods=['GET'])
+def generate_facture(idcom):
+    # Lectures parallèles avant d'emprunter la connexion de la requête
+    try:
+        commande, plats = charger_facture_parallele(idcom)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    if not commande:
+        return jsonify({'error': 'Commande introuvable'}), 404
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # Une réimpression ne modifie plus la commande ni la table
+        if commande['statut'] != 'payé':
+            # Mise à jour du statut de la commande
+            cursor.execute("UPDATE commande SET statut = 'payé' WHERE idcom = %s", (idcom,))
+            
+            # Si la commande était sur table, libérer la table
+            occupations = []
+            if commande['idtable'] and commande['typecom'] == 'sur place':
+                cursor.execute("UPDATE restaurant_tables SET occupation = FALSE WHERE idtable = %s", (commande['idtable'],))
+                occupations.append((commande['idtable'], False))
+            
+            version = bump_version(cursor, 'commandes')
+            commit_occupations(conn, cursor, occupations)
+            file_cuisine.modifier(commande['idcom'], {'statut': 'payé'}, version)
+            event_bus.publier('commandes', 'statut', {'idcom': commande['idcom'], 'statut': 'payé'}, version)
+
+        reponse = {
+            'filename': f"facture_{idcom}.pdf",
+            'url': f"/facture/{idcom}/download",
+            'total': total_facture(plats)
+        }
+
+        # Facture inchangée depuis le dernier rendu : servie telle quelle
+        empreinte = empreinte_facture(commande, plats)
+        tranche = facture_archive.get(idcom, empreinte)
+        if tranche:
+            if request.args.get('download', 'false').lower() == 'true':
+                return envoyer_facture(tranche, idcom, empreinte)
+            tranche.close()
+            reponse.update({'message': 'Facture générée', 'statut': 'terminé'})
+            return jsonify(reponse)
+
+        # Rendu du PDF confié au pool de factures, hors du fil de la requête
+        job_id = facture_worker.submit(commande, plats, empreinte)
+        
+        # Renvoyer le fichier au lieu du JSON (attente bornée du rendu)
+        if request.args.get('download', 'false').lower() == 'true':
+            job = facture_worker.job(job_id)
+            facture_worker.wait(job, FACTURE_DOWNLOAD_TIMEOUT)
+            return reponse_facture(job)
+        
+        reponse.update({'message': 'Facture en cours de génération', 'statut': 'en attente', 'job_id': job_id})
+        return jsonify(reponse), 202
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/facture/<idcom>/download', methods=['GET'])
+def download_facture(idcom):
+    try:
+        commande, plats = charger_facture_parallele(idcom)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+
+    if not commande:
+        return jsonify({'error': 'Commande introuvable'}), 404
+
+    empreinte = empreinte_facture(commande, plats)
+    tranche = facture_archive.get(idcom, empreinte)
+    if tranche:
+        return envoyer_facture(tranche, idcom, empreinte)
+
+    # Absente de l'archive (jamais rendue ou commande modifiée depuis)
+    job = facture_worker.job(facture_worker.submit(commande, plats, empreinte))
+    facture_worker.wait(job, FACTURE_DOWNLOAD_TIMEOUT)
+    return reponse_facture(job)
+
+@routes.route('/factures/export', methods=['GET'])
+def export_factures():
+    # Archive ZIP des factures de la période, envoyée au fil du rendu
+    try:
+        debut = datetime.date.fromisoformat(request.args['date_debut'])
+        fin = datetime.date.fromisoformat(request.args['date_fin'])
+    except KeyError:
+        return jsonify({'error': 'date_debut et date_fin sont requis'}), 400
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # Deux requêtes pour toute la période : en-têtes puis lignes
+        cursor.execute("""
+            SELECT c.*, t.designation 
+            FROM commande c
+            LEFT JOIN restaurant_tables t ON c.idtable = t.idtable
+            WHERE c.datecom BETWEEN %s AND %s
+            ORDER BY c.datecom, c.idcom
+        """, (debut, fin))
+        commandes = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT cp.idcom, m.nomplat, cp.prix_unitaire, cp.quantite
+            FROM commande_plats cp
+            JOIN commande c ON c.idcom = cp.idcom
+            JOIN menu m ON cp.idplat = m.idplat
+            WHERE c.datecom BETWEEN %s AND %s
+        """, (debut, fin))
+        plats_par_commande = {commande['idcom'].lower(): [] for commande in commandes}
+        for ligne in cursor.fetchall():
+            plats = plats_par_commande.get(ligne.pop('idcom').lower())
+            if plats is not None:
+                plats.append(ligne)
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    factures = [(commande, plats_par_commande[commande['idcom'].lower()]) for commande in commandes]
+    zip_flux = exporter_zip(factures, facture_archive, get_export_executor(),
+                            fenetre=2 * FACTURES_EXPORT_PROCESSES)
+    return Response(zip_flux, mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename=factures_{debut}_{fin}.zip'
+    })
+
+@routes.route('/factures/jobs/<job_id>', methods=['GET'])
+def facture_job(job_id):
+    job = facture_worker.job(job_id)
+    if not job:
+        return jsonify({'error': 'Travail introuvable'}), 404
+    return jsonify(facture_worker.public(job))
+
+@routes.route('/factures/stats', methods=['GET'])
+def factures_stats():
+    return jsonify({**facture_worker.stats(), 'archive': facture_archive.stats()})
+
+# ===== RÉSERVATIONS =====
+def reservation_en_conflit(cursor, idtable, debut, fin, idreserv_exclue=''):
+    # Chevauchement d'intervalles semi-ouverts [debut, fin) : une réservation
+    # peut commencer exactement quand la précédente se termine.
+    # Le prédicat est servi par l'index (idtable, date_de_reserv, date_reserve).
+    cursor.execute("""
+        SELECT 1 as conflit
+        FROM reserver
+        WHERE idtable = %s
+        AND date_de_reserv < %s
+        AND date_reserve > %s
+        AND idreserv != %s
+        LIMIT 1
+    """, (idtable, fin, debut, idreserv_exclue))
+    return cursor.fetchone() is not None
+
+@routes.route('/reservations', methods=['GET', 'POST'])
+@conditional_get('reservations', 'tables')
+def handle_reservations():
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'GET':
+            date = request.args.get('date')
+            client = request.args.get('client')
+            
+            sql = """
+                SELECT r.*, t.designation 
+                FROM reserver r
+                JOIN restaurant_tables t ON r.idtable = t.idtable
+            """
+            params = []
+            
+            # Filtrage par date ou client
+            conditions = []
+            if date:
+                conditions.append("DATE(r.date_de_reserv) = %s")
+                params.append(date)
+            if client:
+                conditions.append("r.nomcli LIKE %s")
+                params.append(f"%{client}%")
+                
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+                
+            sql += " ORDER BY r.date_de_reserv"
+            
+            cursor.execute(sql, params)
+            return jsonify(cursor.fetchall())
+
+        elif request.method == 'POST':
+            data = request.json
+            required = ['idreserv', 'idtable', 'date_de_reserv', 'nomcli']
+            if not all(field in data for field in required):
+                return jsonify({'error': 'Champs manquants'}), 400
+                
+            # Vérification que la table existe
+            cursor.execute("SELECT * FROM restaurant_tables WHERE idtable = %s", (data['idtable'],))
+            if not cursor.fetchone():
+                return jsonify({'error': 'Table introuvable'}), 404
+
+            # Date de fin de réservation (par défaut +2h si non fournie)
+            date_reserve = data.get('date_reserve')
+            if not date_reserve:
+                date_de_reserv = datetime.datetime.fromisoformat(data['date_de_reserv'].replace('Z', '+00:00'))
+                date_reserve = (date_de_reserv + datetime.timedelta(hours=2)).isoformat()
+
+            # Vérification des conflits de réservation
+            if reservation_en_conflit(
+                cursor,
+                data['idtable'],
+                data['date_de_reserv'],
+                date_reserve,
+                data.get('idreserv', '')  # Pour éviter les conflits lors de la mise à jour
+            ):
+                return jsonify({'error': 'Conflit de réservation: la table est déjà réservée pour cette période'}), 400
+
+            # Client actuel de la réservation si l'identifiant existe déjà (mise à jour)
+            cursor.execute("SELECT nomcli FROM reserver WHERE idreserv = %s", (data['idreserv'],))
+            existante = cursor.fetchone()
+
+            # Création de la réservation
+            cursor.execute("""
+                INSERT INTO reserver 
+                (idreserv, idtable, date_de_reserv, date_reserve, nomcli)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                idtable = VALUES(idtable),
+                date_de_reserv = VALUES(date_de_reserv),
+                date_reserve = VALUES(date_reserve),
+                nomcli = VALUES(nomcli)
+            """, (
+                data['idreserv'],
+                data['idtable'],
+                data['date_de_reserv'],
+                date_reserve,
+                data['nomcli']
+            ))
+
+            maj_clients(cursor, data['nomcli'], existante['nomcli'] if existante else None)
+            version = bump_version(cursor, 'reservations')
+            conn.commit()
+            reservation = {
+                'idreserv': data['idreserv'],
+                'idtable': data['idtable'],
+                'date_de_reserv': data['date_de_reserv'],
+                'date_reserve': date_reserve,
+                'nomcli': data['nomcli']
+            }
+            floor_state.upsert_reservation(reservation, version)
+            event_bus.publier('reservations', 'reservation', reservation, version)
+            return jsonify({'message': 'Réservation créée'}), 201
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/reservations/<idreserv>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get('reservations', 'tables')
+def manage_reservation(idreserv):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if request.method == 'GET':
+            cursor.execute("""
+                SELECT r.*, t.designation 
+                FROM reserver r
+                JOIN restaurant_tables t ON r.idtable = t.idtable
+                WHERE r.idreserv = %s
+            """, (idreserv,))
+            
+            reservation = cursor.fetchone()
+            if not reservation:
+                return jsonify({'error': 'Réservation non trouvée'}), 404
+                
+            return jsonify(reservation)
+            
+        elif request.method == 'PUT':
+            data = request.json
+            
+            # Vérifier si la réservation existe
+            cursor.execute("SELECT * FROM reserver WHERE idreserv = %s", (idreserv,))
+            existante = cursor.fetchone()
+            if not existante:
+                return jsonify({'error': 'Réservation non trouvée'}), 404
+                
+            # Vérification que la table existe
+            if 'idtable' in data:
+                cursor.execute("SELECT * FROM restaurant_tables WHERE idtable = %s", (data['idtable'],))
+                if not cursor.fetchone():
+                    return jsonify({'error': 'Table introuvable'}), 404
+            
+            # Date de fin de réservation (par défaut +2h si non fournie)
+            date_de_reserv = data.get('date_de_reserv')
+            date_reserve = data.get('date_reserve')
+            
+            if date_de_reserv and not date_reserve:
+                try:
+                    date_obj = datetime.datetime.fromisoformat(date_de_reserv.replace('Z', '+00:00'))
+                except ValueError:
+                    return jsonify({'error': 'Format de date invalide'}), 400
+
+                date_reserve = (date_obj + datetime.timedelta(hours=2)).isoformat()
+            
+            # Vérification des conflits si les dates ou tables ont changé
+            if (date_de_reserv or date_reserve or 'idtable' in data):
+                # Récupérer les valeurs actuelles pour comparaison
+                cursor.execute("""
+                    SELECT idtable, date_de_reserv, date_reserve
+                    FROM reserver
+                    WHERE idreserv = %s
+                """, (idreserv,))
+                current = cursor.fetchone()
+                
+                # N'utiliser les nouvelles valeurs que si elles sont fournies
+                new_idtable = data.get('idtable', current['idtable'])
+                new_date_de_reserv = date_de_reserv or current['date_de_reserv'].isoformat() if isinstance(current['date_de_reserv'], datetime.datetime) else current['date_de_reserv']
+                new_date_reserve = date_reserve or current['date_reserve'].isoformat() if isinstance(current['date_reserve'], datetime.datetime) else current['date_reserve']
+                
+                # Vérifier les conflits uniquement si quelque chose a changé
+                if (new_idtable != current['idtable'] or 
+                    new_date_de_reserv != current['date_de_reserv'] or 
+                    new_date_reserve != current['date_reserve']):
+                    
+                    if reservation_en_conflit(cursor, new_idtable, new_date_de_reserv, new_date_reserve, idreserv):
+                        return jsonify({'error': 'Conflit de réservation: la table est déjà réservée pour cette période'}), 400
+            
+            # Construction dynamique de la requête de mise à jour
+            update_fields = []
+            params = []
+            
+            if 'idtable' in data:
+                update_fields.append("idtable = %s")
+                params.append(data['idtable'])
+            
+            if date_de_reserv:
+                update_fields.append("date_de_reserv = %s")
+                params.append(date_de_reserv)
+            
+            if date_reserve:
+                update_fields.append("date_reserve = %s")
+                params.append(date_reserve)
+            
+            if 'nomcli' in data:
+                update_fields.append("nomcli = %s")
+                params.append(data['nomcli'])
+            
+            if not update_fields:
+                return jsonify({'message': 'Aucune modification effectuée'}), 200
+            
+            # Ajout de l'ID de réservation à la fin des paramètres
+            params.append(idreserv)
+            
+            # Exécution de la requête de mise à jour
+            cursor.execute(
+                f"UPDATE reserver SET {', '.join(update_fields)} WHERE idreserv = %s",
+                params
+            )
+            version = bump_version(cursor, 'reservations')
+            cursor.execute("SELECT * FROM reserver WHERE idreserv = %s", (idreserv,))
+            reservation = cursor.fetchone()
+            if 'nomcli' in data:
+                maj_clients(cursor, existante['nomcli'], reservation['nomcli'])
+            
+            conn.commit()
+            floor_state.upsert_reservation(reservation, version)
+            event_bus.publier('reservations', 'reservation', reservation, version)
+            return jsonify({'message': f'Réservation {idreserv} mise à jour'})
+            
+        elif request.method == 'DELETE':
+            # Vérifier si la réservation existe
+            cursor.execute("SELECT * FROM reserver WHERE idreserv = %s", (idreserv,))
+            existante = cursor.fetchone()
+            if not existante:
+                return jsonify({'error': 'Réservation non trouvée'}), 404
+            
+            # Suppression
+            cursor.execute("DELETE FROM reserver WHERE idreserv = %s", (idreserv,))
+            maj_clients(cursor, existante['nomcli'])
+            version = bump_version(cursor, 'reservations')
+            conn.commit()
+            floor_state.remove_reservation(idreserv, version)
+            event_bus.publier('reservations', 'reservation_supprimee', {'idreserv': idreserv}, version)
+            return jsonify({'message': f'Réservation {idreserv} supprimée'}), 200
+
+    except Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+def fin_par_defaut(date_debut):
+    # Fin de créneau par défaut : début + 2h
+    date_debut_obj = datetime.datetime.fromisoformat(date_debut.replace('Z', '+00:00'))
+    return (date_debut_obj + datetime.timedelta(hours=2)).isoformat()
+
+# Route pour vérifier la disponibilité des tables pour une ou plusieurs périodes.
+# Lecture seule : la colonne occupation n'est plus modifiée par cette route.
+#   ?date_debut=...&date_fin=...            -> liste des tables (format historique)
+#   ?creneaux=debut/fin,debut/fin           -> une entrée par créneau
+#   &tables=T1,T2                           -> restreint aux tables indiquées
+@routes.route('/disponibilite-tables', methods=['GET'])
+@conditional_get('tables', 'reservations')
+def check_disponibilite():
+    creneaux_param = request.args.get('creneaux')
+    date_debut = request.args.get('date_debut')
+
+    if not creneaux_param and not date_debut:
+        return jsonify({'error': 'date_debut est requise'}), 400
+
+    try:
+        if creneaux_param:
+            creneaux = []
+            for creneau in creneaux_param.split(','):
+                debut, _, fin = creneau.strip().partition('/')
+                creneaux.append((debut, fin or fin_par_defaut(debut)))
+        else:
+            creneaux = [(date_debut, request.args.get('date_fin') or fin_par_defaut(date_debut))]
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
+
+    tables_filtre = [t for t in request.args.get('tables', '').split(',') if t]
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # Une seule requête pour toutes les tables et tous les créneaux :
+        # les créneaux forment une table dérivée, le test de chevauchement
+        # est une semi-jointure servie par l'index (idtable, date_de_reserv, date_reserve)
+        fenetres = " UNION ALL ".join(["SELECT %s as idx, CAST(%s AS DATETIME) as debut, CAST(%s AS DATETIME) as fin"] * len(creneaux))
+        params = []
+        for idx, (debut, fin) in enumerate(creneaux):
+            params.extend([idx, debut, fin])
+
+        sql = f"""
+            SELECT w.idx, t.*,
+                EXISTS (
+                    SELECT 1 FROM reserver r
+                    WHERE r.idtable = t.idtable
+                    AND r.date_de_reserv < w.fin
+                    AND r.date_reserve > w.debut
+                ) as est_occupee
+            FROM restaurant_tables t
+            CROSS JOIN ({fenetres}) w
+        """
+        if tables_filtre:
+            sql += f" WHERE t.idtable IN ({', '.join(['%s'] * len(tables_filtre))})"
+            params.extend(tables_filtre)
+        sql += " ORDER BY w.idx, t.idtable"
+
+        cursor.execute(sql, params)
+
+        resultats = [[] for _ in creneaux]
+        for table in cursor.fetchall():
+            idx = table.pop('idx')
+            table['est_occupee'] = bool(table['est_occupee'])
+            table['est_disponible'] = not table['est_occupee']
+            resultats[idx].append(table)
+
+        if not creneaux_param:
+            return jsonify(resultats[0])
+
+        return jsonify([
+            {'date_debut': debut, 'date_fin': fin, 'tables': tables}
+            for (debut, fin), tables in zip(creneaux, resultats)
+        ])
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# ===== STATISTIQUES =====
+# Les statistiques sont lues dans les agrégats ventes_jour (voir ventes.py)
+
+# Nombre maximal de périodes d'une série de recettes (?granularite=jour sur des années...)
+STATS_MAX_PERIODES = 1000
+
+def parametres_stats(args):
+    # Filtre ?date_debut=&date_fin= (AAAA-MM-JJ) et ?granularite=jour|semaine|mois ;
+    # sans date, la série porte sur les 6 derniers mois
+    try:
+        debut = datetime.date.fromisoformat(args['date_debut']) if args.get('date_debut') else None
+        fin = datetime.date.fromisoformat(args['date_fin']) if args.get('date_fin') else None
+    except ValueError:
+        raise ValueError('Format de date invalide')
+
+    granularite = args.get('granularite', 'mois')
+    if granularite not in GRANULARITES:
+        raise ValueError(f"granularite doit valoir {', '.join(GRANULARITES)}")
+
+    debut_serie, fin_serie = bornes_serie(debut, fin)
+    if debut_serie > fin_serie:
+        raise ValueError('date_debut doit précéder date_fin')
+    if nombre_periodes(debut_serie, fin_serie, granularite) > STATS_MAX_PERIODES:
+        raise ValueError(f"Période trop longue : {STATS_MAX_PERIODES} périodes au plus, "
+                         f"choisir une granularité plus large")
+
+    return debut, fin, granularite
+
+def bornes_serie(debut, fin):
+    # Borne manquante de la série : aujourd'hui pour la fin, 6 mois calendaires
+    # avant la fin pour le début (avant date_fin si elle seule est donnée)
+    fin = fin or datetime.date.today()
+    return debut or derniers_mois(6, fin)[0], fin
+
+def filtre_jours(debut, fin):
+    conditions = []
+    params = []
+    if debut:
+        conditions.append("v.jour >= %s")
+        params.append(debut)
+    if fin:
+        conditions.append("v.jour <= %s")
+        params.append(fin)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+@routes.route('/stats/recettes', methods=['GET'])
+@conditional_get('commandes', 'menu', horodatage='%Y-%m-%d')
+def get_stats():
+    try:
+        debut, fin, granularite = parametres_stats(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    where, params = filtre_jours(debut, fin)
+    debut_6mois, fin_6mois = derniers_mois(6)
+
+    # Requêtes indépendantes, exécutées en parallèle sur des connexions distinctes
+    resultats, erreurs = lectures_paralleles({
+        # Recette totale
+        'total': requete("SELECT SUM(v.montant) as total FROM ventes_jour v" + where, params, un=True),
+
+        # Recettes des 6 derniers mois calendaires
+        'recettes_6mois': lambda cursor: serie_recettes(cursor, debut_6mois, fin_6mois, 'mois'),
+
+        # Série sur la période demandée (6 derniers mois par défaut)
+        'recettes': lambda cursor: serie_recettes(cursor, *bornes_serie(debut, fin), granularite),
+
+        # Plats les plus vendus
+        'top_plats': requete("""
+            SELECT 
+                m.idplat,
+                m.nomplat,
+                SUM(v.quantite) as quantite,
+                SUM(v.montant) as chiffre_affaires
+            FROM ventes_jour v
+            JOIN menu m ON v.idplat = m.idplat
+        """ + where + """
+            GROUP BY m.idplat, m.nomplat
+            ORDER BY quantite DESC
+            LIMIT 10
+        """, params),
+
+        # Statistiques par type de commande (nombre de lignes de commande, comme auparavant)
+        'stats_par_type': requete("""
+            SELECT 
+                v.typecom,
+                SUM(v.nb_lignes) as nombre,
+                SUM(v.montant) as montant
+            FROM ventes_jour v
+        """ + where + """
+            GROUP BY v.typecom
+        """, params),
+
+        # Statistiques par jour de la semaine
+        'stats_par_jour': requete("""
+            SELECT 
+                DAYNAME(v.jour) as jour,
+                SUM(v.nb_lignes) as nombre,
+                SUM(v.montant) as montant
+            FROM ventes_jour v
+        """ + where + """
+            GROUP BY DAYNAME(v.jour)
+            ORDER BY FIELD(DAYNAME(v.jour), 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+        """, params),
+    })
+
+    if not resultats:
+        return jsonify({'error': 'Statistiques indisponibles', 'erreurs': erreurs}), 500
+
+    # Résultat partiel : les parties en erreur valent null et sont listées dans 'erreurs'
+    reponse = {
+        'total': (resultats['total']['total'] or 0) if 'total' in resultats else None,
+        'recettes_6mois': [
+            {'mois': r['periode'], 'montant': r['montant']} for r in resultats['recettes_6mois']
+        ] if 'recettes_6mois' in resultats else None,
+        'recettes': resultats.get('recettes'),
+        'top_plats': resultats.get('top_plats'),
+        'stats_par_type': resultats.get('stats_par_type'),
+        'stats_par_jour': resultats.get('stats_par_jour')
+    }
+    if erreurs:
+        reponse['erreurs'] = erreurs
+    return jsonify(reponse)
+
+@routes.route('/stats/histogramme', methods=['GET'])
+@conditional_get('commandes', horodatage='%Y-%m-%d')
+def get_histogramme():
+    try:
+        debut, fin, granularite = parametres_stats(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # 6 derniers mois calendaires par défaut, toutes les périodes présentes (montant 0 si aucune vente)
+        recettes = serie_recettes(cursor, *bornes_serie(debut, fin), granularite)
+
+        if granularite == 'mois':
+            for recette in recettes:
+                recette['mois'] = recette['periode']
+                recette['mois_format'] = recette['libelle']
+
+        return jsonify(recettes)
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.cli.command('rebuild-clients')
+def rebuild_clients_command():
+    """Recalcule la table clients_resume depuis les commandes et réservations."""
+    conn = get_db_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        lignes = reconstruire_clients(cursor)
+        conn.commit()
+        print(f"clients_resume reconstruite : {lignes} lignes")
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.cli.command('rebuild-ventes')
+def rebuild_ventes_command():
+    """Recalcule la table ventes_jour depuis l'historique des commandes."""
+    conn = get_db_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        lignes = reconstruire_ventes(cursor)
+        conn.commit()
+        print(f"ventes_jour reconstruite : {lignes} lignes")
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.cli.command('import-factures')
+@click.option('--supprimer', is_flag=True, help="Supprime les fichiers une fois archivés.")
+def import_factures_command(supprimer):
+    """Importe dans l'archive les factures facture_<idcom>.pdf de FACTURES_DIR."""
+    conn = get_db_pool().acquire()
+    cursor = conn.cursor(dictionary=True)
+    importees = 0
+    try:
+        for nom in sorted(os.listdir(FACTURES_DIR)):
+            if not (nom.startswith('facture_') and nom.endswith('.pdf')):
+                continue
+            idcom = nom[len('facture_'):-len('.pdf')]
+            chemin = os.path.join(FACTURES_DIR, nom)
+
+            # Empreinte des données actuelles : la facture reste servie tant
+            # que la commande n'a pas changé (empreinte nulle si elle n'existe plus)
+            commande, plats = charger_facture(cursor, idcom)
+            empreinte = empreinte_facture(commande, plats) if commande else None
+
+            with open(chemin, 'rb') as f:
+                facture_archive.put(idcom, empreinte, f.read())
+            if supprimer:
+                os.remove(chemin)
+            importees += 1
+    finally:
+        cursor.close()
+        conn.close()
+    print(f"Factures importées : {importees}")
+
+@routes.cli.command('requetes-top')
+@click.option('--tri', type=click.Choice(list(TRIS_REQUETES)), default='total', show_default=True)
+@click.option('--limite', type=int, default=20, show_default=True)
+def requetes_top_command(tri, limite):
+    """Affiche les empreintes SQL les plus coûteuses (instantanés de METRICS_DIR)."""
+    for stats in journal_requetes.top(TRIS_REQUETES[tri], limite):
+        print(f"{stats['total_ms']:>12.1f} ms  {stats['nombre']:>8}x  moy {stats['moyenne_ms']:>9.3f} ms  "
+              f"max {stats['max_ms']:>9.3f} ms  {stats['empreinte']}  {stats['requete'][:120]}")
+
+@routes.cli.command('compact-factures')
+def compact_factures_command():
+    """Compacte l'archive des factures (dernière version de chaque commande, limites de taille et d'âge)."""
+    conservees, evincees, liberes = facture_archive.compacter()
+    print(f"Archive compactée : {conservees} factures, {evincees} évincées, {liberes} octets libérés")
+
+# ===== RECHERCHE =====
+@routes.route('/recherche/menu', methods=['GET'])
+@conditional_get('menu', 'commandes')
+def recherche_menu():
+    terme = request.args.get('terme', '')
+
+    if not terme:
+        return jsonify([])
+
+    try:
+        # Plats classés par pertinence depuis l'index du cache du menu
+        resultats = [dict(plat, pertinence=score)
+                     for plat, score in menu_cache.recherche(get_db_connection, terme)]
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+
+    if not resultats:
+        return jsonify([])
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        # Statistiques de vente lues dans le compteur par plat, en une requête
+        cursor.execute(f"""
+            SELECT idplat, nb_ventes
+            FROM plats_ventes
+            WHERE idplat IN ({', '.join(['%s'] * len(resultats))})
+        """, [plat['idplat'] for plat in resultats])
+        ventes = {row['idplat'].casefold(): row['nb_ventes'] for row in cursor.fetchall()}
+
+        for plat in resultats:
+            plat['nb_ventes'] = ventes.get(plat['idplat'].casefold()) or 0
+        
+        return jsonify(resultats)
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@routes.route('/recherche/clients', methods=['GET'])
+@conditional_get('commandes', 'reservations')
+def recherche_clients():
+    # Classement par pertinence, sauf si un tri explicite est demandé
+    try:
+        order_by, pagination, pagination_params = tri_pagination_clients(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    terme = request.args.get('terme', '')
+
+    if not terme:
+        return jsonify([])
+
+    try:
+        noms = client_search.search(get_db_connection, terme)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+
+    pertinence = dict(noms)
+    if 'tri' not in request.args and pagination:
+        limit, offset = pagination_params
+        noms = noms[offset:offset + limit]
+        pagination, pagination_params = '', []
+
+    if not noms:
+        return jsonify([])
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        cursor.execute(f"""
+            SELECT nomcli, nb_commandes, derniere_visite, total_depense, nb_reservations
+            FROM clients_resume
+            WHERE nomcli IN ({', '.join(['%s'] * len(noms))})
+            AND nb_commandes > 0
+            ORDER BY {order_by}
+        """ + pagination, [nom for nom, _ in noms] + pagination_params)
+        clients = cursor.fetchall()
+
+        for client in clients:
+            client['pertinence'] = pertinence.get(client['nomcli'].casefold(), 0)
+        if 'tri' not in request.args:
+            clients.sort(key=lambda c: -c['pertinence'])
+        
+        return jsonify(clients)
+
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# ===== COMPTABILITÉ =====
+COLONNES_GRAND_LIVRE = ['idcom', 'datecom', 'nomcli', 'typecom', 'idplat', 'nomplat',
+                        'quantite', 'prix_unitaire', 'total']
+
+def valeur_grand_livre(valeur):
+    # default de json.dumps : dates en ISO 8601 comme dans le CSV, Decimal en texte
+    if isinstance(valeur, datetime.date):
+        return valeur.isoformat()
+    return str(valeur)
+
+def encoder_grand_livre(rows, format):
+    # Un morceau de texte par paquet de lignes lu sur le curseur serveur
+    if format == 'csv':
+        tampon = io.StringIO()
+        writer = csv.writer(tampon, lineterminator='\n')
+        for row in rows:
+            writer.writerow([v.isoformat() if isinstance(v, datetime.date) else v for v in row])
+        return tampon.getvalue()
+    return ''.join(
+        json.dumps(dict(zip(COLONNES_GRAND_LIVRE, row)), ensure_ascii=False,
+                   default=valeur_grand_livre) + '\n'
+        for row in rows
+    )
+
+@routes.route('/comptabilite/grand-livre', methods=['GET'])
+def export_grand_livre():
+    # Une ligne par plat commandé, en flux depuis une seule requête non bufferisée :
+    # la mémoire utilisée ne dépend pas de la période demandée
+    format = request.args.get('format', 'csv')
+    if format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format doit valoir csv ou ndjson'}), 400
+    compresse = request.args.get('gzip', 'false').lower() == 'true'
+
+    conditions = []
+    params = []
+    try:
+        if request.args.get('date_debut'):
+            conditions.append("c.datecom >= %s")
+            params.append(datetime.date.fromisoformat(request.args['date_debut']))
+        if request.args.get('date_fin'):
+            conditions.append("c.datecom <= %s")
+            params.append(datetime.date.fromisoformat(request.args['date_fin']))
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    sql = """
+        SELECT c.idcom, c.datecom, c.nomcli, c.typecom, cp.idplat, m.nomplat,
+            cp.quantite, cp.prix_unitaire, cp.quantite * cp.prix_unitaire as total
+        FROM commande c
+        JOIN commande_plats cp ON cp.idcom = c.idcom
+        JOIN menu m ON cp.idplat = m.idplat
+    """
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY c.datecom, c.idcom, cp.id"
+
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(sql, params)
+    except Error as e:
+        cursor.close()
+        conn.close()
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        # Compression gzip au fil de l'eau si demandée
+        gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compresse else None
+        if format == 'csv':
+            entete = ','.join(COLONNES_GRAND_LIVRE) + '\n'
+            yield gz.compress(entete.encode('utf-8')) if gz else entete.encode('utf-8')
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            morceau = encoder_grand_livre(rows, format).encode('utf-8')
+            if gz:
+                morceau = gz.compress(morceau)
+            if morceau:
+                yield morceau
+        if gz:
+            yield gz.flush()
+
+    mimetype = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    filename = f"grand_livre.{format}"
+    if compresse:
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    return reponse_en_flux(conn, cursor, generate, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
+
+# ===== IMPORT EN MASSE =====
+def executer_import(conn, entite, lignes):
+    # Versions et caches : un incrément par lot écrit, invalidation en fin d'import
+    rapport = importer(conn, entite, lignes, IMPORT_BATCH_SIZE,
+                       fin_lot=lambda cursor: bump_version(cursor, entite))
+    if rapport['importees']:
+        menu_cache.invalidate()
+        floor_state.invalidate()
+        file_cuisine.invalidate()
+    return rapport
+
+@routes.route('/import/<entite>', methods=['POST'])
+def import_donnees(entite):
+    # Corps CSV (en-tête obligatoire) ou NDJSON, lu au fil de la réception
+    if entite not in ENTITES:
+        return jsonify({'error': f"Entité inconnue : {entite}"}), 404
+
+    format = request.args.get('format')
+    if format is None:
+        format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    if format not in FORMATS:
+        return jsonify({'error': f"format doit valoir {', '.join(FORMATS)}"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        return jsonify(executer_import(conn, entite, lire_lignes(request.stream, format)))
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@routes.cli.command('import-donnees')
+@click.argument('entite', type=click.Choice(ENTITES))
+@click.argument('fichier', type=click.File('rb'))
+@click.option('--format', 'format', type=click.Choice(FORMATS), default=None,
+              help="Format du fichier (par défaut selon l'extension).")
+def import_donnees_command(entite, fichier, format):
+    """Importe un fichier CSV ou NDJSON (« - » pour l'entrée standard)."""
+    if format is None:
+        format = 'csv' if fichier.name.endswith('.csv') else 'ndjson'
+    conn = get_db_pool().acquire()
+    try:
+        rapport = executer_import(conn, entite, lire_lignes(fichier, format))
+    finally:
+        conn.close()
+    print(json.dumps(rapport, ensure_ascii=False, indent=2, default=str))
+
+# Point d'entrée de l'application
+if __name__ == '__main__':
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,377 @@
+"""Archive des factures PDF : fichiers pack en ajout seul et index des positions.
+
+Chaque facture est ajoutée à la fin du pack courant (``pack-000001.dat``, ...),
+précédée d'un en-tête qui la décrit. L'index trié ``index.idx`` (entrées de
+taille fixe) est projeté en mémoire et parcouru par dichotomie ; les ajouts
+faits depuis le dernier compactage sont dans ``journal.idx``. Seule la
+dernière version de chaque commande est servie, ``compacter()`` supprime les
+autres ainsi que les factures évincées (plus anciennes que ``max_age`` ou les
+plus anciennes au-delà de ``max_bytes``) ; une facture évincée est rendue de
+nouveau à la demande.
+"""
+import contextlib
+import fcntl
+import io
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+
+# En-tête d'une facture dans un pack : magie, longueur de la clé, empreinte, taille
+ENTETE = struct.Struct('>4sH32sI')
+MAGIE = b'FACT'
+
+# Entrée d'index : clé, empreinte, numéro de pack, position, taille, date d'écriture (s)
+ENTREE = struct.Struct('>48s32sIQII')
+TAILLE_CLE = 48
+
+# Factures importées dont l'empreinte n'est pas connue
+EMPREINTE_NULLE = bytes(32)
+
+_PACK = re.compile(r'^pack-(\d{6})\.dat$')
+
+
+def cle_facture(idcom):
+    # idcom comparés sans casse, comme la collation de la base
+    cle = idcom.lower().encode('utf-8')
+    if not cle or len(cle) > TAILLE_CLE or b'\0' in cle:
+        raise ValueError(f"Code commande invalide pour l'archive : {idcom!r}")
+    return cle
+
+
+class Tranche(io.RawIOBase):
+    """Facture lue directement dans son pack, sans la charger en mémoire.
+
+    Le descripteur reste positionné sur la facture : via ``wsgi.file_wrapper``,
+    un serveur comme gunicorn l'envoie avec sendfile (sans copie).
+    """
+
+    def __init__(self, chemin, position, taille):
+        self._f = open(chemin, 'rb', buffering=0)
+        self._debut = position
+        self._taille = taille
+        self._pos = 0
+        self._f.seek(position)
+
+    def __len__(self):
+        return self._taille
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self._taille
+        self._pos = max(0, min(pos, self._taille))
+        self._f.seek(self._debut + self._pos)
+        return self._pos
+
+    def readinto(self, b):
+        n = min(len(b), self._taille - self._pos)
+        if n <= 0:
+            return 0
+        lu = self._f.readinto(memoryview(b)[:n])
+        self._pos += lu
+        return lu
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+class ArchiveFactures:
+    """Factures PDF rangées par commande dans ``dossier``.
+
+    Partageable entre processus : les écritures et le compactage prennent un
+    verrou exclusif (flock), les lectures un verrou partagé, et chaque lecture
+    reprend les ajouts des autres processus. Au-delà de ``max_bytes`` octets
+    de packs, un ajout déclenche un compactage qui ramène l'archive sous
+    ``RESTE_APRES_EVICTION`` de cette limite ; les factures écrites depuis
+    plus de ``max_age`` secondes sont évincées au compactage (0 : pas de limite).
+    """
+
+    # Fraction de max_bytes conservée par un compactage, pour ne pas en relancer
+    # un à chaque ajout suivant
+    RESTE_APRES_EVICTION = 0.9
+
+    def __init__(self, dossier, pack_max=256 * 1024 * 1024, max_bytes=0, max_age=0):
+        self.dossier = dossier
+        self.pack_max = pack_max
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._fd_verrou = None
+        self._index = None
+        self._index_id = None
+        self._journal = {}
+        self._journal_id = None
+        self._journal_lu = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def reinitialiser(self):
+        # Processus fils : un flock pris sur le descripteur hérité serait partagé avec
+        # le parent (même description de fichier), et le verrou a pu être copié pris
+        if self._fd_verrou is not None:
+            os.close(self._fd_verrou)
+        self._fd_verrou = None
+        self._lock = threading.Lock()
+
+    # ----- Fichiers -----
+    def _chemin(self, nom):
+        return os.path.join(self.dossier, nom)
+
+    def _chemin_pack(self, numero):
+        return self._chemin(f"pack-{numero:06d}.dat")
+
+    def _taille_packs(self, packs):
+        return sum(os.path.getsize(self._chemin_pack(n)) for n in packs)
+
+    def _packs(self):
+        try:
+            noms = os.listdir(self.dossier)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_PACK.match, noms) if m)
+
+    @contextlib.contextmanager
+    def _verrou(self, mode):
+        with self._lock:
+            if self._fd_verrou is None:
+                os.makedirs(self.dossier, exist_ok=True)
+                self._fd_verrou = os.open(self._chemin('verrou'), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd_verrou, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd_verrou, fcntl.LOCK_UN)
+
+    # ----- Index -----
+    def _rafraichir(self):
+        # Index remplacé par un compactage, entrées ajoutées au journal par d'autres processus
+        try:
+            st = os.stat(self._chemin('index.idx'))
+            ident = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            st = ident = None
+        if ident != self._index_id:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            if st and st.st_size:
+                with open(self._chemin('index.idx'), 'rb') as f:
+                    self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_id = ident
+
+        try:
+            st = os.stat(self._chemin('journal.idx'))
+        except FileNotFoundError:
+            st = None
+        ident = st.st_ino if st else None
+        if ident != self._journal_id:
+            self._journal = {}
+            self._journal_lu = 0
+            self._journal_id = ident
+        if st and st.st_size - self._journal_lu >= ENTREE.size:
+            with open(self._chemin('journal.idx'), 'rb') as f:
+                f.seek(self._journal_lu)
+                donnees = f.read(st.st_size - self._journal_lu)
+            n = len(donnees) // ENTREE.size
+            for i in range(n):
+                cle, *entree = ENTREE.unpack_from(donnees, i * ENTREE.size)
+                self._journal[cle.rstrip(b'\0')] = tuple(entree)
+            self._journal_lu += n * ENTREE.size
+
+    def _entrees_index(self):
+        if self._index is None:
+            return
+        for i in range(len(self._index) // ENTREE.size):
+            cle, *entree = ENTREE.unpack_from(self._index, i * ENTREE.size)
+            yield cle.rstrip(b'\0'), tuple(entree)
+
+    def _chercher(self, cle):
+        entree = self._journal.get(cle)
+        if entree is not None or self._index is None:
+            return entree
+
+        # Dichotomie sur les clés de l'index trié, sans le charger
+        bas, haut = 0, len(self._index) // ENTREE.size
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            debut = milieu * ENTREE.size
+            courante = self._index[debut:debut + TAILLE_CLE].rstrip(b'\0')
+            if courante < cle:
+                bas = milieu + 1
+            elif courante > cle:
+                haut = milieu
+            else:
+                return ENTREE.unpack_from(self._index, debut)[1:]
+        return None
+
+    # ----- Lecture et écriture -----
+    def get(self, idcom, empreinte=None):
+        """Tranche de la facture de ``idcom``, ou None si elle est absente ou
+        a été rendue pour un autre contenu que ``empreinte``."""
+        cle = cle_facture(idcom)
+        with self._verrou(fcntl.LOCK_SH):
+            self._rafraichir()
+            entree = self._chercher(cle)
+            if entree is None or (empreinte and entree[0] != bytes.fromhex(empreinte)):
+                self.misses += 1
+                return None
+            _, pack, position, taille, _ = entree
+            self.hits += 1
+            # Ouverte sous le verrou : un compactage ne peut pas supprimer le pack avant
+            return Tranche(self._chemin_pack(pack), position, taille)
+
+    def put(self, idcom, empreinte, contenu):
+        cle = cle_facture(idcom)
+        brut = bytes.fromhex(empreinte) if empreinte else EMPREINTE_NULLE
+        with self._verrou(fcntl.LOCK_EX):
+            packs = self._packs()
+            numero = packs[-1] if packs else 1
+            if packs and os.path.getsize(self._chemin_pack(numero)) >= self.pack_max:
+                numero += 1
+
+            with open(self._chemin_pack(numero), 'ab') as f:
+                debut = f.seek(0, io.SEEK_END)
+                f.write(ENTETE.pack(MAGIE, len(cle), brut, len(contenu)) + cle)
+                f.write(contenu)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Le journal n'est écrit qu'une fois la facture sur disque
+            with open(self._chemin('journal.idx'), 'ab') as f:
+                f.write(ENTREE.pack(cle, brut, numero, debut + ENTETE.size + len(cle), len(contenu),
+                                    int(time.time())))
+                f.flush()
+                os.fsync(f.fileno())
+            depasse = self.max_bytes and self._taille_packs(self._packs()) > self.max_bytes
+
+        if depasse:
+            self.compacter()
+        return f"facture_{idcom}.pdf"
+
+    def lire(self, idcom, empreinte=None):
+        tranche = self.get(idcom, empreinte)
+        if tranche is None:
+            return None
+        with tranche:
+            return tranche.read()
+
+    # ----- Maintenance -----
+    def _evincer(self, vivantes):
+        # Factures trop anciennes, puis les plus anciennes tant que la limite de taille est dépassée
+        evincees = set()
+        if self.max_age:
+            limite = time.time() - self.max_age
+            evincees.update(cle for cle, entree in vivantes.items() if entree[4] < limite)
+        if self.max_bytes:
+            reste = self.max_bytes * self.RESTE_APRES_EVICTION
+            taille = sum(ENTETE.size + len(cle) + entree[3] for cle, entree in vivantes.items()
+                         if cle not in evincees)
+            for cle in sorted(vivantes, key=lambda c: (vivantes[c][4], c)):
+                if taille <= reste:
+                    break
+                if cle not in evincees:
+                    evincees.add(cle)
+                    taille -= ENTETE.size + len(cle) + vivantes[cle][3]
+        return evincees
+
+    def compacter(self):
+        """Réécrit les seules versions courantes et non évincées dans de nouveaux
+        packs triés et reconstruit l'index. Renvoie (factures conservées,
+        factures évincées, octets libérés)."""
+        with self._verrou(fcntl.LOCK_EX):
+            self._rafraichir()
+            anciens = self._packs()
+            taille_avant = self._taille_packs(anciens)
+
+            vivantes = dict(self._entrees_index())
+            vivantes.update(self._journal)
+            evincees = self._evincer(vivantes)
+            for cle in evincees:
+                del vivantes[cle]
+            self.evictions += len(evincees)
+
+            numero = (anciens[-1] if anciens else 0) + 1
+            sortie = None
+            entrees = []
+            try:
+                for cle in sorted(vivantes):
+                    brut, pack, position, taille, ecrite_le = vivantes[cle]
+                    if sortie is None or sortie.tell() >= self.pack_max:
+                        if sortie is not None:
+                            self._fermer_pack(sortie)
+                            numero += 1
+                        sortie = open(self._chemin_pack(numero), 'xb')
+
+                    with open(self._chemin_pack(pack), 'rb') as f:
+                        f.seek(position)
+                        contenu = f.read(taille)
+                    debut = sortie.tell()
+                    sortie.write(ENTETE.pack(MAGIE, len(cle), brut, taille) + cle)
+                    sortie.write(contenu)
+                    entrees.append(ENTREE.pack(cle, brut, numero, debut + ENTETE.size + len(cle), taille,
+                                               ecrite_le))
+            finally:
+                if sortie is not None:
+                    self._fermer_pack(sortie)
+
+            self._remplacer('index.idx', b''.join(entrees))
+            self._remplacer('journal.idx', b'')
+            for n in anciens:
+                os.remove(self._chemin_pack(n))
+            self._rafraichir()
+
+            taille_apres = self._taille_packs(self._packs())
+            return len(entrees), len(evincees), taille_avant - taille_apres
+
+    @staticmethod
+    def _fermer_pack(f):
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+
+    def _remplacer(self, nom, donnees):
+        # Écriture atomique : fichier temporaire puis renommage
+        fd, temporaire = tempfile.mkstemp(dir=self.dossier, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(donnees)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporaire, self._chemin(nom))
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+
+    def stats(self):
+        with self._verrou(fcntl.LOCK_SH):
+            self._rafraichir()
+            packs = self._packs()
+            return {
+                'packs': len(packs),
+                'taille': self._taille_packs(packs),
+                'entrees_index': len(self._index) // ENTREE.size if self._index is not None else 0,
+                'entrees_journal': len(self._journal),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,144 @@
+"""Compare l'ancienne et la nouvelle détection de conflits de réservation.
+
+Charge N réservations historiques dans deux tables temporaires :
+- ``bench_reserver_ancien`` : index simple sur ``idtable`` et prédicat à trois BETWEEN ;
+- ``bench_reserver_nouveau`` : index ``(idtable, date_de_reserv, date_reserve)`` et
+  prédicat semi-ouvert ``date_de_reserv < fin AND date_reserve > debut``.
+
+Usage : python bench/bench_reservations.py --reservations 100000 --requetes 2000
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+import mysql.connector
+
+ANCIEN = """
+    SELECT COUNT(*) FROM bench_reserver_ancien
+    WHERE idtable = %s AND (
+        (%s BETWEEN date_de_reserv AND date_reserve) OR
+        (%s BETWEEN date_de_reserv AND date_reserve) OR
+        (date_de_reserv BETWEEN %s AND %s)
+    )
+    AND idreserv != %s
+"""
+
+NOUVEAU = """
+    SELECT 1 FROM bench_reserver_nouveau
+    WHERE idtable = %s
+    AND date_de_reserv < %s
+    AND date_reserve > %s
+    AND idreserv != %s
+    LIMIT 1
+"""
+
+SCHEMA = """
+    CREATE TEMPORARY TABLE {nom} (
+        idreserv varchar(10) NOT NULL PRIMARY KEY,
+        idtable varchar(10) NOT NULL,
+        date_de_reserv datetime NOT NULL,
+        date_reserve datetime NOT NULL,
+        nomcli varchar(50) NOT NULL,
+        {index}
+    ) ENGINE=InnoDB
+"""
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.environ.get('DB_HOST', 'localhost'),
+        user=os.environ.get('DB_USER', 'root'),
+        password=os.environ.get('DB_PASSWORD', ''),
+        database=os.environ.get('DB_NAME', 'restaurant_db'),
+        port=int(os.environ.get('DB_PORT', 3306))
+    )
+
+
+def generer(n, nb_tables, debut, jours, rng):
+    for i in range(n):
+        start = debut + datetime.timedelta(minutes=rng.randrange(jours * 24 * 60))
+        fin = start + datetime.timedelta(minutes=rng.choice((60, 90, 120, 180)))
+        yield (f'B{i}', f'T{rng.randrange(nb_tables)}', start, fin, f'Client {rng.randrange(5000)}')
+
+
+def charger(cursor, lignes, lot=5000):
+    lot_courant = []
+    for ligne in lignes:
+        lot_courant.append(ligne)
+        if len(lot_courant) == lot:
+            for nom in ('bench_reserver_ancien', 'bench_reserver_nouveau'):
+                cursor.executemany(
+                    f"INSERT INTO {nom} VALUES (%s, %s, %s, %s, %s)", lot_courant)
+            lot_courant = []
+    if lot_courant:
+        for nom in ('bench_reserver_ancien', 'bench_reserver_nouveau'):
+            cursor.executemany(f"INSERT INTO {nom} VALUES (%s, %s, %s, %s, %s)", lot_courant)
+
+
+def mesurer(cursor, sql, sondes, params):
+    durees = []
+    conflits = 0
+    for sonde in sondes:
+        t0 = time.perf_counter()
+        cursor.execute(sql, params(sonde))
+        row = cursor.fetchone()
+        durees.append(time.perf_counter() - t0)
+        if row and row[0]:
+            conflits += 1
+    durees.sort()
+    return {
+        'total_ms': sum(durees) * 1000,
+        'moyenne_ms': sum(durees) * 1000 / len(durees),
+        'p95_ms': durees[int(len(durees) * 0.95) - 1] * 1000,
+        'conflits': conflits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reservations', type=int, default=100000)
+    parser.add_argument('--tables', type=int, default=50)
+    parser.add_argument('--jours', type=int, default=730)
+    parser.add_argument('--requetes', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    debut = datetime.datetime(2024, 1, 1, 11, 0)
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(SCHEMA.format(nom='bench_reserver_ancien', index='KEY idtable (idtable)'))
+    cursor.execute(SCHEMA.format(
+        nom='bench_reserver_nouveau',
+        index='KEY idtable_intervalle (idtable, date_de_reserv, date_reserve)'))
+
+    t0 = time.perf_counter()
+    charger(cursor, generer(args.reservations, args.tables, debut, args.jours, rng))
+    conn.commit()
+    cursor.execute("ANALYZE TABLE bench_reserver_ancien, bench_reserver_nouveau")
+    cursor.fetchall()
+    print(f"{args.reservations} réservations chargées en {time.perf_counter() - t0:.1f}s")
+
+    sondes = [ligne[1:4] for ligne in generer(args.requetes, args.tables, debut, args.jours, rng)]
+
+    ancien = mesurer(cursor, ANCIEN, sondes,
+                     lambda s: (s[0], s[1], s[2], s[1], s[2], ''))
+    nouveau = mesurer(cursor, NOUVEAU, sondes,
+                      lambda s: (s[0], s[2], s[1], ''))
+
+    for nom, res in (('ancien (BETWEEN, index idtable)', ancien),
+                     ('nouveau (semi-ouvert, index composite)', nouveau)):
+        print(f"{nom:42} total {res['total_ms']:9.1f} ms  "
+              f"moyenne {res['moyenne_ms']:7.3f} ms  p95 {res['p95_ms']:7.3f} ms  "
+              f"conflits {res['conflits']}")
+    print(f"gain : x{ancien['total_ms'] / nouveau['total_ms']:.1f}")
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+"""Banc de charge des routes de l'API : latences et requêtes SQL par requête.
+
+Des threads clients (``--concurrence``) envoient pendant ``--duree`` secondes
+un mélange pondéré de lectures et d'écritures sur les routes de backend/app.py
+(listes, détails, création, mise à jour, facture, statistiques, recherche,
+disponibilité...) à un serveur démarré sur une base MySQL locale, de
+préférence remplie par ``generer_donnees.py``. Les identifiants utilisés sont
+lus au démarrage par l'API elle-même.
+
+Pour chaque route : nombre de requêtes, erreurs, p50/p95/p99 et nombre moyen
+de requêtes SQL, tiré des compteurs de ``GET /metrics`` relevés avant et après
+la mesure (le serveur ne doit pas recevoir d'autre trafic pendant ce temps).
+
+Le code de sortie est 1 si une limite est dépassée :
+- ``--seuils`` : fichier JSON {"*" ou "GET /route": {"p95_ms": ..., "sql_par_requete": ...}} ;
+- ``--reference`` : résultats d'une exécution précédente (``--sortie``) ; une
+  valeur de p50/p95/p99 ou sql_par_requete ne doit pas la dépasser de plus de
+  ``--tolerance`` (relative).
+
+Non mesurés : le flux SSE (/evenements), les imports, l'export groupé des
+factures (tâches asynchrones) et les routes de supervision. Les commandes et
+réservations créées sont supprimées à la fin, sauf avec ``--garder``.
+
+Usage : python bench/bench_routes.py --url http://localhost:5000 --concurrence 16 --duree 60 --seuils bench/seuils.json
+"""
+import argparse
+import collections
+import datetime
+import email.utils
+import http.client
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+
+LIMITES = ('p50_ms', 'p95_ms', 'p99_ms', 'sql_par_requete', 'taux_erreur')
+COMPAREES = ('p50_ms', 'p95_ms', 'p99_ms', 'sql_par_requete')
+
+_SERIE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class Client:
+    """Connexion HTTP persistante d'un thread, rouverte après une erreur."""
+
+    def __init__(self, url, timeout=60.0):
+        self.url = urllib.parse.urlsplit(url)
+        self.timeout = timeout
+        self._conn = None
+
+    def envoyer(self, methode, chemin, corps=None):
+        if self._conn is None:
+            classe = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+            self._conn = classe(self.url.netloc, timeout=self.timeout)
+        entetes = {}
+        if corps is not None:
+            corps = json.dumps(corps).encode('utf-8')
+            entetes['Content-Type'] = 'application/json'
+        try:
+            self._conn.request(methode, self.url.path.rstrip('/') + chemin, body=corps, headers=entetes)
+            reponse = self._conn.getresponse()
+            return reponse.status, reponse.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = None
+            raise
+
+    def json(self, chemin):
+        statut, corps = self.envoyer('GET', chemin)
+        if statut != 200:
+            raise RuntimeError(f"GET {chemin} : HTTP {statut}")
+        return json.loads(corps)
+
+
+class Contexte:
+    """Identifiants existants (lus par l'API) et objets créés pendant la mesure."""
+
+    def __init__(self, client, echantillon):
+        self.tables = [t['idtable'] for t in client.json('/tables') if t['idtable']]
+        self.plats = [p['idplat'] for p in client.json('/menu')]
+        commandes = client.json(f'/commandes?limit={echantillon}')['commandes']
+        self.commandes = [c['idcom'] for c in commandes]
+        self.clients = [c['nomcli'] for c in client.json(f'/clients?tri=depense&limit={echantillon}')]
+        if not (self.tables and self.plats and self.commandes and self.clients):
+            raise RuntimeError("Base vide : lancer d'abord bench/generer_donnees.py")
+        # Jours des dernières commandes (filtres des statistiques et des listes)
+        self.jours = sorted({jour_iso(c['datecom']) for c in commandes})
+
+        self.lock = threading.Lock()
+        self.session = uuid.uuid4().hex[:3]
+        self.numero = 0
+        self.commandes_creees = []
+        self.reservations_creees = []
+
+    def identifiant(self):
+        # Identifiants varchar(10) : B<session><numéro en hexadécimal>
+        with self.lock:
+            self.numero += 1
+            return f"B{self.session}{self.numero:x}"
+
+    def ajouter(self, liste, identifiant):
+        with self.lock:
+            liste.append(identifiant)
+
+    def au_hasard(self, liste, rng):
+        with self.lock:
+            return rng.choice(liste) if liste else None
+
+
+def jour_iso(valeur):
+    # Flask sérialise les dates au format HTTP (« Sat, 18 Oct 2025 00:00:00 GMT »)
+    try:
+        return datetime.date.fromisoformat(str(valeur)[:10]).isoformat()
+    except ValueError:
+        return email.utils.parsedate_to_datetime(valeur).date().isoformat()
+
+
+def q(valeur):
+    return urllib.parse.quote(str(valeur), safe='')
+
+
+def creneau(rng):
+    # Deux heures à un service des 30 prochains jours
+    jour = datetime.date.today() + datetime.timedelta(days=rng.randrange(1, 30))
+    debut = datetime.datetime.combine(jour, datetime.time(rng.choice((12, 13, 19, 20, 21))))
+    return debut, debut + datetime.timedelta(hours=2)
+
+
+# ----- Opérations -----
+# fonction(contexte, rng) -> (chemin, corps JSON, fonction appelée si la requête
+# a réussi) ou None si l'opération n'a pas encore d'objet sur lequel porter
+def lecture(chemin):
+    return lambda ctx, rng: (chemin(ctx, rng), None, None)
+
+
+def creer_commande(ctx, rng):
+    idcom = ctx.identifiant()
+    plats = rng.sample(ctx.plats, min(len(ctx.plats), rng.randint(1, 4)))
+    corps = {
+        'idcom': idcom,
+        'nomcli': rng.choice(ctx.clients),
+        'typecom': 'à emporter',
+        'plats': [{'idplat': p, 'quantite': rng.randint(1, 3)} for p in plats],
+    }
+    return '/commandes', corps, lambda: ctx.ajouter(ctx.commandes_creees, idcom)
+
+
+def modifier_commande(ctx, rng):
+    idcom = ctx.au_hasard(ctx.commandes_creees, rng)
+    if idcom is None:
+        return None
+    corps = {'nomcli': rng.choice(ctx.clients), 'typecom': 'à emporter',
+             'statut': rng.choice(('en attente', 'en cours', 'terminé'))}
+    return f'/commandes/{q(idcom)}', corps, None
+
+
+def transition_cuisine(ctx, rng):
+    idcom = ctx.au_hasard(ctx.commandes_creees, rng)
+    if idcom is None:
+        return None
+    return f"/cuisine/{q(idcom)}/{rng.choice(('commencer', 'terminer'))}", None, None
+
+
+def creer_reservation(ctx, rng):
+    idreserv = ctx.identifiant()
+    debut, fin = creneau(rng)
+    corps = {'idreserv': idreserv, 'idtable': rng.choice(ctx.tables), 'nomcli': rng.choice(ctx.clients),
+             'date_de_reserv': debut.isoformat(), 'date_reserve': fin.isoformat()}
+    return '/reservations', corps, lambda: ctx.ajouter(ctx.reservations_creees, idreserv)
+
+
+def modifier_reservation(ctx, rng):
+    idreserv = ctx.au_hasard(ctx.reservations_creees, rng)
+    if idreserv is None:
+        return None
+    debut, fin = creneau(rng)
+    return f'/reservations/{q(idreserv)}', {'date_de_reserv': debut.isoformat(), 'date_reserve': fin.isoformat()}, None
+
+
+def lire_reservation(ctx, rng):
+    idreserv = ctx.au_hasard(ctx.reservations_creees, rng)
+    if idreserv is None:
+        return None
+    return f'/reservations/{q(idreserv)}', None, None
+
+
+def disponibilite(ctx, rng):
+    creneaux = ','.join(f"{d.isoformat()}/{f.isoformat()}" for d, f in (creneau(rng) for _ in range(rng.randint(1, 4))))
+    return f'/disponibilite-tables?creneaux={q(creneaux)}', None, None
+
+
+# (méthode, règle de la route dans app.py, poids, fonction, statuts attendus)
+OPERATIONS = (
+    ('GET', '/tables', 6, lecture(lambda ctx, rng: '/tables'), (200,)),
+    ('GET', '/tables/<idtable>', 3, lecture(lambda ctx, rng: f'/tables/{q(rng.choice(ctx.tables))}'), (200,)),
+    ('GET', '/menu', 6, lecture(lambda ctx, rng: '/menu'), (200,)),
+    ('GET', '/menu/<idplat>', 3, lecture(lambda ctx, rng: f'/menu/{q(rng.choice(ctx.plats))}'), (200,)),
+    ('GET', '/commandes', 6, lecture(lambda ctx, rng: f"/commandes?limit={rng.choice((20, 50, 100))}"), (200,)),
+    ('GET', '/commandes/<idcom>', 6, lecture(lambda ctx, rng: f'/commandes/{q(rng.choice(ctx.commandes))}'), (200,)),
+    ('GET', '/commandes/client/<nomcli>', 3,
+     lecture(lambda ctx, rng: f'/commandes/client/{q(rng.choice(ctx.clients))}'), (200,)),
+    ('GET', '/cuisine/queue', 4, lecture(lambda ctx, rng: '/cuisine/queue?timeout=0'), (200,)),
+    ('GET', '/clients', 2,
+     lecture(lambda ctx, rng: f"/clients?tri={rng.choice(('recence', 'depense'))}&limit=50"), (200,)),
+    ('GET', '/reservations', 3, lecture(lambda ctx, rng: f'/reservations?date={rng.choice(ctx.jours)}'), (200,)),
+    ('GET', '/reservations/<idreserv>', 2, lire_reservation, (200,)),
+    ('GET', '/disponibilite-tables', 4, disponibilite, (200,)),
+    ('GET', '/stats/recettes', 2,
+     lecture(lambda ctx, rng: f"/stats/recettes?granularite={rng.choice(('jour', 'semaine', 'mois'))}"), (200,)),
+    ('GET', '/stats/histogramme', 1,
+     lecture(lambda ctx, rng: f'/stats/histogramme?date_debut={rng.choice(ctx.jours)}&granularite=jour'), (200,)),
+    ('GET', '/recherche/menu', 3,
+     lecture(lambda ctx, rng: f"/recherche/menu?terme={q(rng.choice(('sa', 'pou', 'jus', 'piz', 'roma')))}"), (200,)),
+    ('GET', '/recherche/clients', 3,
+     lecture(lambda ctx, rng: f"/recherche/clients?terme={q(rng.choice(ctx.clients)[:4])}&limit=20"), (200,)),
+    ('GET', '/facture/<idcom>', 2, lecture(lambda ctx, rng: f'/facture/{q(rng.choice(ctx.commandes))}'), (200, 202)),
+    ('GET', '/facture/<idcom>/download', 1,
+     lecture(lambda ctx, rng: f'/facture/{q(rng.choice(ctx.commandes))}/download'), (200,)),
+    ('GET', '/comptabilite/grand-livre', 1,
+     lecture(lambda ctx, rng: f"/comptabilite/grand-livre?date_debut={ctx.jours[-1]}&date_fin={ctx.jours[-1]}"), (200,)),
+    ('POST', '/commandes', 3, creer_commande, (201,)),
+    ('PUT', '/commandes/<idcom>', 2, modifier_commande, (200,)),
+    ('POST', '/cuisine/<idcom>/<action>', 2, transition_cuisine, (200, 409)),
+    # Conflit de réservation (400) : refus attendu d'un créneau déjà pris
+    ('POST', '/reservations', 2, creer_reservation, (201, 400)),
+    ('PUT', '/reservations/<idreserv>', 1, modifier_reservation, (200, 400)),
+)
+
+
+# ----- Mesure -----
+def travailler(url, ctx, operations, fin, graine, mesures):
+    # Un thread client : mesures {route: [durées]} et erreurs {route: nombre}
+    rng = random.Random(graine)
+    client = Client(url)
+    poids = [op[2] for op in operations]
+    durees = collections.defaultdict(list)
+    erreurs = collections.Counter()
+    while time.monotonic() < fin:
+        methode, regle, _, fonction, attendus = rng.choices(operations, weights=poids)[0]
+        requete = fonction(ctx, rng)
+        if requete is None:
+            continue
+        chemin, corps, apres = requete
+        route = f"{methode} {regle}"
+        t0 = time.perf_counter()
+        try:
+            statut, _ = client.envoyer(methode, chemin, corps)
+        except (OSError, http.client.HTTPException):
+            statut = None
+        durees[route].append(time.perf_counter() - t0)
+        if statut not in attendus:
+            erreurs[route] += 1
+        elif apres is not None and statut < 300:
+            apres()
+    mesures.append((durees, erreurs))
+
+
+def lancer(url, ctx, operations, concurrence, duree, graine):
+    fin = time.monotonic() + duree
+    mesures = []
+    threads = [threading.Thread(target=travailler, args=(url, ctx, operations, fin, graine + i, mesures))
+               for i in range(concurrence)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    durees = collections.defaultdict(list)
+    erreurs = collections.Counter()
+    for durees_thread, erreurs_thread in mesures:
+        for route, valeurs in durees_thread.items():
+            durees[route].extend(valeurs)
+        erreurs.update(erreurs_thread)
+    return durees, erreurs
+
+
+def compteurs_sql(client):
+    """{"MÉTHODE /route": (requêtes HTTP, requêtes SQL)} depuis GET /metrics."""
+    statut, corps = client.envoyer('GET', '/metrics')
+    if statut != 200:
+        raise RuntimeError(f"GET /metrics : HTTP {statut}")
+    totaux = collections.defaultdict(lambda: [0, 0])
+    for ligne in corps.decode('utf-8').splitlines():
+        serie = _SERIE.match(ligne)
+        if not serie or serie.group(1) not in ('resto_http_requests_total', 'resto_sql_statements_total'):
+            continue
+        labels = dict(_LABEL.findall(serie.group(2)))
+        route = f"{labels.get('method')} {labels.get('route')}"
+        totaux[route][serie.group(1) == 'resto_sql_statements_total'] += float(serie.group(3))
+    return totaux
+
+
+def centile(valeurs, p):
+    # Rang le plus proche sur des valeurs triées
+    return valeurs[max(0, math.ceil(p / 100 * len(valeurs)) - 1)]
+
+
+def resultats(durees, erreurs, sql_avant, sql_apres, duree):
+    par_route = {}
+    for route, valeurs in sorted(durees.items()):
+        valeurs.sort()
+        http_avant, requetes_avant = sql_avant.get(route, (0, 0))
+        http_apres, requetes_apres = sql_apres.get(route, (0, 0))
+        nombre_http = http_apres - http_avant
+        par_route[route] = {
+            'requetes': len(valeurs),
+            'par_seconde': round(len(valeurs) / duree, 1),
+            'taux_erreur': round(erreurs[route] / len(valeurs), 4),
+            'p50_ms': round(centile(valeurs, 50) * 1000, 2),
+            'p95_ms': round(centile(valeurs, 95) * 1000, 2),
+            'p99_ms': round(centile(valeurs, 99) * 1000, 2),
+            'max_ms': round(valeurs[-1] * 1000, 2),
+            'sql_par_requete': round((requetes_apres - requetes_avant) / nombre_http, 2) if nombre_http else None,
+        }
+    return par_route
+
+
+def afficher(par_route, duree, concurrence):
+    total = sum(r['requetes'] for r in par_route.values())
+    print(f"\n{total} requêtes en {duree:.0f}s, concurrence {concurrence} ({total / duree:.0f} req/s)\n")
+    print(f"{'route':42} {'req':>7} {'req/s':>7} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'SQL/req':>8}")
+    for route, r in par_route.items():
+        sql = '-' if r['sql_par_requete'] is None else f"{r['sql_par_requete']:.2f}"
+        print(f"{route:42} {r['requetes']:>7} {r['par_seconde']:>7.1f} {r['taux_erreur'] * 100:>6.2f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {sql:>8}")
+
+
+# ----- Limites -----
+def depassements_seuils(par_route, seuils):
+    messages = []
+    for route, r in par_route.items():
+        limites = dict(seuils.get('*', {}), **seuils.get(route, {}))
+        for cle in LIMITES:
+            if cle in limites and r[cle] is not None and r[cle] > limites[cle]:
+                messages.append(f"{route} : {cle} = {r[cle]} > seuil {limites[cle]}")
+    return messages
+
+
+def depassements_reference(par_route, reference, tolerance, marge_ms):
+    # Marge absolue sur les latences : sans elle, une route de 0,3 ms échoue pour 0,1 ms de bruit
+    messages = []
+    for route, r in par_route.items():
+        ancien = reference.get(route)
+        if not ancien:
+            continue
+        for cle in COMPAREES:
+            if r[cle] is None or ancien.get(cle) is None:
+                continue
+            marge = marge_ms if cle.endswith('_ms') else 0
+            if r[cle] > ancien[cle] * (1 + tolerance) + marge:
+                messages.append(f"{route} : {cle} = {r[cle]} (référence {ancien[cle]}, +{tolerance:.0%})")
+    return messages
+
+
+def nettoyer(url, ctx):
+    # Objets créés par la mesure, supprimés par l'API (agrégats et caches tenus à jour)
+    client = Client(url)
+    for idcom in ctx.commandes_creees:
+        client.envoyer('DELETE', f'/commandes/{q(idcom)}')
+    for idreserv in ctx.reservations_creees:
+        client.envoyer('DELETE', f'/reservations/{q(idreserv)}')
+    print(f"Supprimées : {len(ctx.commandes_creees)} commandes, {len(ctx.reservations_creees)} réservations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrence', type=int, default=8)
+    parser.add_argument('--duree', type=float, default=30.0)
+    parser.add_argument('--echauffement', type=float, default=5.0,
+                        help="secondes de charge non mesurée (caches, pools) avant la mesure")
+    parser.add_argument('--routes', default='',
+                        help="expression régulière : seules les routes « MÉTHODE /règle » correspondantes")
+    parser.add_argument('--lectures-seules', action='store_true')
+    parser.add_argument('--echantillon', type=int, default=200,
+                        help="nombre de commandes et de clients existants utilisés")
+    parser.add_argument('--attente-metriques', type=float, default=1.5,
+                        help="délai avant le dernier relevé de /metrics (METRICS_SNAPSHOT_INTERVAL des processus)")
+    parser.add_argument('--seuils', help="fichier JSON des limites absolues")
+    parser.add_argument('--reference', help="résultats JSON d'une exécution précédente")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--marge-ms', type=float, default=2.0)
+    parser.add_argument('--sortie', help="écrit les résultats JSON (future --reference)")
+    parser.add_argument('--garder', action='store_true', help="ne supprime pas les objets créés")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    operations = [op for op in OPERATIONS
+                  if re.search(args.routes, f"{op[0]} {op[1]}") and not (args.lectures_seules and op[0] != 'GET')]
+    if not operations:
+        parser.error("aucune route sélectionnée")
+
+    # Limites lues avant la mesure (la référence peut être aussi le fichier de --sortie)
+    seuils = reference = None
+    if args.seuils:
+        with open(args.seuils, encoding='utf-8') as f:
+            seuils = json.load(f)
+    if args.reference:
+        with open(args.reference, encoding='utf-8') as f:
+            reference = json.load(f)
+
+    client = Client(args.url)
+    ctx = Contexte(client, args.echantillon)
+    print(f"{len(ctx.tables)} tables, {len(ctx.plats)} plats, échantillon de {len(ctx.commandes)} commandes "
+          f"et {len(ctx.clients)} clients ; {len(operations)} routes")
+
+    try:
+        if args.echauffement > 0:
+            lancer(args.url, ctx, operations, args.concurrence, args.echauffement, args.seed + 1000)
+        time.sleep(args.attente_metriques)
+        sql_avant = compteurs_sql(client)
+        t0 = time.monotonic()
+        durees, erreurs = lancer(args.url, ctx, operations, args.concurrence, args.duree, args.seed)
+        duree = time.monotonic() - t0
+        time.sleep(args.attente_metriques)
+        sql_apres = compteurs_sql(client)
+    finally:
+        if not args.garder:
+            nettoyer(args.url, ctx)
+
+    par_route = resultats(durees, erreurs, sql_avant, sql_apres, duree)
+    afficher(par_route, duree, args.concurrence)
+
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            json.dump(par_route, f, indent=2, ensure_ascii=False)
+
+    depassements = []
+    if seuils is not None:
+        depassements += depassements_seuils(par_route, seuils)
+    if reference is not None:
+        depassements += depassements_reference(par_route, reference, args.tolerance, args.marge_ms)
+    if depassements:
+        print(f"\n{len(depassements)} limite(s) dépassée(s) :")
+        for message in depassements:
+            print(f"  {message}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""Génère un restaurant synthétique aux volumes de production dans MySQL.
+
+Tables, menu, commandes avec leurs plats et réservations sont insérés par lots
+(INSERT multi-lignes), puis les agrégats (ventes_jour, plats_ventes,
+clients_resume) sont reconstruits et les versions de data_version incrémentées
+pour que les caches d'un serveur déjà démarré se rechargent. Les données sont
+reproductibles : même ``--seed``, mêmes lignes.
+
+- commandes réparties sur ``--jours`` jours jusqu'à aujourd'hui, plus nombreuses
+  le week-end ; quelques clients fidèles concentrent une bonne part des commandes ;
+- les commandes du jour sont en attente, en cours ou terminées, les autres payées ;
+- réservations surtout aux services du midi et du soir : les créneaux d'une
+  même table se suivent, et une part ``--chevauchements`` empiète sur le
+  créneau précédent (doubles réservations de l'historique).
+
+Les identifiants générés commencent par ``--prefixe`` (G par défaut) ;
+``--vider`` supprime d'abord les lignes de ce préfixe.
+
+Usage : python bench/generer_donnees.py --tables 300 --plats 400 --commandes 1000000 --reservations 100000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from clients import reconstruire_clients  # noqa: E402
+from ventes import reconstruire_ventes  # noqa: E402
+
+PRENOMS = (
+    'Monja', 'Faso', 'Toto', 'Rado', 'Hery', 'Fara', 'Nirina', 'Aina', 'Tiana', 'Voahangy',
+    'Lalao', 'Mamy', 'Njaka', 'Soa', 'Haja', 'Ony', 'Zo', 'Fidy', 'Miora', 'Tahina',
+    'Jean', 'Marie', 'Paul', 'Claire', 'Luc', 'Sophie', 'Marc', 'Julie', 'Eric', 'Anne',
+)
+NOMS = (
+    'Rakoto', 'Rabe', 'Randria', 'Rasoa', 'Andria', 'Razafy', 'Ravelo', 'Rajaona',
+    'Rakotobe', 'Ramanana', 'Martin', 'Bernard', 'Dubois', 'Durand', 'Lefebvre', 'Moreau',
+)
+PLATS = (
+    'Mine sao', 'Romazava', 'Ravitoto', 'Akoho ronony', 'Kadaka tsaramaso', 'Henakisoa',
+    'Soupe chinoise', 'Riz cantonais', 'Salade César', 'Pizza', 'Brochettes', 'Burger',
+    'Poisson grillé', 'Crevettes', 'Steak frites', 'Lasagnes', 'Omelette', 'Sambos',
+    'Jus naturel', 'Café', 'Thé', 'Glace', 'Mofo gasy', 'Koba', 'Salade de fruits',
+)
+VARIANTES = ('poulet', 'boeuf', 'porc', 'poisson', 'légumes', 'crevettes', 'maison', 'spécial')
+
+# Services : (heure de début la plus tôt, plage en minutes, poids)
+SERVICES = ((11, 180, 4), (18, 240, 5), (8, 120, 1))
+DUREES_RESERVATION = (60, 90, 120, 150, 180)
+STATUTS_DU_JOUR = ('en attente', 'en cours', 'terminé')
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.environ.get('DB_HOST', 'localhost'),
+        user=os.environ.get('DB_USER', 'root'),
+        password=os.environ.get('DB_PASSWORD', ''),
+        database=os.environ.get('DB_NAME', 'restaurant_db'),
+        port=int(os.environ.get('DB_PORT', 3306))
+    )
+
+
+def noms_clients(n):
+    noms = []
+    for i in range(n):
+        prenom = PRENOMS[i % len(PRENOMS)]
+        nom = NOMS[(i // len(PRENOMS)) % len(NOMS)]
+        tour = i // (len(PRENOMS) * len(NOMS))
+        noms.append(f"{prenom} {nom}" + (f" {tour + 1}" if tour else ''))
+    return noms
+
+
+def client(rng, clients):
+    # Popularité décroissante : les premiers clients reviennent souvent
+    return clients[int(len(clients) * rng.random() ** 3)]
+
+
+def generer_tables(n, prefixe):
+    for i in range(1, n + 1):
+        salle = ('Salle', 'Terrasse', 'Étage', 'Bar')[i % 4]
+        yield (f'{prefixe}T{i}', f'{salle} - table {i}', 0)
+
+
+def generer_menu(n, prefixe, rng):
+    for i in range(1, n + 1):
+        base = PLATS[(i - 1) % len(PLATS)]
+        variante = VARIANTES[((i - 1) // len(PLATS)) % len(VARIANTES)]
+        numero = (i - 1) // (len(PLATS) * len(VARIANTES))
+        nom = f"{base} {variante}" + (f" {numero + 1}" if numero else '')
+        yield (f'{prefixe}P{i}', nom, rng.randrange(4, 80) * 500)
+
+
+def jours_ponderes(jours, aujourdhui):
+    # Vendredi et samedi deux fois plus chargés que le lundi
+    poids_semaine = (2, 3, 3, 3, 4, 4, 3)
+    jours_liste = [aujourdhui - datetime.timedelta(days=d) for d in range(jours)]
+    return jours_liste, [poids_semaine[j.weekday()] for j in jours_liste]
+
+
+def generer_commandes(n, args, tables, plats, clients, rng):
+    # (commande, plats) ; montant_total calculé avec les prix du menu
+    aujourdhui = datetime.date.today()
+    jours_liste, poids = jours_ponderes(args.jours, aujourdhui)
+    dates = sorted(rng.choices(jours_liste, weights=poids, k=n))
+    for i, datecom in enumerate(dates, start=1):
+        idcom = f'{args.prefixe}{i}'
+        sur_place = rng.random() < 0.7
+        idtable = rng.choice(tables)[0] if sur_place else None
+        statut = rng.choice(STATUTS_DU_JOUR) if datecom == aujourdhui else 'payé'
+
+        lignes = []
+        montant = 0
+        for idplat, _, pu in rng.sample(plats, rng.choice((1, 1, 2, 2, 2, 3, 3, 4, 5, 6))):
+            quantite = rng.choice((1, 1, 1, 2, 2, 3))
+            lignes.append((idcom, idplat, quantite, pu))
+            montant += quantite * pu
+        commande = (idcom, client(rng, clients), 'sur place' if sur_place else 'à emporter',
+                    idtable, datecom, montant, statut)
+        yield commande, lignes
+
+
+def generer_reservations(n, args, tables, clients, rng):
+    aujourdhui = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    # Réservations passées et à venir (un dixième dans les 30 prochains jours)
+    debut_periode = aujourdhui - datetime.timedelta(days=args.jours)
+    fin_par_table = {}
+    for i in range(1, n + 1):
+        idtable = rng.choice(tables)[0]
+        if rng.random() < 0.1:
+            jour = aujourdhui + datetime.timedelta(days=rng.randrange(30))
+        else:
+            jour = debut_periode + datetime.timedelta(days=rng.randrange(args.jours))
+        heure, plage, _ = rng.choices(SERVICES, weights=[s[2] for s in SERVICES])[0]
+        debut = jour + datetime.timedelta(hours=heure, minutes=rng.randrange(0, plage, 15))
+        duree = datetime.timedelta(minutes=rng.choice(DUREES_RESERVATION))
+
+        # Même table, même service : à la suite du créneau précédent, ou par-dessus
+        precedente = fin_par_table.get((idtable, jour, heure))
+        if precedente is not None:
+            if rng.random() < args.chevauchements:
+                debut = precedente - datetime.timedelta(minutes=rng.choice((15, 30, 45)))
+            else:
+                debut = max(debut, precedente)
+        fin_par_table[(idtable, jour, heure)] = debut + duree
+        yield (f'{args.prefixe}R{i}', idtable, debut, debut + duree, client(rng, clients))
+
+
+def inserer(conn, cursor, sql, lignes, lot, libelle):
+    t0 = time.perf_counter()
+    total = 0
+    lot_courant = []
+    for ligne in lignes:
+        lot_courant.append(ligne)
+        if len(lot_courant) == lot:
+            cursor.executemany(sql, lot_courant)
+            conn.commit()
+            total += len(lot_courant)
+            lot_courant = []
+    if lot_courant:
+        cursor.executemany(sql, lot_courant)
+        conn.commit()
+        total += len(lot_courant)
+    print(f"{libelle:16} {total:>9} lignes en {time.perf_counter() - t0:.1f}s")
+    return total
+
+
+def charger_commandes(conn, cursor, args, tables, plats, clients, rng):
+    t0 = time.perf_counter()
+    nb_commandes = nb_lignes = 0
+    commandes, lignes = [], []
+
+    def vider():
+        cursor.executemany("""
+            INSERT INTO commande (idcom, nomcli, typecom, idtable, datecom, montant_total, statut)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, commandes)
+        cursor.executemany("""
+            INSERT INTO commande_plats (idcom, idplat, quantite, prix_unitaire)
+            VALUES (%s, %s, %s, %s)
+        """, lignes)
+        conn.commit()
+
+    for commande, plats_commande in generer_commandes(args.commandes, args, tables, plats, clients, rng):
+        commandes.append(commande)
+        lignes.extend(plats_commande)
+        if len(commandes) == args.lot:
+            vider()
+            nb_commandes += len(commandes)
+            nb_lignes += len(lignes)
+            commandes, lignes = [], []
+    if commandes:
+        vider()
+        nb_commandes += len(commandes)
+        nb_lignes += len(lignes)
+    print(f"{'commandes':16} {nb_commandes:>9} lignes ({nb_lignes} plats) en {time.perf_counter() - t0:.1f}s")
+
+
+def supprimer(conn, cursor, prefixe):
+    motif = prefixe.replace('%', r'\%').replace('_', r'\_') + '%'
+    for sql in (
+        "DELETE FROM reserver WHERE idreserv LIKE %s",
+        "DELETE FROM commande_plats WHERE idcom LIKE %s",
+        "DELETE FROM commande WHERE idcom LIKE %s",
+        "DELETE FROM menu WHERE idplat LIKE %s",
+        "DELETE FROM restaurant_tables WHERE idtable LIKE %s",
+    ):
+        cursor.execute(sql, (motif,))
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', type=int, default=300)
+    parser.add_argument('--plats', type=int, default=400)
+    parser.add_argument('--commandes', type=int, default=1000000)
+    parser.add_argument('--reservations', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=20000)
+    parser.add_argument('--jours', type=int, default=730)
+    parser.add_argument('--chevauchements', type=float, default=0.02,
+                        help="part des réservations qui empiètent sur la précédente de la même table et du même service")
+    parser.add_argument('--prefixe', default='G')
+    parser.add_argument('--lot', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--vider', action='store_true',
+                        help="supprime d'abord les lignes générées (identifiants --prefixe)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clients = noms_clients(args.clients)
+
+    conn = connect()
+    cursor = conn.cursor()
+    if args.vider:
+        supprimer(conn, cursor, args.prefixe)
+
+    tables = list(generer_tables(args.tables, args.prefixe))
+    plats = list(generer_menu(args.plats, args.prefixe, rng))
+    inserer(conn, cursor, "INSERT INTO restaurant_tables (idtable, designation, occupation) VALUES (%s, %s, %s)",
+            tables, args.lot, 'tables')
+    inserer(conn, cursor, "INSERT INTO menu (idplat, nomplat, pu) VALUES (%s, %s, %s)",
+            plats, args.lot, 'menu')
+    charger_commandes(conn, cursor, args, tables, plats, clients, rng)
+    inserer(conn, cursor, """
+        INSERT INTO reserver (idreserv, idtable, date_de_reserv, date_reserve, nomcli)
+        VALUES (%s, %s, %s, %s, %s)
+    """, generer_reservations(args.reservations, args, tables, clients, rng), args.lot, 'réservations')
+
+    # Tables occupées par les commandes sur place du jour non terminées
+    t0 = time.perf_counter()
+    cursor.execute("""
+        UPDATE restaurant_tables t
+        JOIN commande c ON c.idtable = t.idtable
+        SET t.occupation = TRUE
+        WHERE c.typecom = 'sur place' AND c.statut IN ('en attente', 'en cours')
+    """)
+    reconstruire_ventes(cursor)
+    reconstruire_clients(cursor)
+    cursor.execute("""
+        INSERT INTO data_version (entity, version)
+        VALUES ('tables', 1), ('menu', 1), ('commandes', 1), ('reservations', 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """)
+    conn.commit()
+    cursor.execute("ANALYZE TABLE restaurant_tables, menu, commande, commande_plats, reserver")
+    cursor.fetchall()
+    print(f"{'agrégats':16} reconstruits en {time.perf_counter() - t0:.1f}s")
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
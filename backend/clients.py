@@ -0,0 +1,159 @@
+"""Résumé par client (table ``clients_resume``).
+
+Nombre de commandes, total dépensé, dernière visite et nombre de réservations,
+recalculés pour les seuls clients touchés par chaque écriture de commande ou
+de réservation.
+"""
+import datetime
+import threading
+import time
+
+from mysql.connector import Error
+
+from search_index import TrigramIndex
+
+TRIS = {
+    'recence': 'derniere_visite DESC, nomcli',
+    'depense': 'total_depense DESC, nomcli',
+}
+
+_MAJ_CLIENT = """
+    INSERT INTO clients_resume (nomcli, nb_commandes, total_depense, derniere_visite, nb_reservations)
+    SELECT
+        %s,
+        (SELECT COUNT(*) FROM commande WHERE nomcli = %s),
+        (SELECT COALESCE(SUM(montant_total), 0) FROM commande WHERE nomcli = %s),
+        (SELECT MAX(datecom) FROM commande WHERE nomcli = %s),
+        (SELECT COUNT(*) FROM reserver WHERE nomcli = %s)
+    ON DUPLICATE KEY UPDATE
+        nb_commandes = VALUES(nb_commandes),
+        total_depense = VALUES(total_depense),
+        derniere_visite = VALUES(derniere_visite),
+        nb_reservations = VALUES(nb_reservations)
+"""
+
+
+def maj_clients(cursor, *noms):
+    # Un nom par client distinct (la collation ignore la casse)
+    vus = set()
+    for nom in noms:
+        if nom is None or nom.casefold() in vus:
+            continue
+        vus.add(nom.casefold())
+        cursor.execute(_MAJ_CLIENT, (nom,) * 5)
+
+
+def maj_clients_lot(cursor, noms):
+    # Variante ensembliste de maj_clients pour les imports : une seule requête
+    noms = list({nom.casefold(): nom for nom in noms if nom is not None}.values())
+    if not noms:
+        return
+    placeholders = ', '.join(['%s'] * len(noms))
+    # Noms passés en littéraux : un client qui n'a plus rien est remis à zéro
+    noms_sql = ' UNION ALL '.join(['SELECT %s as nomcli'] * len(noms))
+    cursor.execute(f"""
+        INSERT INTO clients_resume (nomcli, nb_commandes, total_depense, derniere_visite, nb_reservations)
+        SELECT * FROM (
+            SELECT n.nomcli,
+                COALESCE(c.nb_commandes, 0) as nb_commandes,
+                COALESCE(c.total_depense, 0) as total_depense,
+                c.derniere_visite,
+                COALESCE(r.nb_reservations, 0) as nb_reservations
+            FROM ({noms_sql}) n
+            LEFT JOIN (
+                SELECT nomcli, COUNT(*) as nb_commandes, SUM(montant_total) as total_depense,
+                    MAX(datecom) as derniere_visite
+                FROM commande WHERE nomcli IN ({placeholders}) GROUP BY nomcli
+            ) c ON c.nomcli = n.nomcli
+            LEFT JOIN (
+                SELECT nomcli, COUNT(*) as nb_reservations
+                FROM reserver WHERE nomcli IN ({placeholders}) GROUP BY nomcli
+            ) r ON r.nomcli = n.nomcli
+        ) as resume
+        ON DUPLICATE KEY UPDATE
+            nb_commandes = VALUES(nb_commandes),
+            total_depense = VALUES(total_depense),
+            derniere_visite = VALUES(derniere_visite),
+            nb_reservations = VALUES(nb_reservations)
+    """, noms * 3)
+
+
+def reconstruire_clients(cursor):
+    cursor.execute("DELETE FROM clients_resume")
+    cursor.execute("""
+        INSERT INTO clients_resume (nomcli, nb_commandes, total_depense, derniere_visite, nb_reservations)
+        SELECT n.nomcli,
+            COALESCE(c.nb_commandes, 0),
+            COALESCE(c.total_depense, 0),
+            c.derniere_visite,
+            COALESCE(r.nb_reservations, 0)
+        FROM (SELECT nomcli FROM commande UNION SELECT nomcli FROM reserver) n
+        LEFT JOIN (
+            SELECT nomcli, COUNT(*) as nb_commandes, SUM(montant_total) as total_depense,
+                MAX(datecom) as derniere_visite
+            FROM commande GROUP BY nomcli
+        ) c ON c.nomcli = n.nomcli
+        LEFT JOIN (
+            SELECT nomcli, COUNT(*) as nb_reservations FROM reserver GROUP BY nomcli
+        ) r ON r.nomcli = n.nomcli
+    """)
+    return cursor.rowcount
+
+
+class ClientSearch:
+    """Index de trigrammes sur les noms des clients ayant passé commande.
+
+    Synchronisé par différence avec ``clients_resume.maj_le`` au plus toutes
+    les ``check_interval`` secondes, ou à la recherche suivante après
+    ``invalidate()``.
+    """
+
+    # Marge de relecture pour les transactions validées après leur horodatage
+    MARGE = datetime.timedelta(seconds=5)
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._index = TrigramIndex()
+        self._depuis = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+    def search(self, get_conn, terme, limite=None):
+        if self._depuis is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self._sync(get_conn)
+        return self._index.search(terme, limite)
+
+    def _sync(self, get_conn):
+        with self._lock:
+            if self._depuis is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+
+            conn = get_conn()
+            if not conn:
+                raise Error('Database connection failed')
+            cursor = conn.cursor(dictionary=True)
+            try:
+                if self._depuis is None:
+                    cursor.execute("SELECT nomcli, nb_commandes, maj_le FROM clients_resume")
+                else:
+                    cursor.execute(
+                        "SELECT nomcli, nb_commandes, maj_le FROM clients_resume WHERE maj_le >= %s",
+                        (self._depuis - self.MARGE,))
+                depuis = self._depuis or datetime.datetime.min
+                for row in cursor.fetchall():
+                    cle = row['nomcli'].casefold()
+                    if row['nb_commandes'] > 0:
+                        self._index.add(cle, row['nomcli'])
+                    else:
+                        self._index.remove(cle)
+                    if row['maj_le'] and row['maj_le'] > depuis:
+                        depuis = row['maj_le']
+            finally:
+                cursor.close()
+
+            # Table vide : nouvelle lecture complète à la prochaine synchronisation
+            self._depuis = depuis if depuis != datetime.datetime.min else None
+            self._checked_at = time.monotonic()
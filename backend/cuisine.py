@@ -0,0 +1,270 @@
+"""File de la cuisine : commandes en attente ou en cours, par ordre de priorité.
+
+Les routes d'écriture répercutent leurs changements après commit avec la
+version ``commandes`` obtenue par ``bump_version`` ; chaque changement reçoit
+un numéro de séquence, et ``GET /cuisine/queue?since=`` ne renvoie que les
+changements postérieurs. Si une version manque (écriture d'un autre
+processus, import), la file est relue en base et les différences sont
+publiées comme des changements ordinaires.
+"""
+import bisect
+import collections
+import datetime
+import threading
+import time
+import uuid
+
+from mysql.connector import Error
+
+# Statuts des commandes présentes dans la file
+STATUTS_ACTIFS = ('en attente', 'en cours')
+
+# À heure d'arrivée égale (commandes d'avant la migration 008), les commandes
+# sur place passent avant celles à emporter
+PRIORITE_TYPE = {'sur place': 0, 'à emporter': 1}
+
+
+def as_date(valeur):
+    # datecom est une colonne DATE ; les routes reçoivent parfois une date et une heure
+    if isinstance(valeur, datetime.datetime):
+        return valeur.date()
+    if isinstance(valeur, datetime.date):
+        return valeur
+    return datetime.date.fromisoformat(str(valeur)[:10])
+
+
+class FileCuisine:
+    """Commandes à préparer, triées par (creee_le, typecom, table, idcom).
+
+    Les curseurs sont ``<session>-<n>`` : un curseur d'avant un redémarrage,
+    ou trop ancien pour les ``historique`` derniers changements conservés,
+    reçoit la file complète.
+    """
+
+    def __init__(self, check_interval=2.0, historique=1000):
+        self.check_interval = check_interval
+        self._commandes = None
+        self._ordre = []
+        self._changements = collections.deque(maxlen=historique)
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        # Aussi appelé dans un processus fils : la file chargée par le parent est
+        # gardée, mais la session change (les curseurs d'un autre processus
+        # reçoivent la file complète) et la version est revérifiée en base
+        self.session = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._seq = 0
+        self._changements.clear()
+        self._marquer()
+
+    # ----- Ordre de priorité -----
+    @staticmethod
+    def _cle(idcom):
+        # Comparaison insensible à la casse, comme la collation MySQL
+        return str(idcom).casefold()
+
+    @staticmethod
+    def _priorite(commande):
+        return (
+            commande['creee_le'],
+            PRIORITE_TYPE.get(commande['typecom'], len(PRIORITE_TYPE)),
+            str(commande['idtable'] or ''),
+            FileCuisine._cle(commande['idcom']),
+        )
+
+    def _inserer(self, commande):
+        self._commandes[self._cle(commande['idcom'])] = commande
+        priorite = self._priorite(commande)
+        bisect.insort(self._ordre, priorite)
+        return bisect.bisect_left(self._ordre, priorite)
+
+    def _enlever(self, cle):
+        commande = self._commandes.pop(cle)
+        priorite = self._priorite(commande)
+        del self._ordre[bisect.bisect_left(self._ordre, priorite)]
+        return commande
+
+    def _publier(self, type, commande, rang=None):
+        # Appelé sous self._lock
+        self._seq += 1
+        changement = {'seq': self._seq, 'type': type, 'idcom': commande['idcom']}
+        if type != 'retrait':
+            changement['commande'] = self._public(commande)
+            changement['rang'] = rang
+        self._changements.append(changement)
+        self._condition.notify_all()
+
+    @staticmethod
+    def _public(commande):
+        commande = dict(commande)
+        commande['datecom'] = commande['datecom'].isoformat()
+        commande['creee_le'] = commande['creee_le'].isoformat()
+        commande['plats'] = [dict(p) for p in commande['plats']]
+        return commande
+
+    # ----- Écritures traversantes -----
+    def ajouter(self, commande, version):
+        # commande : idcom, nomcli, typecom, idtable, datecom, creee_le, statut,
+        # plats [{idplat, nomplat, quantite}]
+        with self._lock:
+            if self._avancer(version):
+                self._appliquer(dict(commande, datecom=as_date(commande['datecom'])))
+
+    def modifier(self, idcom, champs, version):
+        # champs : colonnes modifiées parmi nomcli, typecom, idtable, statut
+        with self._lock:
+            if not self._avancer(version):
+                return
+            cle = self._cle(idcom)
+            commande = self._commandes.get(cle)
+            if commande is None:
+                if champs.get('statut') in STATUTS_ACTIFS:
+                    # Commande qui revient dans la file : ses plats ne sont pas connus ici
+                    self._marquer()
+                return
+            self._appliquer(dict(commande, **champs))
+
+    def retirer(self, idcom, version):
+        with self._lock:
+            if self._avancer(version):
+                cle = self._cle(idcom)
+                if cle in self._commandes:
+                    self._publier('retrait', self._enlever(cle))
+
+    def _appliquer(self, commande):
+        # Ajout, mise à jour ou retrait de la file selon le statut
+        cle = self._cle(commande['idcom'])
+        ancienne = self._commandes.get(cle)
+        if ancienne is not None:
+            self._enlever(cle)
+        if commande['statut'] not in STATUTS_ACTIFS:
+            if ancienne is not None:
+                self._publier('retrait', ancienne)
+            return
+        rang = self._inserer(commande)
+        self._publier('ajout' if ancienne is None else 'maj', commande, rang)
+
+    def _avancer(self, version):
+        # Applique l'écriture seulement si elle suit directement la version connue ;
+        # sinon la file est marquée à relire à la prochaine synchronisation
+        if self._commandes is None:
+            return False
+        if self._version == version - 1:
+            self._version = version
+            return True
+        self._marquer()
+        return False
+
+    def _marquer(self):
+        self._checked_at = 0.0
+        self._version = None
+
+    def invalidate(self):
+        with self._lock:
+            self._marquer()
+
+    # ----- Lectures -----
+    def depuis(self, curseur):
+        """Changements postérieurs à ``curseur``, ou la file complète si le
+        curseur est absent, d'une autre session ou trop ancien."""
+        with self._lock:
+            changements = self._depuis(curseur)
+            reponse = {'curseur': f"{self.session}-{self._seq}"}
+            if changements is None:
+                reponse['complet'] = True
+                reponse['commandes'] = [self._public(self._commandes[p[-1]]) for p in self._ordre]
+            else:
+                reponse['complet'] = False
+                reponse['changements'] = changements
+            return reponse
+
+    def _depuis(self, curseur):
+        if not curseur or self._commandes is None:
+            return None
+        session, _, numero = curseur.rpartition('-')
+        if session != self.session or not numero.isdigit() or int(numero) > self._seq:
+            return None
+        numero = int(numero)
+        plus_ancien = self._changements[0]['seq'] if self._changements else self._seq + 1
+        if numero < plus_ancien - 1:
+            return None
+        return [c for c in self._changements if c['seq'] > numero]
+
+    def attendre(self, curseur, timeout):
+        """Attend au plus ``timeout`` secondes un changement postérieur à ``curseur``."""
+        with self._lock:
+            if self._depuis(curseur) == []:
+                self._condition.wait(timeout)
+
+    # ----- Synchronisation avec MySQL -----
+    def synchroniser(self, get_conn):
+        now = time.monotonic()
+        if self._commandes is not None and now - self._checked_at < self.check_interval:
+            return
+
+        conn = get_conn()
+        if not conn:
+            raise Error('Database connection failed')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            with self._lock:
+                if self._commandes is not None and time.monotonic() - self._checked_at < self.check_interval:
+                    return
+                cursor.execute("SELECT version FROM data_version WHERE entity = 'commandes'")
+                row = cursor.fetchone()
+                version = row['version'] if row else 0
+                if self._commandes is None or version != self._version:
+                    self._charger(cursor)
+                self._version = version
+                self._checked_at = time.monotonic()
+        finally:
+            cursor.close()
+
+    def _charger(self, cursor):
+        placeholders = ', '.join(['%s'] * len(STATUTS_ACTIFS))
+        cursor.execute(f"""
+            SELECT idcom, nomcli, typecom, idtable, datecom, creee_le, statut
+            FROM commande
+            WHERE statut IN ({placeholders})
+        """, STATUTS_ACTIFS)
+        commandes = {self._cle(c['idcom']): dict(c, datecom=as_date(c['datecom']), plats=[])
+                     for c in cursor.fetchall()}
+
+        if commandes:
+            cursor.execute(f"""
+                SELECT cp.idcom, cp.idplat, m.nomplat, cp.quantite
+                FROM commande_plats cp
+                JOIN commande c ON c.idcom = cp.idcom
+                JOIN menu m ON m.idplat = cp.idplat
+                WHERE c.statut IN ({placeholders})
+                ORDER BY cp.id
+            """, STATUTS_ACTIFS)
+            for ligne in cursor.fetchall():
+                commande = commandes.get(self._cle(ligne.pop('idcom')))
+                if commande is not None:
+                    commande['plats'].append(ligne)
+
+        if self._commandes is None:
+            self._commandes = {}
+            for commande in commandes.values():
+                self._inserer(commande)
+            return
+
+        # Différences avec la file en mémoire, publiées comme des changements
+        for cle in [cle for cle in self._commandes if cle not in commandes]:
+            self._publier('retrait', self._enlever(cle))
+        for cle, commande in commandes.items():
+            if self._commandes.get(cle) != commande:
+                self._appliquer(commande)
+
+    def stats(self):
+        with self._lock:
+            par_statut = collections.Counter(c['statut'] for c in (self._commandes or {}).values())
+            return {
+                'commandes': len(self._ordre),
+                'par_statut': dict(par_statut),
+                'seq': self._seq,
+                'historique': len(self._changements),
+            }
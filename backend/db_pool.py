@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Aucune connexion disponible dans le délai d'attente."""
+
+
+class PooledConnection:
+    """Connexion empruntée au pool.
+
+    Se comporte comme la connexion MySQL sous-jacente ; ``close()`` la rend
+    au pool au lieu de fermer la session TCP.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    @property
+    def closed(self):
+        return self._released
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw, self._created_at)
+
+    def discard(self):
+        # Session dans un état inconnu (résultat non lu...) : fermée au lieu d'être rendue
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw, self._created_at, keep=False)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        if self._pool.on_execute is None:
+            return cursor
+        return TimedCursor(cursor, self._pool.on_execute)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class TimedCursor:
+    """Curseur dont chaque exécution est chronométrée.
+
+    ``on_execute(operation, params, duree, cursor)`` est appelé après chaque
+    ``execute``/``executemany``, y compris en cas d'erreur.
+    """
+
+    def __init__(self, cursor, on_execute):
+        self._cursor = cursor
+        self._on_execute = on_execute
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._on_execute(operation, params, time.perf_counter() - start, self._cursor)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._on_execute(operation, seq_params, time.perf_counter() - start, self._cursor)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConnectionPool:
+    """Pool borné de connexions MySQL.
+
+    - ``size`` connexions conservées au repos, ``max_overflow`` connexions
+      supplémentaires ouvertes en pointe puis refermées au retour ;
+    - ``timeout`` secondes d'attente maximale pour obtenir une connexion ;
+    - ``pre_ping`` vérifie la connexion à l'emprunt (reconnexion si morte) ;
+    - ``recycle`` secondes après lesquelles une connexion est renouvelée ;
+    - ``on_acquire(attente)`` et ``on_execute`` (voir ``TimedCursor``) :
+      mesures facultatives des emprunts et des requêtes.
+    """
+
+    def __init__(self, connect, size=5, max_overflow=10, timeout=5.0,
+                 recycle=3600, pre_ping=True, on_acquire=None, on_execute=None):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.on_acquire = on_acquire
+        self.on_execute = on_execute
+
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self._acquisitions = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    # ----- Emprunt / restitution -----
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    # Réserve la place, la connexion est ouverte hors verrou
+                    self._open += 1
+                    raw, created_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"Aucune connexion disponible après {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if raw is None:
+                raw, created_at = self._new_connection()
+            else:
+                raw, created_at = self._check(raw, created_at)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        wait = time.monotonic() - start
+        with self._cond:
+            self._acquisitions += 1
+            if waited:
+                self._waits += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        if self.on_acquire is not None:
+            self.on_acquire(wait)
+
+        return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at, keep=True):
+        try:
+            # Ne jamais rendre une transaction ouverte au pool
+            if keep and raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep and len(self._idle) < self.size:
+                self._idle.append((raw, created_at))
+                raw = None
+            else:
+                self._open -= 1
+                self._discarded += 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._close_quietly(raw)
+
+    # ----- Santé des connexions -----
+    def _new_connection(self):
+        raw = self._connect()
+        with self._cond:
+            self._created += 1
+        return raw, time.monotonic()
+
+    def _check(self, raw, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            self._close_quietly(raw)
+            with self._cond:
+                self._recycled += 1
+            return self._new_connection()
+
+        if self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(raw)
+                with self._cond:
+                    self._discarded += 1
+                return self._new_connection()
+
+        return raw, created_at
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    # ----- Administration -----
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'acquisitions': self._acquisitions,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_total_ms': round(self._wait_total * 1000, 3),
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+                'wait_avg_ms': round(self._wait_total * 1000 / self._acquisitions, 3)
+                if self._acquisitions else 0,
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+            }
+
+    def dispose(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for raw, _ in idle:
+            self._close_quietly(raw)
@@ -0,0 +1,154 @@
+"""Diffusion des changements (tables, commandes, réservations) aux écrans ouverts.
+
+Les routes publient un événement après chaque écriture validée ; chaque
+abonné reçoit ceux de ses sujets dans une file bornée. Les derniers
+événements sont gardés pour la reprise après une déconnexion
+(``Last-Event-ID``). Quand la reprise n'est pas possible (file débordée,
+identifiant inconnu), l'abonné reçoit un événement ``resync`` : l'écran
+recharge alors l'état complet.
+"""
+import collections
+import itertools
+import threading
+import uuid
+
+SUJETS = ('tables', 'commandes', 'reservations')
+
+
+class Abonnement:
+    def __init__(self, sujets, taille):
+        self.sujets = sujets
+        self.taille = taille
+        self.file = collections.deque()
+        self.condition = threading.Condition()
+        self.ferme = False
+
+    def _pousser(self, evenement):
+        # Appelé sous self.condition
+        if len(self.file) >= self.taille:
+            # Client trop lent : les événements en attente sont remplacés par un resync
+            self.file.clear()
+            evenement = dict(evenement, type='resync', donnees={})
+        self.file.append(evenement)
+        self.condition.notify()
+
+    def attendre(self, timeout):
+        """Événements en attente, après au plus ``timeout`` secondes d'attente."""
+        with self.condition:
+            if not self.file and not self.ferme:
+                self.condition.wait(timeout)
+            evenements = list(self.file)
+            self.file.clear()
+            return evenements
+
+    def fermer(self):
+        with self.condition:
+            self.ferme = True
+            self.condition.notify()
+
+
+class EventBus:
+    """Bus d'événements du processus.
+
+    Les identifiants sont ``<session>-<n>`` : un identifiant d'un autre
+    processus ou d'avant un redémarrage est reconnu et provoque un resync.
+    """
+
+    def __init__(self, historique=1000, taille_file=100):
+        self.taille_file = taille_file
+        self.historique = historique
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        # Aussi appelé dans un processus fils : nouvelle session, pour que les
+        # identifiants émis par le parent ou un autre processus provoquent un
+        # resync ; verrou neuf (celui du parent a pu être copié verrouillé)
+        self.session = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._compteur = itertools.count(1)
+        self._historique = collections.deque(maxlen=self.historique)
+        self._abonnes = set()
+        self._versions = {}
+        self.publies = 0
+        self.debordements = 0
+
+    def publier(self, sujet, type, donnees, version=None):
+        # Version sautée : une écriture d'un autre processus n'a pas été diffusée
+        trou = False
+        with self._lock:
+            if version is not None:
+                connue = self._versions.get(sujet)
+                trou = connue is not None and version > connue + 1 and type != 'resync'
+                self._versions[sujet] = max(version, connue or 0)
+            evenement = {
+                'id': f"{self.session}-{next(self._compteur)}",
+                'sujet': sujet,
+                'type': type,
+                'donnees': donnees,
+            }
+            self._historique.append(evenement)
+            self.publies += 1
+
+            # Sous le verrou du bus : chaque abonné reçoit les événements dans l'ordre des identifiants
+            for abonne in self._abonnes:
+                if sujet not in abonne.sujets:
+                    continue
+                with abonne.condition:
+                    if len(abonne.file) >= abonne.taille:
+                        self.debordements += 1
+                    abonne._pousser(evenement)
+        if trou:
+            self.publier(sujet, 'resync', {})
+        return evenement
+
+    def resynchroniser(self, sujet, version):
+        # Écriture faite par un autre processus : les abonnés du sujet rechargent
+        with self._lock:
+            if sujet not in self._versions:
+                self._versions[sujet] = version
+                return
+            if version <= self._versions[sujet]:
+                return
+        self.publier(sujet, 'resync', {}, version)
+
+    def abonner(self, sujets, dernier_id=None):
+        abonnement = Abonnement(frozenset(sujets), self.taille_file)
+        with self._lock:
+            if dernier_id:
+                manques = self._depuis(dernier_id)
+                if manques is None:
+                    courant = self._historique[-1]['id'] if self._historique else f"{self.session}-0"
+                    manques = [{'id': courant, 'sujet': sujet, 'type': 'resync', 'donnees': {}}
+                               for sujet in sorted(abonnement.sujets)]
+                with abonnement.condition:
+                    for evenement in manques:
+                        if evenement['sujet'] in abonnement.sujets:
+                            abonnement._pousser(evenement)
+            self._abonnes.add(abonnement)
+        return abonnement
+
+    def _depuis(self, dernier_id):
+        # Événements postérieurs à dernier_id, None s'ils ne sont plus tous connus
+        session, _, numero = dernier_id.rpartition('-')
+        if session != self.session or not numero.isdigit():
+            return None
+        numero = int(numero)
+        evenements = [e for e in self._historique if int(e['id'].rpartition('-')[2]) > numero]
+        plus_ancien = int(self._historique[0]['id'].rpartition('-')[2]) if self._historique else 1
+        if numero < plus_ancien - 1:
+            return None
+        return evenements
+
+    def desabonner(self, abonnement):
+        abonnement.fermer()
+        with self._lock:
+            self._abonnes.discard(abonnement)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'abonnes': len(self._abonnes),
+                'publies': self.publies,
+                'debordements': self.debordements,
+                'historique': len(self._historique),
+            }
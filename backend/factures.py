@@ -0,0 +1,265 @@
+"""Génération des factures PDF hors du fil de la requête.
+
+``rendre_facture`` produit le PDF à partir de l'en-tête et des lignes de la
+commande déjà lus en base ; ``FactureWorker`` l'exécute dans un pool de
+threads et garde l'état des travaux pour les routes de suivi.
+``empreinte_facture`` identifie le contenu imprimé, pour ne pas rendre deux
+fois la même facture, et ``exporter_zip`` produit en flux l'archive ZIP des
+factures d'une période.
+"""
+import collections
+import datetime
+import hashlib
+import io
+import json
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from fpdf import FPDF
+
+
+def rendre_facture(commande, plats):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    # En-tête
+    pdf.cell(200, 10, txt="MONJA - Resto", ln=1, align='C')
+    pdf.cell(200, 10, txt=f"Code Commande : {commande['idcom']}", ln=1, align='C')
+    pdf.cell(200, 10, txt=f"Nom du Client : {commande['nomcli']}", ln=1)
+    if commande['typecom'] == 'sur place':
+        pdf.cell(200, 10, txt=f"Table : {commande.get('designation', 'Non assignée')}", ln=1)
+    else:
+        pdf.cell(200, 10, txt="À emporter", ln=1)
+    pdf.cell(200, 10, txt=f"Date : {commande['datecom'].strftime('%d/%m/%Y %H:%M') if isinstance(commande['datecom'], datetime.datetime) else commande['datecom']}", ln=1)
+    pdf.cell(200, 10, txt="Votre facture en détail", ln=1, align='C')
+
+    # Tableau des plats
+    pdf.cell(60, 10, "Menu", 1)
+    pdf.cell(30, 10, "PU (Ar)", 1)
+    pdf.cell(30, 10, "Unité", 1)
+    pdf.cell(40, 10, "Total (Ar)", 1)
+    pdf.ln()
+
+    total = 0
+    for plat in plats:
+        subtotal = plat['prix_unitaire'] * plat['quantite']
+        total += subtotal
+
+        pdf.cell(60, 10, plat['nomplat'], 1)
+        pdf.cell(30, 10, f"{plat['prix_unitaire']:,}", 1, 0, 'R')
+        pdf.cell(30, 10, str(plat['quantite']), 1, 0, 'C')
+        pdf.cell(40, 10, f"{subtotal:,}", 1, 0, 'R')
+        pdf.ln()
+
+    # Total
+    pdf.cell(120, 10, "TOTAL :", 1)
+    pdf.cell(40, 10, f"{total:,} Ariary", 1)
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def total_facture(plats):
+    return sum(plat['prix_unitaire'] * plat['quantite'] for plat in plats)
+
+
+# À incrémenter quand la mise en page de rendre_facture change
+VERSION_RENDU = 1
+
+
+def empreinte_facture(commande, plats):
+    # Hachage des seules données imprimées : le statut et les autres colonnes
+    # de la commande n'invalident pas la facture déjà rendue
+    contenu = {
+        'version': VERSION_RENDU,
+        'idcom': commande['idcom'],
+        'nomcli': commande['nomcli'],
+        'typecom': commande['typecom'],
+        'designation': commande.get('designation'),
+        'datecom': str(commande['datecom']),
+        'plats': [[p['nomplat'], str(p['prix_unitaire']), p['quantite']] for p in plats],
+    }
+    brut = json.dumps(contenu, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+
+class FactureWorker:
+    """Pool de rendu des factures.
+
+    ``ecrire(idcom, empreinte, contenu)`` enregistre le PDF produit et renvoie
+    son nom. Une facture déjà en file pour la même empreinte n'est pas rendue
+    deux fois. Les ``historique`` derniers travaux sont conservés pour le suivi.
+    """
+
+    def __init__(self, ecrire, workers=2, historique=1000):
+        self._ecrire = ecrire
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='facture')
+        self.workers = workers
+        self._historique = historique
+        self._lock = threading.Lock()
+        self._jobs = collections.OrderedDict()
+        self._en_file = {}
+
+        self._en_attente = 0
+        self._en_cours = 0
+        self._terminees = 0
+        self._erreurs = 0
+        self._rendu_total = 0.0
+        self._rendu_max = 0.0
+        self._attente_total = 0.0
+
+    def submit(self, commande, plats, empreinte):
+        with self._lock:
+            job_id = self._en_file.get(empreinte)
+            if job_id:
+                return job_id
+
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'idcom': commande['idcom'],
+                'empreinte': empreinte,
+                'statut': 'en attente',
+                'soumis_le': time.time(),
+                'filename': None,
+                'erreur': None,
+                'duree_ms': None,
+                'termine': threading.Event(),
+            }
+            self._en_file[empreinte] = job_id
+            self._jobs[job_id] = job
+            self._en_attente += 1
+            while len(self._jobs) > self._historique:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._executer, job, commande, plats)
+        return job_id
+
+    def _executer(self, job, commande, plats):
+        debut = time.time()
+        with self._lock:
+            self._en_attente -= 1
+            self._en_cours += 1
+            self._attente_total += debut - job['soumis_le']
+        job['statut'] = 'en cours'
+
+        try:
+            contenu = rendre_facture(commande, plats)
+            job['filename'] = self._ecrire(job['idcom'], job['empreinte'], contenu)
+            job['statut'] = 'terminé'
+        except Exception as e:
+            job['statut'] = 'erreur'
+            job['erreur'] = str(e)
+        finally:
+            duree = time.time() - debut
+            job['duree_ms'] = round(duree * 1000, 3)
+            with self._lock:
+                self._en_cours -= 1
+                self._en_file.pop(job['empreinte'], None)
+                if job['statut'] == 'terminé':
+                    self._terminees += 1
+                else:
+                    self._erreurs += 1
+                self._rendu_total += duree
+                self._rendu_max = max(self._rendu_max, duree)
+            job['termine'].set()
+
+    def job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job, timeout=None):
+        return job['termine'].wait(timeout)
+
+    @staticmethod
+    def public(job):
+        return {k: v for k, v in job.items() if k != 'termine'}
+
+    def stats(self):
+        with self._lock:
+            traitees = self._terminees + self._erreurs
+            return {
+                'workers': self.workers,
+                'en_attente': self._en_attente,
+                'en_cours': self._en_cours,
+                'terminees': self._terminees,
+                'erreurs': self._erreurs,
+                'rendu_moyen_ms': round(self._rendu_total * 1000 / traitees, 3) if traitees else 0,
+                'rendu_max_ms': round(self._rendu_max * 1000, 3),
+                'attente_moyenne_ms': round(self._attente_total * 1000 / traitees, 3) if traitees else 0,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class _FluxZip(io.RawIOBase):
+    # Flux non positionnable : zipfile écrit alors des descripteurs de données
+    # et on récupère les octets produits au fur et à mesure
+    def __init__(self):
+        self._morceaux = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._morceaux.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def vider(self):
+        donnees = b''.join(self._morceaux)
+        self._morceaux = []
+        return donnees
+
+
+def exporter_zip(factures, archive, executor, fenetre=8):
+    """Archive ZIP des factures [(commande, plats)], produite morceau par morceau.
+
+    Les PDF déjà présents dans ``archive`` sont repris tels quels, les autres
+    sont rendus par ``executor`` (au plus ``fenetre`` rendus en cours) puis
+    archivés. L'ordre des commandes est conservé.
+    """
+    flux = _FluxZip()
+    en_cours = collections.deque()
+
+    def ecrire(commande, contenu):
+        info = zipfile.ZipInfo(f"facture_{commande['idcom']}.pdf", date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED  # PDF déjà compressés
+        fichier_zip.writestr(info, contenu)
+        return flux.vider()
+
+    with zipfile.ZipFile(flux, 'w') as fichier_zip:
+        for commande, plats in factures:
+            empreinte = empreinte_facture(commande, plats)
+            contenu = archive.lire(commande['idcom'], empreinte)
+            if contenu is not None:
+                en_cours.append((commande, empreinte, contenu))
+            else:
+                en_cours.append((commande, empreinte, executor.submit(rendre_facture, commande, plats)))
+
+            while len(en_cours) > fenetre or (en_cours and not _en_attente(en_cours[0][2])):
+                yield ecrire(*_resultat(en_cours.popleft(), archive))
+
+        while en_cours:
+            yield ecrire(*_resultat(en_cours.popleft(), archive))
+
+    yield flux.vider()
+
+
+def _en_attente(contenu):
+    return not isinstance(contenu, bytes) and not contenu.done()
+
+
+def _resultat(element, archive):
+    commande, empreinte, contenu = element
+    if not isinstance(contenu, bytes):
+        contenu = contenu.result()
+        archive.put(commande['idcom'], empreinte, contenu)
+    return commande, contenu
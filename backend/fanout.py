@@ -0,0 +1,101 @@
+"""Lectures indépendantes exécutées en parallèle, chacune sur sa connexion.
+
+Une route qui enchaîne des requêtes de lecture sans lien entre elles (tableau
+de bord, en-tête et lignes d'une facture) les confie à ``LecturesParalleles`` :
+le temps de réponse devient celui de la plus lente au lieu de leur somme.
+Chaque lecture a un délai ; celles qui échouent ou le dépassent sont
+signalées sans faire échouer les autres.
+"""
+import concurrent.futures
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+
+from db_pool import PoolTimeout
+
+DELAI_DEPASSE = 'Délai dépassé'
+
+
+def requete(sql, params=(), un=False):
+    # Lecture simple : fonction(cursor) qui exécute sql et renvoie les lignes (ou la première)
+    def lire(cursor):
+        cursor.execute(sql, params)
+        return cursor.fetchone() if un else cursor.fetchall()
+    return lire
+
+
+class LecturesParalleles:
+    """Pool de threads de lecture.
+
+    ``acquerir()`` emprunte une connexion (rendue par ``close()``). Une lecture
+    qui dépasse son délai n'est pas interrompue côté serveur : son résultat
+    est ignoré et sa connexion revient au pool à la fin de la requête SQL.
+    """
+
+    def __init__(self, acquerir, workers=8, timeout=5.0):
+        self._acquerir = acquerir
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lecture')
+        self._lock = threading.Lock()
+        self._lectures = 0
+        self._erreurs = 0
+        self._delais_depasses = 0
+
+    def _lire(self, lecture):
+        conn = self._acquerir()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return lecture(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def executer(self, lectures, timeout=None, delais=None):
+        """Exécute ``lectures`` {nom: fonction(cursor)} en parallèle.
+
+        Renvoie (résultats, erreurs) : {nom: valeur} pour les lectures
+        abouties, {nom: message} pour les autres. ``timeout`` s'applique à
+        chaque lecture depuis son lancement, ``delais`` {nom: secondes} le
+        remplace pour certaines.
+        """
+        debut = time.monotonic()
+        # Contexte copié : les mesures de la requête HTTP suivent les lectures
+        futures = {nom: self._executor.submit(contextvars.copy_context().run, self._lire, lecture)
+                   for nom, lecture in lectures.items()}
+
+        resultats = {}
+        erreurs = {}
+        delai_defaut = self.timeout if timeout is None else timeout
+        for nom, future in futures.items():
+            delai = (delais or {}).get(nom, delai_defaut)
+            try:
+                resultats[nom] = future.result(max(0.0, debut + delai - time.monotonic()))
+            except concurrent.futures.TimeoutError:
+                # Pas encore lancée (pool saturé) : retirée de la file
+                future.cancel()
+                erreurs[nom] = DELAI_DEPASSE
+            except (Error, PoolTimeout) as e:
+                erreurs[nom] = str(e)
+
+        with self._lock:
+            self._lectures += len(futures)
+            self._erreurs += sum(1 for e in erreurs.values() if e != DELAI_DEPASSE)
+            self._delais_depasses += sum(1 for e in erreurs.values() if e == DELAI_DEPASSE)
+        return resultats, erreurs
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'timeout': self.timeout,
+                'lectures': self._lectures,
+                'erreurs': self._erreurs,
+                'delais_depasses': self._delais_depasses,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
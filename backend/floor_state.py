@@ -0,0 +1,193 @@
+import datetime
+import threading
+import time
+
+from mysql.connector import Error
+
+
+def as_datetime(valeur):
+    # Les routes manipulent des dates ISO, MySQL renvoie des datetime naïfs
+    if isinstance(valeur, datetime.datetime):
+        return valeur.replace(tzinfo=None)
+    return datetime.datetime.fromisoformat(str(valeur).replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+class FloorState:
+    """État de la salle en mémoire : tables, occupation et réservations à venir.
+
+    Les routes d'écriture répercutent leurs changements après commit
+    (écriture traversante) avec la version ``tables`` ou ``reservations``
+    obtenue par ``bump_version``. Si une version intermédiaire manque (écriture
+    d'un autre processus), l'état est rechargé. Les versions en base sont
+    relues au plus toutes les ``check_interval`` secondes et l'état complet
+    est réconcilié avec MySQL toutes les ``reconcile_interval`` secondes.
+    """
+
+    ENTITES = ('tables', 'reservations')
+
+    def __init__(self, check_interval=2.0, reconcile_interval=60.0):
+        self.check_interval = check_interval
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._tables = None
+        self._reservations = {}
+        self._versions = {}
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    # ----- Lectures -----
+    def tables(self, get_conn):
+        now = datetime.datetime.now()
+        with self._lock:
+            self._ensure(get_conn)
+            resultat = []
+            for idtable, table in self._tables.items():
+                table = dict(table)
+                table['reservations'] = len(self._en_cours(idtable, now))
+                resultat.append(table)
+            return resultat
+
+    def table(self, get_conn, idtable):
+        now = datetime.datetime.now()
+        with self._lock:
+            self._ensure(get_conn)
+            cle = self._cle(idtable)
+            if cle is None:
+                return None
+            table = dict(self._tables[cle])
+            table['reservations'] = [dict(r) for r in self._en_cours(cle, now)]
+            prochaine = next((r for r in self._reservations.get(cle, [])
+                              if r['date_de_reserv'] > now), None)
+            table['prochaine_reservation'] = dict(prochaine) if prochaine else None
+            return table
+
+    def _cle(self, idtable):
+        # Comparaison insensible à la casse, comme la collation MySQL
+        if idtable in self._tables:
+            return idtable
+        cible = str(idtable).casefold()
+        return next((k for k in self._tables if str(k).casefold() == cible), None)
+
+    def _en_cours(self, idtable, now):
+        return [r for r in self._reservations.get(idtable, [])
+                if r['date_de_reserv'] <= now <= r['date_reserve']]
+
+    # ----- Écritures traversantes -----
+    def set_occupations(self, changements, version):
+        # changements : [(idtable, occupation)] appliqués dans l'ordre, une seule version
+        with self._lock:
+            if self._avancer('tables', version):
+                for idtable, occupation in changements:
+                    cle = self._cle(idtable)
+                    if cle is not None:
+                        self._tables[cle]['occupation'] = 1 if occupation else 0
+
+    def upsert_table(self, table, version):
+        with self._lock:
+            if self._avancer('tables', version):
+                cle = self._cle(table['idtable'])
+                if cle is None:
+                    cle = table['idtable']
+                    self._tables[cle] = {'idtable': cle}
+                self._tables[cle].update({
+                    'designation': table['designation'],
+                    'occupation': 1 if table.get('occupation') else 0
+                })
+
+    def remove_table(self, idtable, version):
+        with self._lock:
+            if self._avancer('tables', version):
+                cle = self._cle(idtable)
+                if cle is not None:
+                    del self._tables[cle]
+                    self._reservations.pop(cle, None)
+
+    def upsert_reservation(self, reservation, version):
+        with self._lock:
+            if self._avancer('reservations', version):
+                self._retirer_reservation(reservation['idreserv'])
+                reservation = dict(reservation)
+                reservation['date_de_reserv'] = as_datetime(reservation['date_de_reserv'])
+                reservation['date_reserve'] = as_datetime(reservation['date_reserve'])
+                if reservation['date_reserve'] < datetime.datetime.now():
+                    return
+                cle = self._cle(reservation['idtable'])
+                if cle is None:
+                    return
+                liste = self._reservations.setdefault(cle, [])
+                liste.append(reservation)
+                liste.sort(key=lambda r: r['date_de_reserv'])
+
+    def remove_reservation(self, idreserv, version):
+        with self._lock:
+            if self._avancer('reservations', version):
+                self._retirer_reservation(idreserv)
+
+    def _retirer_reservation(self, idreserv):
+        cible = str(idreserv).casefold()
+        for liste in self._reservations.values():
+            liste[:] = [r for r in liste if str(r['idreserv']).casefold() != cible]
+
+    def _avancer(self, entite, version):
+        # Applique l'écriture seulement si elle suit directement la version connue ;
+        # sinon l'état est marqué à recharger à la prochaine lecture
+        if self._tables is None:
+            return False
+        if self._versions.get(entite) == version - 1:
+            self._versions[entite] = version
+            return True
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        return False
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+            self._loaded_at = 0.0
+
+    # ----- Synchronisation avec MySQL -----
+    def _ensure(self, get_conn):
+        now = time.monotonic()
+        if self._tables is not None and now - self._checked_at < self.check_interval \
+                and now - self._loaded_at < self.reconcile_interval:
+            return
+
+        conn = get_conn()
+        if not conn:
+            raise Error('Database connection failed')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            placeholders = ', '.join(['%s'] * len(self.ENTITES))
+            cursor.execute(
+                f"SELECT entity, version FROM data_version WHERE entity IN ({placeholders})",
+                self.ENTITES)
+            versions = {e: 0 for e in self.ENTITES}
+            versions.update({r['entity']: r['version'] for r in cursor.fetchall()})
+
+            if self._tables is None or versions != self._versions \
+                    or now - self._loaded_at >= self.reconcile_interval:
+                self._charger(cursor)
+                self._loaded_at = time.monotonic()
+            self._versions = versions
+            self._checked_at = time.monotonic()
+        finally:
+            cursor.close()
+
+    def _charger(self, cursor):
+        cursor.execute("SELECT * FROM restaurant_tables")
+        tables = {t['idtable']: t for t in cursor.fetchall()}
+
+        cursor.execute("""
+            SELECT * FROM reserver
+            WHERE date_reserve >= NOW()
+            ORDER BY date_de_reserv
+        """)
+        reservations = {}
+        cles = {str(k).casefold(): k for k in tables}
+        for r in cursor.fetchall():
+            cle = cles.get(str(r['idtable']).casefold())
+            if cle is not None:
+                reservations.setdefault(cle, []).append(r)
+
+        self._tables = tables
+        self._reservations = reservations
@@ -0,0 +1,47 @@
+"""Configuration gunicorn : plusieurs processus de travail, chacun avec ses threads.
+
+L'application est chargée une fois dans le processus maître (preload_app) :
+avec WARMUP=true, les caches y sont remplis avant le fork et partagés par les
+processus de travail, qui ouvrent ensuite leurs propres connexions
+(``apres_fork``). Chaque processus a son pool de DB_POOL_SIZE connexions.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+wsgi_app = 'wsgi:app'
+preload_app = True
+
+# Processus : un par cœur par défaut ; threads : les flux SSE et les attentes
+# longues de la cuisine occupent chacun un thread pendant toute la connexion,
+# au plus LONG_CONNECTIONS_MAX par processus (503 au-delà) pour que les autres
+# requêtes gardent WEB_THREADS - LONG_CONNECTIONS_MAX threads
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 16))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+keepalive = 5
+
+# Arrêt (SIGTERM) : les requêtes en cours ont GRACEFUL_TIMEOUT secondes pour se terminer
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+
+accesslog = '-'
+
+# Instantanés des métriques de chaque processus, additionnés par GET /metrics
+os.environ.setdefault('METRICS_DIR', '/tmp/resto-metriques')
+
+
+def on_starting(server):
+    # Compteurs remis à zéro à chaque démarrage du serveur
+    # (instantanés des métriques et des empreintes SQL)
+    for dossier in (os.environ['METRICS_DIR'], os.path.join(os.environ['METRICS_DIR'], 'requetes')):
+        if os.path.isdir(dossier):
+            for nom in os.listdir(dossier):
+                if nom.endswith('.json'):
+                    os.remove(os.path.join(dossier, nom))
+
+
+def worker_exit(server, worker):
+    from app import arreter
+    arreter()
@@ -0,0 +1,481 @@
+"""Import en masse du menu, des tables, des réservations et des commandes.
+
+Les enregistrements (CSV ou NDJSON) sont lus au fil du flux, validés selon
+les règles des routes POST correspondantes puis écrits par lots : un INSERT
+multi-lignes et une transaction par lot. Une ligne refusée est signalée dans
+le rapport sans interrompre l'import.
+
+Le débit n'a pas été mesuré sur un serveur MySQL (le banc d'essai de bench/
+ne couvre pas les imports) : il dépend du serveur et de IMPORT_BATCH_SIZE, et
+se déduit de ``importees`` et ``duree_ms`` dans le rapport.
+"""
+import csv
+import datetime
+import io
+import json
+import time
+
+from mysql.connector import Error
+
+from clients import maj_clients_lot
+from ventes import maj_ventes_lot
+
+ENTITES = ('menu', 'tables', 'reservations', 'commandes')
+FORMATS = ('csv', 'ndjson')
+
+TYPES_COMMANDE = ('sur place', 'à emporter')
+STATUTS_COMMANDE = ('en attente', 'en cours', 'terminé', 'payé')
+
+# Nombre maximal d'erreurs détaillées dans le rapport (toutes sont comptées)
+MAX_ERREURS = 1000
+
+
+class LigneInvalide(ValueError):
+    pass
+
+
+# ----- Lecture des flux -----
+def lire_lignes(flux, format):
+    """(numéro de ligne, enregistrement) au fil du flux binaire ``flux``.
+
+    Une ``LigneInvalide`` remplace l'enregistrement quand la ligne est illisible.
+    En CSV, les colonnes vides sont considérées comme absentes.
+    """
+    if not isinstance(flux, io.BufferedIOBase):
+        flux = io.BufferedReader(flux)
+    texte = io.TextIOWrapper(flux, encoding='utf-8-sig', newline='')
+
+    if format == 'csv':
+        lecteur = csv.DictReader(texte)
+        for ligne in lecteur:
+            if None in ligne:
+                yield lecteur.line_num, LigneInvalide('Nombre de colonnes incorrect')
+                continue
+            yield lecteur.line_num, {k: v for k, v in ligne.items() if v not in ('', None)}
+        return
+
+    for numero, ligne in enumerate(texte, 1):
+        if not ligne.strip():
+            continue
+        try:
+            donnees = json.loads(ligne)
+        except ValueError as e:
+            yield numero, LigneInvalide(f"JSON invalide : {e}")
+            continue
+        if not isinstance(donnees, dict):
+            yield numero, LigneInvalide('Objet JSON attendu')
+            continue
+        yield numero, donnees
+
+
+def regrouper_commandes(lignes):
+    # CSV des commandes : une ligne par plat (idplat, quantite, prix_unitaire),
+    # les lignes consécutives de même idcom forment une commande
+    courante = None
+    for numero, ligne in lignes:
+        if isinstance(ligne, LigneInvalide) or 'plats' in ligne:
+            if courante:
+                yield courante
+                courante = None
+            yield numero, ligne
+            continue
+
+        plat = {k: ligne.pop(k) for k in ('idplat', 'quantite', 'prix_unitaire') if k in ligne}
+        if courante and ligne.get('idcom') is not None and ligne.get('idcom') == courante[1].get('idcom'):
+            if plat:
+                courante[1]['plats'].append(plat)
+            continue
+
+        if courante:
+            yield courante
+        courante = (numero, dict(ligne, plats=[plat] if plat else []))
+    if courante:
+        yield courante
+
+
+# ----- Conversions -----
+def _requis(ligne, champs):
+    if not all(ligne.get(champ) not in (None, '') for champ in champs):
+        raise LigneInvalide('Champs manquants')
+
+
+def _entier(valeur, champ):
+    # Nombre entier uniquement : 2.7 ou "2.7" sont refusés plutôt que tronqués
+    if isinstance(valeur, bool) or (isinstance(valeur, float) and not valeur.is_integer()):
+        raise LigneInvalide(f"{champ} invalide : {valeur!r}")
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise LigneInvalide(f"{champ} invalide : {valeur!r}")
+
+
+def _nombre(valeur, champ):
+    if isinstance(valeur, (int, float)):
+        return valeur
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        try:
+            return float(valeur)
+        except (TypeError, ValueError):
+            raise LigneInvalide(f"{champ} invalide : {valeur!r}")
+
+
+def _booleen(valeur):
+    if isinstance(valeur, str):
+        return valeur.strip().lower() in ('1', 'true', 'vrai', 'oui')
+    return bool(valeur)
+
+
+def _datetime(valeur, champ):
+    try:
+        return datetime.datetime.fromisoformat(str(valeur).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise LigneInvalide(f"{champ} invalide : {valeur!r}")
+
+
+def _placeholders(valeurs):
+    return ', '.join(['%s'] * len(valeurs))
+
+
+def _existants(cursor, sql, cles):
+    # Clés déjà en base parmi ``cles`` (comparaison sans casse, comme la collation)
+    if not cles:
+        return set()
+    cursor.execute(sql.format(placeholders=_placeholders(cles)), list(cles))
+    return {str(row[0]).casefold() for row in cursor.fetchall()}
+
+
+# ----- Entités -----
+class ImportMenu:
+    version = 'menu'
+
+    def __init__(self, cursor):
+        pass
+
+    def valider(self, ligne):
+        _requis(ligne, ['idplat', 'nomplat', 'pu'])
+        return {'idplat': str(ligne['idplat']), 'nomplat': ligne['nomplat'], 'pu': _entier(ligne['pu'], 'pu')}
+
+    def verifier_lot(self, cursor, lot, erreur):
+        existants = _existants(cursor, "SELECT idplat FROM menu WHERE idplat IN ({placeholders})",
+                               [d['idplat'] for _, d in lot])
+        acceptees = []
+        for numero, d in lot:
+            cle = d['idplat'].casefold()
+            if cle in existants:
+                erreur(numero, f"Plat {d['idplat']} déjà présent")
+                continue
+            existants.add(cle)
+            acceptees.append((numero, d))
+        return acceptees
+
+    def inserer(self, cursor, donnees):
+        cursor.executemany(
+            "INSERT INTO menu (idplat, nomplat, pu) VALUES (%s, %s, %s)",
+            [(d['idplat'], d['nomplat'], d['pu']) for d in donnees]
+        )
+
+    def apres_lot(self, cursor, donnees):
+        pass
+
+
+class ImportTables:
+    version = 'tables'
+
+    def __init__(self, cursor):
+        pass
+
+    def valider(self, ligne):
+        _requis(ligne, ['idtable', 'designation'])
+        return {
+            'idtable': str(ligne['idtable']),
+            'designation': ligne['designation'],
+            'occupation': _booleen(ligne.get('occupation', False))
+        }
+
+    def verifier_lot(self, cursor, lot, erreur):
+        existants = _existants(cursor, "SELECT idtable FROM restaurant_tables WHERE idtable IN ({placeholders})",
+                               [d['idtable'] for _, d in lot])
+        acceptees = []
+        for numero, d in lot:
+            cle = d['idtable'].casefold()
+            if cle in existants:
+                erreur(numero, f"Table {d['idtable']} déjà présente")
+                continue
+            existants.add(cle)
+            acceptees.append((numero, d))
+        return acceptees
+
+    def inserer(self, cursor, donnees):
+        cursor.executemany(
+            "INSERT INTO restaurant_tables (idtable, designation, occupation) VALUES (%s, %s, %s)",
+            [(d['idtable'], d['designation'], d['occupation']) for d in donnees]
+        )
+
+    def apres_lot(self, cursor, donnees):
+        pass
+
+
+class ImportReservations:
+    # Même sémantique que POST /reservations : un idreserv existant est mis à jour
+    version = 'reservations'
+
+    def __init__(self, cursor):
+        cursor.execute("SELECT idtable FROM restaurant_tables")
+        self.tables = {str(row[0]).casefold() for row in cursor.fetchall()}
+
+    def valider(self, ligne):
+        _requis(ligne, ['idreserv', 'idtable', 'date_de_reserv', 'nomcli'])
+        if str(ligne['idtable']).casefold() not in self.tables:
+            raise LigneInvalide('Table introuvable')
+
+        debut = _datetime(ligne['date_de_reserv'], 'date_de_reserv')
+        # Date de fin de réservation (par défaut +2h si non fournie)
+        if ligne.get('date_reserve'):
+            fin = _datetime(ligne['date_reserve'], 'date_reserve')
+        else:
+            fin = debut + datetime.timedelta(hours=2)
+        return {
+            'idreserv': str(ligne['idreserv']),
+            'idtable': str(ligne['idtable']),
+            'date_de_reserv': debut,
+            'date_reserve': fin,
+            'nomcli': ligne['nomcli']
+        }
+
+    def verifier_lot(self, cursor, lot, erreur):
+        # Réservations existantes des tables du lot sur la période couverte,
+        # puis contrôle des chevauchements [debut, fin) en mémoire
+        tables = list({d['idtable'] for _, d in lot})
+        debut = min(d['date_de_reserv'] for _, d in lot)
+        fin = max(d['date_reserve'] for _, d in lot)
+        cursor.execute(f"""
+            SELECT idreserv, idtable, date_de_reserv, date_reserve
+            FROM reserver
+            WHERE idtable IN ({_placeholders(tables)})
+            AND date_de_reserv < %s
+            AND date_reserve > %s
+        """, tables + [fin, debut])
+        par_table = {}
+        for idreserv, idtable, d_debut, d_fin in cursor.fetchall():
+            par_table.setdefault(str(idtable).casefold(), {})[str(idreserv).casefold()] = (d_debut, d_fin)
+
+        # Anciens clients des réservations mises à jour, pour le résumé client
+        ids = [d['idreserv'] for _, d in lot]
+        cursor.execute(f"SELECT idreserv, nomcli FROM reserver WHERE idreserv IN ({_placeholders(ids)})", ids)
+        self.anciens_noms = {str(row[0]).casefold(): row[1] for row in cursor.fetchall()}
+
+        acceptees = []
+        for numero, d in lot:
+            idreserv = d['idreserv'].casefold()
+            occupees = par_table.setdefault(d['idtable'].casefold(), {})
+            if any(autre != idreserv and r_debut < d['date_reserve'] and r_fin > d['date_de_reserv']
+                   for autre, (r_debut, r_fin) in occupees.items()):
+                erreur(numero, 'Conflit de réservation: la table est déjà réservée pour cette période')
+                continue
+            # Une réservation déplacée libère son ancien créneau
+            for creneaux in par_table.values():
+                creneaux.pop(idreserv, None)
+            occupees[idreserv] = (d['date_de_reserv'], d['date_reserve'])
+            acceptees.append((numero, d))
+        return acceptees
+
+    def inserer(self, cursor, donnees):
+        cursor.executemany("""
+            INSERT INTO reserver
+            (idreserv, idtable, date_de_reserv, date_reserve, nomcli)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            idtable = VALUES(idtable),
+            date_de_reserv = VALUES(date_de_reserv),
+            date_reserve = VALUES(date_reserve),
+            nomcli = VALUES(nomcli)
+        """, [(d['idreserv'], d['idtable'], d['date_de_reserv'], d['date_reserve'], d['nomcli']) for d in donnees])
+
+    def apres_lot(self, cursor, donnees):
+        noms = [d['nomcli'] for d in donnees]
+        noms += [self.anciens_noms[d['idreserv'].casefold()] for d in donnees
+                 if d['idreserv'].casefold() in self.anciens_noms]
+        maj_clients_lot(cursor, noms)
+
+
+class ImportCommandes:
+    """Commandes historiques : contrôles de POST /commandes hors occupation des
+    tables (une commande importée ne bloque pas la salle). Le prix unitaire
+    est celui du menu, sauf ``prix_unitaire`` fourni sur la ligne."""
+
+    version = 'commandes'
+
+    def __init__(self, cursor):
+        cursor.execute("SELECT idtable FROM restaurant_tables")
+        self.tables = {str(row[0]).casefold() for row in cursor.fetchall()}
+        cursor.execute("SELECT idplat, pu FROM menu")
+        self.prix = {str(row[0]).casefold(): row[1] for row in cursor.fetchall()}
+
+    def valider(self, ligne):
+        _requis(ligne, ['idcom', 'nomcli', 'typecom'])
+        if 'plats' not in ligne:
+            raise LigneInvalide('Champs manquants')
+        if not isinstance(ligne['plats'], list):
+            raise LigneInvalide('plats doit être une liste')
+        if not isinstance(ligne['typecom'], str) or ligne['typecom'] not in TYPES_COMMANDE:
+            raise LigneInvalide(f"typecom invalide : {ligne['typecom']!r}")
+        statut = ligne.get('statut', 'en attente')
+        if not isinstance(statut, str) or statut not in STATUTS_COMMANDE:
+            raise LigneInvalide(f"statut invalide : {statut!r}")
+
+        # Vérification de la table pour les commandes sur place
+        if ligne['typecom'] == 'sur place':
+            if not ligne.get('idtable'):
+                raise LigneInvalide('Table requise pour commande sur place')
+            if str(ligne['idtable']).casefold() not in self.tables:
+                raise LigneInvalide('Table introuvable')
+
+        plats = []
+        montant_total = 0
+        for plat in ligne['plats']:
+            if not isinstance(plat, dict) or not plat.get('idplat'):
+                raise LigneInvalide('Plat sans idplat')
+            pu = self.prix.get(str(plat['idplat']).casefold())
+            if pu is None:
+                raise LigneInvalide(f'Plat {plat["idplat"]} introuvable')
+            quantite = _entier(plat.get('quantite', 1), 'quantite')
+            if 'prix_unitaire' in plat:
+                pu = _nombre(plat['prix_unitaire'], 'prix_unitaire')
+            montant_total += pu * quantite
+            plats.append((str(plat['idplat']), quantite, pu))
+
+        if ligne.get('datecom'):
+            datecom = _datetime(ligne['datecom'], 'datecom')
+        else:
+            datecom = datetime.datetime.now()
+
+        return {
+            'idcom': str(ligne['idcom']),
+            'nomcli': ligne['nomcli'],
+            'typecom': ligne['typecom'],
+            'idtable': ligne.get('idtable'),
+            'datecom': datecom,
+            'statut': statut,
+            'montant_total': montant_total,
+            'plats': plats
+        }
+
+    def verifier_lot(self, cursor, lot, erreur):
+        existants = _existants(cursor, "SELECT idcom FROM commande WHERE idcom IN ({placeholders})",
+                               [d['idcom'] for _, d in lot])
+        acceptees = []
+        for numero, d in lot:
+            cle = d['idcom'].casefold()
+            if cle in existants:
+                erreur(numero, f"Commande {d['idcom']} déjà présente")
+                continue
+            existants.add(cle)
+            acceptees.append((numero, d))
+        return acceptees
+
+    def inserer(self, cursor, donnees):
+        cursor.executemany("""
+            INSERT INTO commande
+            (idcom, nomcli, typecom, idtable, datecom, statut, montant_total)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [(d['idcom'], d['nomcli'], d['typecom'], d['idtable'], d['datecom'], d['statut'], d['montant_total'])
+              for d in donnees])
+
+        lignes = [(d['idcom'], idplat, quantite, pu) for d in donnees for idplat, quantite, pu in d['plats']]
+        if lignes:
+            cursor.executemany("""
+                INSERT INTO commande_plats
+                (idcom, idplat, quantite, prix_unitaire)
+                VALUES (%s, %s, %s, %s)
+            """, lignes)
+
+    def apres_lot(self, cursor, donnees):
+        # Agrégats de ventes et résumé client, une requête ensembliste chacun
+        maj_ventes_lot(cursor, [d['idcom'] for d in donnees])
+        maj_clients_lot(cursor, [d['nomcli'] for d in donnees])
+
+
+IMPORTEURS = {
+    'menu': ImportMenu,
+    'tables': ImportTables,
+    'reservations': ImportReservations,
+    'commandes': ImportCommandes,
+}
+
+
+def importer(conn, entite, lignes, taille_lot=1000, fin_lot=None):
+    """Importe les enregistrements ``lignes`` [(numéro, dict)] par lots de
+    ``taille_lot``. ``fin_lot(cursor)`` est appelé dans la transaction de
+    chaque lot écrit, avant le commit. Renvoie le rapport d'import."""
+    debut = time.monotonic()
+    cursor = conn.cursor()
+    rapport = {'entite': entite, 'enregistrements': 0, 'importees': 0, 'lots': 0, 'nb_erreurs': 0, 'erreurs': []}
+
+    def erreur(numero, message):
+        rapport['nb_erreurs'] += 1
+        if len(rapport['erreurs']) < MAX_ERREURS:
+            rapport['erreurs'].append({'ligne': numero, 'error': message})
+
+    def ecrire(lot):
+        acceptees = importeur.verifier_lot(cursor, lot, erreur)
+        if not acceptees:
+            conn.rollback()
+            return
+        try:
+            importeur.inserer(cursor, [d for _, d in acceptees])
+        except Error:
+            # Lot refusé par MySQL : reprise ligne par ligne pour isoler les fautives
+            conn.rollback()
+            valides = []
+            for numero, d in acceptees:
+                cursor.execute("SAVEPOINT ligne_import")
+                try:
+                    importeur.inserer(cursor, [d])
+                    valides.append((numero, d))
+                except Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT ligne_import")
+                    erreur(numero, str(e))
+            acceptees = valides
+            if not acceptees:
+                conn.rollback()
+                return
+
+        importeur.apres_lot(cursor, [d for _, d in acceptees])
+        if fin_lot:
+            fin_lot(cursor)
+        conn.commit()
+        rapport['importees'] += len(acceptees)
+        rapport['lots'] += 1
+
+    try:
+        importeur = IMPORTEURS[entite](cursor)
+        if entite == 'commandes':
+            lignes = regrouper_commandes(lignes)
+
+        lot = []
+        for numero, ligne in lignes:
+            rapport['enregistrements'] += 1
+            if isinstance(ligne, LigneInvalide):
+                erreur(numero, str(ligne))
+                continue
+            try:
+                lot.append((numero, importeur.valider(ligne)))
+            except LigneInvalide as e:
+                erreur(numero, str(e))
+                continue
+            if len(lot) >= taille_lot:
+                ecrire(lot)
+                lot = []
+        if lot:
+            ecrire(lot)
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    rapport['erreurs'].sort(key=lambda e: e['ligne'])
+    rapport['duree_ms'] = round((time.monotonic() - debut) * 1000, 3)
+    return rapport
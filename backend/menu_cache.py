@@ -0,0 +1,84 @@
+import threading
+import time
+
+from mysql.connector import Error
+
+from search_index import TrigramIndex
+
+
+class MenuCache:
+    """Copie en mémoire de la table ``menu``.
+
+    Le cache est associé à la version ``menu`` de la table ``data_version``.
+    Les écritures locales l'invalident immédiatement ; les écritures faites
+    par un autre processus sont détectées en relisant cette version au plus
+    toutes les ``check_interval`` secondes.
+    """
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._plats = None
+        self._par_id = {}
+        self._index = TrigramIndex()
+        self._version = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+            self._version = None
+
+    def plats(self, get_conn, search=''):
+        plats = self._ensure(get_conn)
+        if search:
+            return [dict(plat) for plat, _ in self.recherche(get_conn, search)]
+        return [dict(p) for p in plats]
+
+    def recherche(self, get_conn, terme, limite=None):
+        # [(plat, score)] classés par pertinence (index de trigrammes sur nomplat)
+        self._ensure(get_conn)
+        par_id = self._par_id
+        return [(par_id[cle], score) for cle, score in self._index.search(terme, limite)
+                if cle in par_id]
+
+    def plat(self, get_conn, idplat):
+        self._ensure(get_conn)
+        plat = self._par_id.get(str(idplat).casefold())
+        return dict(plat) if plat else None
+
+    def _ensure(self, get_conn):
+        now = time.monotonic()
+        if self._plats is not None and self._version is not None \
+                and now - self._checked_at < self.check_interval:
+            return self._plats
+
+        with self._lock:
+            if self._plats is not None and self._version is not None \
+                    and time.monotonic() - self._checked_at < self.check_interval:
+                return self._plats
+
+            conn = get_conn()
+            if not conn:
+                raise Error('Database connection failed')
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("SELECT version FROM data_version WHERE entity = 'menu'")
+                row = cursor.fetchone()
+                version = row['version'] if row else 0
+
+                if self._plats is None or version != self._version:
+                    cursor.execute("SELECT * FROM menu")
+                    plats = cursor.fetchall()
+                    index = TrigramIndex()
+                    for plat in plats:
+                        index.add(str(plat['idplat']).casefold(), plat['nomplat'])
+                    self._par_id = {str(p['idplat']).casefold(): p for p in plats}
+                    self._index = index
+                    self._plats = plats
+            finally:
+                cursor.close()
+
+            self._version = version
+            self._checked_at = time.monotonic()
+            return self._plats
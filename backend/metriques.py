@@ -0,0 +1,332 @@
+"""Métriques des requêtes au format texte de Prometheus (``GET /metrics``).
+
+Compteurs et histogrammes tenus en mémoire par processus. Avec plusieurs
+processus de travail, chacun écrit régulièrement, sur un thread à part
+(``EcritureInstantanes``), un instantané dans ``dossier`` et ``exposer()``
+additionne ceux de tous les processus : la réponse ne dépend pas du processus
+qui reçoit la requête de collecte. Les instantanés des processus arrêtés sont
+cumulés dans ``processus-arretes.json`` pour que les compteurs ne reculent pas.
+"""
+import bisect
+import contextlib
+import contextvars
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Durées des requêtes SQL de la requête HTTP en cours (une liste par requête,
+# partagée avec les threads de lectures parallèles par copie du contexte)
+sql_requete = contextvars.ContextVar('sql_requete', default=None)
+
+DUREES = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TAILLES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+NOMBRES = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+ATTENTES = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+# nom : (type, aide, seuils des histogrammes)
+DEFINITIONS = {
+    'resto_http_requests_total': ('counter', 'Requêtes HTTP par route, méthode et statut.', None),
+    'resto_http_request_duration_seconds': ('histogram', "Durée des requêtes HTTP jusqu'à l'envoi des en-têtes.", DUREES),
+    'resto_http_response_size_bytes': ('histogram', 'Taille du corps des réponses.', TAILLES),
+    'resto_sql_statements_total': ('counter', 'Requêtes SQL exécutées par route.', None),
+    'resto_sql_duration_seconds_total': ('counter', 'Temps passé dans les requêtes SQL par route.', None),
+    'resto_sql_statements_per_request': ('histogram', 'Nombre de requêtes SQL par requête HTTP.', NOMBRES),
+    'resto_db_pool_acquire_wait_seconds': ('histogram', "Attente d'une connexion du pool.", ATTENTES),
+}
+
+
+# Instantané cumulé des processus arrêtés, lu comme celui d'un processus
+ARRETES = 'processus-arretes.json'
+
+
+class Metriques:
+    def __init__(self, dossier=None):
+        self.dossier = dossier
+        self._lock = threading.Lock()
+        self._valeurs = {}
+
+    # ----- Enregistrement -----
+    def compteur(self, nom, labels, valeur=1):
+        with self._lock:
+            self._compter(nom, labels, valeur)
+
+    def observer(self, nom, labels, valeur):
+        with self._lock:
+            self._observer(nom, labels, valeur)
+
+    def requete(self, labels, statut, duree, durees_sql, taille=None):
+        # Toutes les mesures d'une requête HTTP sous une seule prise du verrou ;
+        # taille None : corps en flux, mesuré à la fin de l'envoi
+        with self._lock:
+            self._compter('resto_http_requests_total', labels + (('status', str(statut)),))
+            self._observer('resto_http_request_duration_seconds', labels, duree)
+            self._compter('resto_sql_statements_total', labels, len(durees_sql))
+            self._compter('resto_sql_duration_seconds_total', labels, sum(durees_sql))
+            self._observer('resto_sql_statements_per_request', labels, len(durees_sql))
+            if taille is not None:
+                self._observer('resto_http_response_size_bytes', labels, taille)
+
+    def _compter(self, nom, labels, valeur=1):
+        cle = (nom, labels)
+        self._valeurs[cle] = self._valeurs.get(cle, 0) + valeur
+
+    def _observer(self, nom, labels, valeur):
+        # Histogramme : [effectifs par seuil (+Inf compris), somme, nombre]
+        seuils = DEFINITIONS[nom][2]
+        cle = (nom, labels)
+        histogramme = self._valeurs.get(cle)
+        if histogramme is None:
+            histogramme = self._valeurs[cle] = [[0] * (len(seuils) + 1), 0.0, 0]
+        histogramme[0][bisect.bisect_left(seuils, valeur)] += 1
+        histogramme[1] += valeur
+        histogramme[2] += 1
+
+    def reinitialiser(self):
+        # Processus fils : les valeurs du parent ne sont pas les siennes. Verrou
+        # remplacé sans être pris : un autre thread du parent a pu le détenir au fork
+        self._lock = threading.Lock()
+        self._valeurs = {}
+
+    # ----- Instantanés des processus -----
+    def _instantane(self):
+        with self._lock:
+            return [[nom, list(labels), valeur if not isinstance(valeur, list) else
+                     [list(valeur[0]), valeur[1], valeur[2]]]
+                    for (nom, labels), valeur in self._valeurs.items()]
+
+    def enregistrer(self):
+        if self.dossier:
+            ecrire_instantane(self.dossier, self._instantane())
+
+    def nettoyer(self):
+        if self.dossier:
+            nettoyer_instantanes(self.dossier, lambda instantanes: [
+                [nom, list(labels), valeur] for (nom, labels), valeur in additionner(instantanes).items()
+            ])
+
+    def _toutes(self):
+        # Valeurs du processus courant et instantanés des autres (processus arrêtés
+        # compris : les compteurs ne reculent pas quand un processus est remplacé)
+        instantanes = [self._instantane()]
+        if self.dossier:
+            instantanes.extend(lire_instantanes(self.dossier, exclure_courant=True))
+        return additionner(instantanes)
+
+    # ----- Format texte de Prometheus -----
+    def exposer(self):
+        par_nom = {}
+        for (nom, labels), valeur in self._toutes().items():
+            par_nom.setdefault(nom, []).append((labels, valeur))
+
+        lignes = []
+        for nom, (type, aide, seuils) in DEFINITIONS.items():
+            lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type}")
+            for labels, valeur in sorted(par_nom.get(nom, []), key=lambda serie: serie[0]):
+                if type != 'histogram':
+                    lignes.append(f"{nom}{_labels(labels)} {_nombre(valeur)}")
+                    continue
+                effectifs, somme, nombre = valeur
+                cumul = 0
+                for seuil, effectif in zip(seuils + ('+Inf',), effectifs):
+                    cumul += effectif
+                    lignes.append(f"{nom}_bucket{_labels(labels + (('le', _nombre(seuil)),))} {cumul}")
+                lignes.append(f"{nom}_sum{_labels(labels)} {_nombre(somme)}")
+                lignes.append(f"{nom}_count{_labels(labels)} {nombre}")
+        return '\n'.join(lignes) + '\n'
+
+
+def additionner(instantanes):
+    # {(nom, labels): valeur} : compteurs additionnés, histogrammes cumulés seuil par seuil
+    total = {}
+    for instantane in instantanes:
+        for nom, labels, valeur in instantane:
+            cle = (nom, tuple(tuple(l) for l in labels))
+            if not isinstance(valeur, list):
+                total[cle] = total.get(cle, 0) + valeur
+            elif cle not in total:
+                total[cle] = [list(valeur[0]), valeur[1], valeur[2]]
+            else:
+                cumul = total[cle]
+                cumul[0] = [a + b for a, b in zip(cumul[0], valeur[0])]
+                cumul[1] += valeur[1]
+                cumul[2] += valeur[2]
+    return total
+
+
+class EcritureInstantanes:
+    """Écrit toutes les ``intervalle`` secondes, sur un thread à part, les
+    instantanés des ``sources`` (objets avec ``enregistrer()`` et
+    ``nettoyer()``) : les requêtes ne font aucune entrée-sortie pour les
+    métriques. Les instantanés des processus arrêtés sont cumulés toutes les
+    ``intervalle_nettoyage`` secondes."""
+
+    def __init__(self, sources, intervalle=1.0, intervalle_nettoyage=60.0):
+        self.sources = sources
+        self.intervalle = intervalle
+        self.intervalle_nettoyage = intervalle_nettoyage
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        # Aussi appelé dans un processus fils : le thread du parent n'y existe pas
+        self._lock = threading.Lock()
+        self._arret = threading.Event()
+        self._thread = None
+
+    def demarrer(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._boucle, name='instantanes', daemon=True)
+                    self._thread.start()
+
+    def _boucle(self):
+        nettoye_le = 0.0
+        while not self._arret.wait(self.intervalle):
+            self.ecrire()
+            if time.monotonic() - nettoye_le >= self.intervalle_nettoyage:
+                nettoye_le = time.monotonic()
+                for source in self.sources:
+                    try:
+                        source.nettoyer()
+                    except OSError as e:
+                        print(f"Nettoyage des instantanés impossible : {e}")
+
+    def ecrire(self):
+        for source in self.sources:
+            try:
+                source.enregistrer()
+            except OSError as e:
+                print(f"Écriture de l'instantané impossible : {e}")
+
+    def arreter(self):
+        # Dernier instantané du processus, écrit même si le thread n'a pas démarré
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.ecrire()
+
+
+_processus = None
+
+
+def nom_instantane():
+    # <pid>-<démarrage> : un pid réutilisé par un nouveau processus ne reprend
+    # pas l'instantané de l'ancien
+    global _processus
+    pid = os.getpid()
+    if _processus is None or _processus[0] != pid:
+        _processus = (pid, f"{pid}-{time.time_ns()}.json")
+    return _processus[1]
+
+
+@contextlib.contextmanager
+def _verrou(dossier, mode):
+    # Lectures partagées, cumul des processus arrêtés exclusif
+    os.makedirs(dossier, exist_ok=True)
+    with open(os.path.join(dossier, '.verrou'), 'a') as verrou:
+        fcntl.flock(verrou, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(verrou, fcntl.LOCK_UN)
+
+
+def _ecrire_json(dossier, nom, donnees):
+    # Remplacé atomiquement
+    fd, temporaire = tempfile.mkstemp(dir=dossier, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(donnees, f, default=str)
+        os.replace(temporaire, os.path.join(dossier, nom))
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+
+def ecrire_instantane(dossier, donnees):
+    os.makedirs(dossier, exist_ok=True)
+    _ecrire_json(dossier, nom_instantane(), donnees)
+
+
+def _lire(chemin):
+    try:
+        with open(chemin) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def lire_instantanes(dossier, exclure_courant=False):
+    propre = nom_instantane()
+    if not os.path.isdir(dossier):
+        return []
+    instantanes = []
+    with _verrou(dossier, fcntl.LOCK_SH):
+        for nom in os.listdir(dossier):
+            if not nom.endswith('.json') or (exclure_courant and nom == propre):
+                continue
+            instantane = _lire(os.path.join(dossier, nom))
+            if instantane is not None:
+                instantanes.append(instantane)
+    return instantanes
+
+
+def _vivant(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def nettoyer_instantanes(dossier, cumuler):
+    """Cumule dans ``ARRETES`` les instantanés des processus arrêtés, puis les
+    supprime. ``cumuler(instantanes)`` fusionne une liste d'instantanés en un
+    seul. Un processus est arrêté si son pid n'existe plus, ou si un instantané
+    plus récent porte le même pid (pid réutilisé). Renvoie le nombre cumulé."""
+    if not os.path.isdir(dossier):
+        return 0
+    with _verrou(dossier, fcntl.LOCK_EX):
+        par_pid = {}
+        for nom in os.listdir(dossier):
+            pid, _, debut = nom[:-len('.json')].partition('-')
+            if nom.endswith('.json') and pid.isdigit() and debut.isdigit():
+                par_pid.setdefault(int(pid), []).append((int(debut), nom))
+
+        arretes = []
+        for pid, noms in par_pid.items():
+            noms.sort()
+            arretes.extend(nom for _, nom in (noms if not _vivant(pid) else noms[:-1]))
+        if not arretes:
+            return 0
+
+        instantanes = [_lire(os.path.join(dossier, nom)) for nom in [ARRETES] + arretes]
+        _ecrire_json(dossier, ARRETES, cumuler([i for i in instantanes if i is not None]))
+        for nom in arretes:
+            os.remove(os.path.join(dossier, nom))
+        return len(arretes)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{cle}="{_echapper(valeur)}"' for cle, valeur in labels) + '}'
+
+
+def _echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _nombre(valeur):
+    # Seuils et sommes : 0.5, 10, 1e-05... ; '+Inf' inchangé
+    if isinstance(valeur, str):
+        return valeur
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
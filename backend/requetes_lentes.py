@@ -0,0 +1,280 @@
+"""Empreintes des requêtes SQL et journal des requêtes lentes.
+
+Chaque requête exécutée par un curseur du pool (voir ``TimedCursor``) est
+rangée sous son empreinte : le texte SQL dont les valeurs et les listes de
+longueur variable (``IN (...)``, ``UNION ALL``) sont normalisées, pour que les
+requêtes construites dynamiquement par les routes se regroupent. Au-delà du
+seuil, la requête est écrite dans un journal JSON (une ligne par requête,
+avec son plan ``EXPLAIN``) ; le plan est obtenu par un thread à part, sur une
+autre connexion, pour ne pas ralentir la requête HTTP.
+"""
+import collections
+import contextlib
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+from mysql.connector import Error
+
+from db_pool import PoolTimeout
+from metriques import ecrire_instantane, lire_instantanes, nettoyer_instantanes
+
+# Nombre maximal d'empreintes suivies par processus (et de textes SQL mémorisés)
+MAX_EMPREINTES = 5000
+
+# Seules ces requêtes ont un plan (pas les INSERT multi-lignes ni les DDL)
+EXPLICABLES = ('select', 'update', 'delete')
+
+_CHAINE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NOMBRE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETRE = re.compile(r"%s|%\(\w+\)s")
+_LISTE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_LIGNES = re.compile(r"(\(\?\+\))(?:\s*,\s*\(\?\+\))+")
+_UNION = re.compile(r"(SELECT \?(?: as \w+)?)(?: UNION ALL SELECT \?(?: as \w+)?)+", re.IGNORECASE)
+_ESPACES = re.compile(r"\s+")
+
+
+def normaliser(sql):
+    texte = _CHAINE.sub('?', sql)
+    texte = _PARAMETRE.sub('?', texte)
+    texte = _NOMBRE.sub('?', texte)
+    texte = _ESPACES.sub(' ', texte).strip()
+    texte = _LISTE.sub('(?+)', texte)
+    texte = _LIGNES.sub(r'\1, ...', texte)
+    texte = _UNION.sub(r'\1 UNION ALL ...', texte)
+    return texte
+
+
+class JournalRequetes:
+    """Statistiques par empreinte et journal des requêtes de plus de ``seuil`` secondes.
+
+    ``acquerir()`` emprunte la connexion des ``EXPLAIN`` ; un même plan n'est
+    pas redemandé avant ``intervalle_explain`` secondes. Le journal
+    ``fichier`` tourne à ``taille_max`` octets en gardant ``sauvegardes``
+    fichiers ; il peut être partagé par plusieurs processus (flock).
+    """
+
+    def __init__(self, acquerir, seuil=0.2, fichier=None, taille_max=10 * 1024 * 1024,
+                 sauvegardes=5, intervalle_explain=300.0, dossier=None):
+        self._acquerir = acquerir
+        self.seuil = seuil
+        self.fichier = fichier
+        self.taille_max = taille_max
+        self.sauvegardes = sauvegardes
+        self.intervalle_explain = intervalle_explain
+        self.dossier = dossier
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        # Aussi appelé dans un processus fils : ni les valeurs ni le thread du parent
+        self._lock = threading.Lock()
+        self._textes = {}
+        self._empreintes = {}
+        self._expliquees = {}
+        self._ignorees = 0
+        self._perdues = 0
+        self._file = queue.Queue(maxsize=100)
+        self._thread = None
+
+    # ----- Enregistrement -----
+    def _empreinte(self, sql):
+        connue = self._textes.get(sql)
+        if connue is None:
+            texte = normaliser(sql)
+            connue = (hashlib.sha1(texte.encode('utf-8')).hexdigest()[:16], texte)
+            if len(self._textes) >= MAX_EMPREINTES:
+                self._textes.clear()
+            self._textes[sql] = connue
+        return connue
+
+    def observer(self, operation, params, duree, cursor, route=None):
+        if threading.current_thread() is self._thread:
+            return  # EXPLAIN du journal lui-même
+        # executemany : une liste de jeux de paramètres, sans plan unique
+        multiple = isinstance(params, list) and bool(params) and isinstance(params[0], (list, tuple, dict))
+        sql = operation.decode('utf-8') if isinstance(operation, (bytes, bytearray)) else operation
+        empreinte, texte = self._empreinte(sql)
+        lignes = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else 0
+        lente = duree >= self.seuil
+
+        with self._lock:
+            stats = self._empreintes.get(empreinte)
+            if stats is None:
+                if len(self._empreintes) >= MAX_EMPREINTES:
+                    self._ignorees += 1
+                    return
+                stats = self._empreintes[empreinte] = {
+                    'empreinte': empreinte, 'requete': texte, 'nombre': 0, 'total_ms': 0.0,
+                    'max_ms': 0.0, 'lignes': 0, 'lentes': 0, 'routes': {},
+                }
+            stats['nombre'] += 1
+            stats['total_ms'] += duree * 1000
+            stats['max_ms'] = max(stats['max_ms'], duree * 1000)
+            stats['lignes'] += lignes
+            if route and (route in stats['routes'] or len(stats['routes']) < 5):
+                stats['routes'][route] = stats['routes'].get(route, 0) + 1
+            if not lente:
+                return
+            stats['lentes'] += 1
+
+            # Plan demandé au plus une fois par intervalle et par empreinte
+            maintenant = time.monotonic()
+            expliquer = not multiple and texte.split(' ', 1)[0].lower() in EXPLICABLES \
+                and maintenant - self._expliquees.get(empreinte, -self.intervalle_explain) >= self.intervalle_explain
+            if expliquer:
+                self._expliquees[empreinte] = maintenant
+
+        entree = {
+            'horodatage': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'empreinte': empreinte,
+            'requete': texte,
+            'duree_ms': round(duree * 1000, 3),
+            'lignes': lignes,
+            'route': route,
+            'params': None if multiple else _abreger(params),
+        }
+        try:
+            self._file.put_nowait((entree, sql if expliquer else None, params))
+        except queue.Full:
+            with self._lock:
+                self._perdues += 1
+            return
+        self._demarrer()
+
+    # ----- Plans et écriture du journal (thread à part) -----
+    def _demarrer(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._boucle, name='requetes-lentes', daemon=True)
+                    self._thread.start()
+
+    def _boucle(self):
+        while True:
+            entree, sql, params = self._file.get()
+            if sql is not None:
+                entree['plan'] = self._expliquer(sql, params)
+                if isinstance(entree['plan'], list):
+                    entree['lignes_estimees'] = sum(int(l.get('rows') or 0) for l in entree['plan'])
+            try:
+                self._ecrire(entree)
+            except OSError as e:
+                print(f"Journal des requêtes lentes : {e}")
+
+    def _expliquer(self, sql, params):
+        try:
+            conn = self._acquerir()
+        except (Error, PoolTimeout) as e:
+            return {'erreur': str(e)}
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("EXPLAIN " + sql, params)
+            return [{k: (v.decode('utf-8', 'replace') if isinstance(v, (bytes, bytearray)) else v)
+                     for k, v in ligne.items()} for ligne in cursor.fetchall()]
+        except Error as e:
+            return {'erreur': str(e)}
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _ecrire(self, entree):
+        ligne = json.dumps(entree, ensure_ascii=False, default=str) + '\n'
+        if not self.fichier:
+            return
+        with self._verrou_fichier():
+            try:
+                if os.path.getsize(self.fichier) + len(ligne) > self.taille_max:
+                    self._tourner()
+            except FileNotFoundError:
+                pass
+            with open(self.fichier, 'a', encoding='utf-8') as f:
+                f.write(ligne)
+
+    def _tourner(self):
+        # fichier -> fichier.1 -> ... -> fichier.<sauvegardes> (le plus ancien est supprimé)
+        for n in range(self.sauvegardes - 1, 0, -1):
+            if os.path.exists(f"{self.fichier}.{n}"):
+                os.replace(f"{self.fichier}.{n}", f"{self.fichier}.{n + 1}")
+        if self.sauvegardes:
+            os.replace(self.fichier, f"{self.fichier}.1")
+        else:
+            os.remove(self.fichier)
+
+    @contextlib.contextmanager
+    def _verrou_fichier(self):
+        os.makedirs(os.path.dirname(self.fichier) or '.', exist_ok=True)
+        with open(self.fichier + '.verrou', 'a') as verrou:
+            fcntl.flock(verrou, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(verrou, fcntl.LOCK_UN)
+
+    # ----- Classement des empreintes -----
+    def _instantane(self):
+        with self._lock:
+            return [dict(stats, routes=dict(stats['routes'])) for stats in self._empreintes.values()]
+
+    def enregistrer(self):
+        # Instantané pour les autres processus (écrit par EcritureInstantanes)
+        if self.dossier:
+            ecrire_instantane(self.dossier, self._instantane())
+
+    def nettoyer(self):
+        if self.dossier:
+            nettoyer_instantanes(self.dossier, lambda instantanes: list(cumuler(instantanes).values()))
+
+    def top(self, tri='total_ms', limite=20):
+        """Empreintes de tous les processus, classées par ``tri`` décroissant."""
+        instantanes = [self._instantane()]
+        if self.dossier:
+            instantanes.extend(lire_instantanes(self.dossier, exclure_courant=True))
+
+        cumul = cumuler(instantanes)
+        for stats in cumul.values():
+            stats['moyenne_ms'] = round(stats['total_ms'] / stats['nombre'], 3) if stats['nombre'] else 0
+            stats['total_ms'] = round(stats['total_ms'], 3)
+            stats['max_ms'] = round(stats['max_ms'], 3)
+        return sorted(cumul.values(), key=lambda s: s[tri], reverse=True)[:limite]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'empreintes': len(self._empreintes),
+                'seuil_ms': round(self.seuil * 1000, 3),
+                'ignorees': self._ignorees,
+                'perdues': self._perdues,
+                'en_attente': self._file.qsize(),
+            }
+
+
+def cumuler(instantanes):
+    # {empreinte: statistiques} additionnées sur plusieurs instantanés
+    cumul = {}
+    for instantane in instantanes:
+        for stats in instantane:
+            total = cumul.get(stats['empreinte'])
+            if total is None:
+                cumul[stats['empreinte']] = dict(stats, routes=dict(stats['routes']))
+                continue
+            for cle in ('nombre', 'total_ms', 'lignes', 'lentes'):
+                total[cle] += stats[cle]
+            total['max_ms'] = max(total['max_ms'], stats['max_ms'])
+            routes = collections.Counter(total['routes'])
+            routes.update(stats['routes'])
+            total['routes'] = dict(routes)
+    return cumul
+
+
+def _abreger(params, longueur=200):
+    if params is None:
+        return None
+    texte = repr(tuple(params) if isinstance(params, list) else params)
+    return texte if len(texte) <= longueur else texte[:longueur] + '...'
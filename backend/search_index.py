@@ -0,0 +1,96 @@
+"""Index de recherche par trigrammes pour les noms de plats et de clients.
+
+Insensible à la casse et aux accents, tolérant aux fautes de frappe :
+un texte est candidat s'il contient la moitié au moins des trigrammes du
+terme recherché. Les résultats sont classés par pertinence.
+"""
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+# Part minimale des trigrammes du terme présents dans le texte
+SEUIL_TRIGRAMMES = 0.5
+
+
+def normaliser(texte):
+    # Minuscules sans accents, pour reproduire la collation utf8mb4_general_ci
+    texte = unicodedata.normalize('NFKD', str(texte).casefold())
+    return ''.join(c for c in texte if not unicodedata.combining(c))
+
+
+def trigrammes(texte_normalise):
+    # Trigrammes de chaque mot, complété par deux espaces devant et un derrière
+    resultat = set()
+    for mot in texte_normalise.split():
+        mot = f"  {mot} "
+        resultat.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return resultat
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._textes = {}
+        self._trigrammes = {}
+        self._postings = defaultdict(set)
+
+    def __len__(self):
+        return len(self._textes)
+
+    def add(self, cle, texte):
+        texte = normaliser(texte)
+        tris = trigrammes(texte)
+        with self._lock:
+            self._retirer(cle)
+            self._textes[cle] = texte
+            self._trigrammes[cle] = tris
+            for tri in tris:
+                self._postings[tri].add(cle)
+
+    def remove(self, cle):
+        with self._lock:
+            self._retirer(cle)
+
+    def _retirer(self, cle):
+        for tri in self._trigrammes.pop(cle, ()):
+            postings = self._postings[tri]
+            postings.discard(cle)
+            if not postings:
+                del self._postings[tri]
+        self._textes.pop(cle, None)
+
+    def search(self, terme, limite=None):
+        """Liste de (clé, score) triée par pertinence décroissante."""
+        terme = ' '.join(normaliser(terme).split())
+        if not terme:
+            return []
+
+        with self._lock:
+            if len(terme) < 3:
+                # Terme trop court pour les trigrammes : préfixes et sous-chaînes
+                candidats = {cle: 0.0 for cle, texte in self._textes.items() if terme in texte}
+            else:
+                tris = trigrammes(terme)
+                communs = Counter()
+                for tri in tris:
+                    communs.update(self._postings.get(tri, ()))
+                candidats = {
+                    cle: n / len(tris) for cle, n in communs.items()
+                    if n / len(tris) >= SEUIL_TRIGRAMMES or terme in self._textes[cle]
+                }
+
+            resultats = []
+            for cle, score in candidats.items():
+                texte = self._textes[cle]
+                if texte.startswith(terme):
+                    score += 1.5
+                elif any(mot.startswith(terme) for mot in texte.split()):
+                    score += 1.0
+                elif terme in texte:
+                    score += 0.5
+                resultats.append((cle, score, texte))
+
+        resultats.sort(key=lambda r: (-r[1], len(r[2]), r[2]))
+        if limite is not None:
+            resultats = resultats[:limite]
+        return [(cle, round(score, 3)) for cle, score, _ in resultats]
@@ -0,0 +1,137 @@
+"""Base MySQL simulée pour les tests des routes.
+
+``mysql.connector.connect`` est remplacé par une connexion dont chaque requête
+est enregistrée dans ``base.requetes`` puis confiée à ``base.repondre(sql,
+params)``, qui renvoie les lignes (liste de dict), un nombre de lignes
+modifiées (int) ou (lastrowid, lignes). Le SQL reçu a ses blancs normalisés.
+Comme avec mysql-connector, fermer un curseur non bufferisé dont le résultat
+n'a pas été lu entièrement lève ``InternalError``.
+"""
+import os
+import sys
+
+import mysql.connector
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+class FauxCurseur:
+    def __init__(self, base, dictionary=False, buffered=True, **kwargs):
+        self.base = base
+        self.dictionary = dictionary
+        self.buffered = buffered
+        self.lignes = []
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, sql, params=None, **kwargs):
+        sql = ' '.join(sql.split())
+        self.base.requetes.append((sql, params))
+        resultat = self.base.repondre(sql, params)
+        if isinstance(resultat, tuple):
+            self.lastrowid, resultat = resultat
+        if isinstance(resultat, int):
+            self.lignes = []
+            self.rowcount = resultat
+        else:
+            resultat = resultat or []
+            self.lignes = [dict(l) if self.dictionary else tuple(l.values()) for l in resultat]
+            self.rowcount = len(self.lignes)
+
+    def executemany(self, sql, seq_params, **kwargs):
+        for params in seq_params:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self.lignes.pop(0) if self.lignes else None
+
+    def fetchall(self):
+        lignes, self.lignes = self.lignes, []
+        return lignes
+
+    def fetchmany(self, size=1):
+        lignes, self.lignes = self.lignes[:size], self.lignes[size:]
+        return lignes
+
+    def __iter__(self):
+        while self.lignes:
+            yield self.lignes.pop(0)
+
+    def close(self):
+        if not self.buffered and self.lignes:
+            raise mysql.connector.errors.InternalError('Unread result found')
+
+
+class FausseConnexion:
+    in_transaction = False
+
+    def __init__(self, base):
+        self.base = base
+
+    def cursor(self, **kwargs):
+        return FauxCurseur(self.base, **kwargs)
+
+    def commit(self):
+        self.base.requetes.append(('COMMIT', None))
+
+    def rollback(self):
+        self.base.requetes.append(('ROLLBACK', None))
+
+    def start_transaction(self, **kwargs):
+        pass
+
+    def ping(self, reconnect=False, **kwargs):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class Base:
+    def __init__(self):
+        self.requetes = []
+        self.repondre = lambda sql, params: []
+
+    def compter(self, debut):
+        """Requêtes SQL exécutées depuis ``debut`` (COMMIT et ROLLBACK exclus)."""
+        return [sql for sql, _ in self.requetes[debut:] if sql not in ('COMMIT', 'ROLLBACK')]
+
+
+@pytest.fixture
+def base(monkeypatch):
+    base = Base()
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **kwargs: FausseConnexion(base))
+    return base
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'config(**valeurs): configuration passée à create_app()')
+
+
+@pytest.fixture
+def flask_app(base, tmp_path, request):
+    config = {
+        'TESTING': True,
+        'FACTURES_DIR': str(tmp_path / 'factures'),
+        'METRICS_DIR': '',
+        'SLOW_QUERY_LOG': '',
+        'DB_POOL_PRE_PING': False,
+    }
+    marqueur = request.node.get_closest_marker('config')
+    if marqueur:
+        config.update(marqueur.kwargs)
+    flask_app = app_module.create_app(config)
+    yield flask_app
+    # Pool, threads et processus du module libérés entre deux tests
+    app_module.arreter()
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
@@ -0,0 +1,44 @@
+import archive_factures
+from archive_factures import ArchiveFactures
+
+PDF = b'%PDF-' + b'x' * 995
+
+
+def horloge(monkeypatch, debut=1000000):
+    maintenant = [debut]
+    monkeypatch.setattr(archive_factures.time, 'time', lambda: maintenant[0])
+    return maintenant
+
+
+def test_eviction_par_age(tmp_path, monkeypatch):
+    maintenant = horloge(monkeypatch)
+    archive = ArchiveFactures(str(tmp_path), max_age=3600)
+    for idcom in ('C1', 'C2', 'C3'):
+        archive.put(idcom, None, PDF)
+        maintenant[0] += 1800
+
+    assert archive.compacter()[:2] == (2, 1)
+    assert archive.lire('C1') is None
+    assert archive.lire('C2') == PDF and archive.lire('C3') == PDF
+
+
+def test_eviction_des_plus_anciennes_au_dela_de_la_taille(tmp_path, monkeypatch):
+    maintenant = horloge(monkeypatch)
+    archive = ArchiveFactures(str(tmp_path), max_bytes=4 * 1100)
+    for i in range(6):
+        archive.put(f'C{i}', None, PDF)
+        maintenant[0] += 1
+
+    # Les ajouts au-delà de la limite compactent l'archive, les plus anciennes partent
+    stats = archive.stats()
+    assert stats['taille'] <= archive.max_bytes and stats['evictions'] > 0
+    assert archive.lire('C0') is None
+    assert archive.lire('C5') == PDF
+
+
+def test_sans_limite_rien_n_est_evince(tmp_path):
+    archive = ArchiveFactures(str(tmp_path))
+    archive.put('C1', None, PDF)
+    archive.put('C1', None, PDF + b'v2')
+    assert archive.compacter()[:2] == (1, 0)
+    assert archive.lire('C1') == PDF + b'v2'
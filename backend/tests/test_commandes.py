@@ -0,0 +1,127 @@
+import datetime
+
+import app as app_module
+
+
+def commandes(n):
+    return [{
+        'idcom': f'C{i}', 'nomcli': 'Monja', 'typecom': 'à emporter', 'idtable': None,
+        'datecom': datetime.date(2025, 5, 1), 'montant_total': 2500, 'statut': 'payé',
+        'table_designation': None,
+    } for i in range(n)]
+
+
+def repondre_commandes(n):
+    lignes = commandes(n)
+
+    def repondre(sql, params):
+        if sql.startswith('SELECT entity, version FROM data_version'):
+            return [{'entity': e, 'version': 1} for e in ('commandes', 'tables', 'menu')]
+        if sql.startswith('SELECT c.*, t.designation as table_designation'):
+            return lignes
+        if 'FROM commande_plats cp' in sql:
+            return [{'idcom': idcom, 'idplat': 'P1', 'nomplat': 'Jus naturel', 'quantite': 1,
+                     'prix_unitaire': 2500} for idcom in params]
+        return []
+    return repondre
+
+
+def requetes_liste(client, base, n, url='/commandes'):
+    base.repondre = repondre_commandes(n)
+    debut = len(base.requetes)
+    reponse = client.get(url)
+    assert reponse.status_code == 200
+    return reponse.get_json(), base.compter(debut)
+
+
+def test_nombre_de_requetes_independant_du_nombre_de_commandes(client, base, monkeypatch):
+    # Versions relues à chaque requête : les deux appels font le même travail
+    monkeypatch.setattr(app_module.data_versions, 'check_interval', 0)
+
+    une, requetes_une = requetes_liste(client, base, 1)
+    plusieurs, requetes_plusieurs = requetes_liste(client, base, app_module.ORDER_LINES_CHUNK)
+
+    assert len(une) == 1
+    assert len(plusieurs) == app_module.ORDER_LINES_CHUNK
+    assert all(c['plats'] == [{'idplat': 'P1', 'nomplat': 'Jus naturel', 'quantite': 1, 'prix_unitaire': 2500}]
+               for c in plusieurs)
+    assert len(requetes_une) == len(requetes_plusieurs)
+
+
+def test_plats_charges_par_lots(client, base, monkeypatch):
+    # Au-delà de ORDER_LINES_CHUNK commandes : une requête de plats par lot, pas par commande
+    monkeypatch.setattr(app_module, 'ORDER_LINES_CHUNK', 10)
+    _, requetes = requetes_liste(client, base, 25)
+    assert sum(1 for sql in requetes if 'FROM commande_plats cp' in sql) == 3
+
+
+def test_page_de_commandes(client, base, monkeypatch):
+    monkeypatch.setattr(app_module.data_versions, 'check_interval', 0)
+    _, requetes_une = requetes_liste(client, base, 1, '/commandes?limit=50')
+    page, requetes_page = requetes_liste(client, base, 51, '/commandes?limit=50')
+    assert len(page['commandes']) == 50 and page['next_cursor']
+    assert len(requetes_une) == len(requetes_page)
+
+
+def repondre_menu(menus):
+    # Chaque relecture de la table menu change de version et renvoie le menu suivant
+    lectures = iter(menus)
+    etat = {'version': 0, 'menu': []}
+
+    def repondre(sql, params):
+        if sql == "SELECT version FROM data_version WHERE entity = 'menu'":
+            etat['version'] += 1
+            return [{'version': etat['version']}]
+        if sql == 'SELECT * FROM menu':
+            etat['menu'] = next(lectures, etat['menu'])
+            return etat['menu']
+        if sql.startswith('UPDATE data_version'):
+            return 1
+        return []
+    return repondre
+
+
+JUS = {'idplat': 'P1', 'nomplat': 'Jus naturel', 'pu': 2500}
+COMMANDE = {'idcom': 'C1', 'nomcli': 'Monja', 'typecom': 'à emporter',
+            'plats': [{'idplat': 'P1', 'quantite': 2}]}
+
+
+def test_creation_plat_retire_du_menu_entre_deux_lectures(client, base, monkeypatch):
+    # Plat supprimé par un autre processus pendant la requête : prix et nom viennent
+    # de la même lecture du cache, la commande est créée avec le plat lu
+    monkeypatch.setattr(app_module.menu_cache, 'check_interval', 0)
+    app_module.menu_cache.invalidate()
+    base.repondre = repondre_menu([[JUS], []])
+
+    reponse = client.post('/commandes', json=COMMANDE)
+
+    assert reponse.status_code == 201
+    insertion = next(params for sql, params in base.requetes if sql.startswith('INSERT INTO commande_plats'))
+    assert insertion == ('C1', 'P1', 2, 2500)
+
+
+def test_creation_plat_inconnu(client, base):
+    app_module.menu_cache.invalidate()
+    base.repondre = repondre_menu([[]])
+    reponse = client.post('/commandes', json=COMMANDE)
+    assert reponse.status_code == 404
+    assert not any(sql.startswith('INSERT') for sql, _ in base.requetes)
+
+
+def test_flux_memes_lignes_que_la_liste(client, base):
+    # Lignes jointes au menu comme attach_plats (JOIN) ; commande gardée sans ses lignes
+    def repondre(sql, params):
+        if sql.startswith('SELECT entity, version FROM data_version'):
+            return [{'entity': e, 'version': 1} for e in ('commandes', 'tables', 'menu')]
+        if sql.startswith('SELECT c.*'):
+            return [dict(commande, ligne_idplat=None, ligne_nomplat=None, ligne_quantite=None,
+                         ligne_prix_unitaire=None) for commande in commandes(2)]
+        return []
+    base.repondre = repondre
+
+    reponse = client.get('/commandes?stream=true')
+
+    assert [c['plats'] for c in reponse.get_json()] == [[], []]
+    sql = next(sql for sql, _ in base.requetes if sql.startswith('SELECT c.*'))
+    assert 'LEFT JOIN (commande_plats cp JOIN menu m ON cp.idplat = m.idplat) ON cp.idcom = c.idcom' in sql
+    assert 'LEFT JOIN menu' not in sql
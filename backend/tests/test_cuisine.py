@@ -0,0 +1,43 @@
+import datetime
+
+import mysql.connector
+
+from cuisine import FileCuisine
+
+JOUR = datetime.date(2025, 5, 1)
+
+
+def commande(idcom, typecom, heure):
+    return {
+        'idcom': idcom, 'nomcli': 'Monja', 'typecom': typecom, 'idtable': None,
+        'datecom': JOUR, 'creee_le': datetime.datetime.combine(JOUR, heure), 'statut': 'en attente',
+    }
+
+
+def ordre(file):
+    return [c['idcom'] for c in file.depuis(None)['commandes']]
+
+
+def test_ordre_d_arrivee_le_meme_jour():
+    # C2 (à emporter) arrive avant C1 (sur place) le même jour : la cuisine la prépare d'abord
+    file = FileCuisine()
+    file._commandes, file._version = {}, 0
+    file.ajouter(dict(commande('C2', 'à emporter', datetime.time(12, 0)), plats=[]), 1)
+    file.ajouter(dict(commande('C1', 'sur place', datetime.time(12, 5)), plats=[]), 2)
+    assert ordre(file) == ['C2', 'C1']
+
+
+def test_ordre_d_arrivee_apres_chargement(base):
+    def repondre(sql, params):
+        if sql.startswith('SELECT version FROM data_version'):
+            return [{'version': 1}]
+        if sql.startswith('SELECT idcom, nomcli'):
+            return [commande('C1', 'sur place', datetime.time(12, 5)),
+                    commande('C2', 'à emporter', datetime.time(12, 0))]
+        return []
+    base.repondre = repondre
+
+    file = FileCuisine()
+    file.synchroniser(mysql.connector.connect)
+    assert ordre(file) == ['C2', 'C1']
+    assert file.depuis(None)['commandes'][0]['creee_le'] == '2025-05-01T12:00:00'
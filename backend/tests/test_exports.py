@@ -0,0 +1,78 @@
+import datetime
+import decimal
+import json
+
+import pytest
+
+import app as app_module
+
+
+def lignes_commandes(n):
+    return [{
+        'idcom': f'C{i}', 'nomcli': 'Monja', 'typecom': 'à emporter', 'idtable': None,
+        'datecom': datetime.date(2025, 5, 1), 'montant_total': 2500, 'statut': 'payé',
+        'table_designation': None, 'ligne_idplat': 'P1', 'ligne_nomplat': 'Jus naturel',
+        'ligne_quantite': 1, 'ligne_prix_unitaire': 2500,
+    } for i in range(n)]
+
+
+def lignes_grand_livre(n):
+    return [{
+        'idcom': f'C{i}', 'datecom': datetime.datetime(2025, 5, 1, 12, 30), 'nomcli': 'Monja',
+        'typecom': 'à emporter', 'idplat': 'P1', 'nomplat': 'Jus naturel', 'quantite': 1,
+        'prix_unitaire': 2500, 'total': decimal.Decimal('2500'),
+    } for i in range(n)]
+
+
+def repondre(sql, params):
+    if sql.startswith('SELECT c.*, t.designation as table_designation, cp.idplat'):
+        return lignes_commandes(5)
+    if sql.startswith('SELECT c.idcom, c.datecom'):
+        return lignes_grand_livre(5)
+    return []
+
+
+EXPORTS = ['/commandes?stream=true', '/comptabilite/grand-livre?format=ndjson']
+
+
+@pytest.mark.parametrize('url', EXPORTS)
+def test_export_complet_rend_la_connexion(client, base, url):
+    base.repondre = repondre
+    reponse = client.get(url)
+    assert reponse.status_code == 200
+    reponse.get_data()
+    reponse.close()
+    stats = app_module.get_db_pool().stats()
+    assert (stats['in_use'], stats['idle'], stats['discarded']) == (0, 1, 0)
+
+
+@pytest.mark.parametrize('url', EXPORTS)
+def test_client_deconnecte_en_cours_d_export(client, base, monkeypatch, url):
+    # Résultat non lu à la fermeture : la connexion est fermée, pas rendue au pool
+    monkeypatch.setattr(app_module, 'STREAM_FETCH_SIZE', 1)
+    base.repondre = repondre
+    reponse = client.get(url, buffered=False)
+    next(iter(reponse.response))
+    # La vue a rendu la main : la connexion reste au flux tant qu'il est ouvert
+    assert app_module.get_db_pool().stats()['in_use'] == 1
+    reponse.close()
+
+    stats = app_module.get_db_pool().stats()
+    assert (stats['in_use'], stats['idle'], stats['discarded']) == (0, 0, 1)
+
+
+@pytest.mark.parametrize('url', EXPORTS)
+def test_client_parti_avant_la_premiere_lecture(client, base, url):
+    base.repondre = repondre
+    reponse = client.get(url, buffered=False)
+    reponse.close()
+    assert app_module.get_db_pool().stats()['in_use'] == 0
+
+
+def test_grand_livre_ndjson_dates_iso(client, base):
+    base.repondre = repondre
+    reponse = client.get('/comptabilite/grand-livre?format=ndjson')
+    ligne = json.loads(reponse.get_data(as_text=True).splitlines()[0])
+    reponse.close()
+    assert ligne['datecom'] == '2025-05-01T12:30:00'
+    assert ligne['total'] == '2500'
@@ -0,0 +1,100 @@
+import datetime
+import threading
+
+import app as app_module
+from factures import FactureWorker
+
+COMMANDE = {'idcom': 'C1', 'nomcli': 'Monja', 'typecom': 'sur place', 'idtable': 'T1',
+            'datecom': datetime.datetime(2025, 5, 1, 12, 30), 'montant_total': 5000,
+            'statut': 'en attente', 'designation': 'Table 1'}
+PLATS = [{'nomplat': 'Jus naturel', 'prix_unitaire': 2500, 'quantite': 2}]
+
+
+def test_facture_en_file_non_dupliquee():
+    # Même empreinte soumise pendant le rendu : un seul travail
+    libere = threading.Event()
+    ecrites = []
+
+    def ecrire(idcom, empreinte, contenu):
+        libere.wait(5)
+        ecrites.append(idcom)
+        return f"facture_{idcom}.pdf"
+
+    worker = FactureWorker(ecrire, workers=1)
+    try:
+        premier = worker.submit(COMMANDE, PLATS, 'e1')
+        assert worker.submit(COMMANDE, PLATS, 'e1') == premier
+        libere.set()
+        job = worker.job(premier)
+        assert worker.wait(job, 5)
+    finally:
+        worker.shutdown()
+
+    assert job['statut'] == 'terminé' and job['filename'] == 'facture_C1.pdf'
+    assert ecrites == ['C1']
+    assert worker.stats()['terminees'] == 1 and worker.stats()['en_attente'] == 0
+
+
+def test_erreur_de_rendu():
+    def ecrire(idcom, empreinte, contenu):
+        raise OSError('disque plein')
+
+    worker = FactureWorker(ecrire, workers=1)
+    try:
+        job = worker.job(worker.submit(COMMANDE, PLATS, 'e1'))
+        assert worker.wait(job, 5)
+    finally:
+        worker.shutdown()
+
+    assert job['statut'] == 'erreur' and job['erreur'] == 'disque plein'
+    assert worker.stats()['erreurs'] == 1
+    assert 'termine' not in FactureWorker.public(job)
+
+
+def repondre_facture(commande):
+    def repondre(sql, params):
+        if sql.startswith('SELECT c.*, t.designation'):
+            return [dict(commande)]
+        if sql.startswith('SELECT m.nomplat, cp.prix_unitaire'):
+            return PLATS
+        if sql.startswith("UPDATE commande SET statut = 'payé'"):
+            commande['statut'] = 'payé'
+            return 1
+        if sql.startswith('UPDATE') or sql.startswith('INSERT INTO data_version'):
+            return 1
+        return []
+    return repondre
+
+
+def test_paiement_puis_rendu_en_arriere_plan(client, base):
+    commande = dict(COMMANDE)
+    base.repondre = repondre_facture(commande)
+
+    reponse = client.get('/facture/C1')
+
+    # Statut validé et table libérée avant la réponse, rendu confié au pool
+    assert reponse.status_code == 202
+    corps = reponse.get_json()
+    assert corps['statut'] == 'en attente' and corps['total'] == 5000
+    sql = [s for s, _ in base.requetes]
+    assert sql.index("UPDATE commande SET statut = 'payé' WHERE idcom = %s") < sql.index('COMMIT')
+    assert any(s.startswith('UPDATE restaurant_tables SET occupation = FALSE') for s in sql)
+
+    job = app_module.facture_worker.job(corps['job_id'])
+    assert app_module.facture_worker.wait(job, 10)
+    assert client.get(f"/factures/jobs/{corps['job_id']}").get_json()['statut'] == 'terminé'
+
+    # Réimpression : servie depuis l'archive, sans nouvelle écriture
+    debut = len(base.requetes)
+    reponse = client.get('/facture/C1')
+    assert reponse.status_code == 200 and reponse.get_json()['statut'] == 'terminé'
+    assert not any(s.startswith('UPDATE') for s in base.compter(debut))
+
+    telechargement = client.get('/facture/C1/download')
+    assert telechargement.status_code == 200
+    assert telechargement.mimetype == 'application/pdf'
+    assert telechargement.get_data().startswith(b'%PDF')
+
+
+def test_travail_inconnu(client):
+    assert client.get('/factures/jobs/inconnu').status_code == 404
@@ -0,0 +1,148 @@
+import io
+import json
+
+import mysql.connector
+import pytest
+
+from imports import LigneInvalide, lire_lignes, regrouper_commandes
+
+
+def lire(texte, format):
+    return list(lire_lignes(io.BytesIO(texte.encode('utf-8')), format))
+
+
+def test_lecture_csv():
+    lignes = lire("idplat,nomplat,pu\nP1,Jus naturel,2500\nP2,,\nP3,Thé,500,en trop\n", 'csv')
+    assert lignes[0] == (2, {'idplat': 'P1', 'nomplat': 'Jus naturel', 'pu': '2500'})
+    assert lignes[1] == (3, {'idplat': 'P2'})
+    assert lignes[2][0] == 4 and isinstance(lignes[2][1], LigneInvalide)
+
+
+def test_lecture_ndjson():
+    lignes = lire('{"idplat": "P1"}\n\n{idplat}\n[1]\n', 'ndjson')
+    assert lignes[0] == (1, {'idplat': 'P1'})
+    assert [numero for numero, _ in lignes[1:]] == [3, 4]
+    assert all(isinstance(ligne, LigneInvalide) for _, ligne in lignes[1:])
+
+
+def test_commandes_csv_regroupees():
+    lignes = lire("idcom,nomcli,typecom,idplat,quantite\n"
+                  "C1,Monja,à emporter,P1,2\nC1,Monja,à emporter,P2,1\nC2,Rabe,à emporter,P1,1\n", 'csv')
+    commandes = list(regrouper_commandes(lignes))
+    assert [(numero, c['idcom'], [p['idplat'] for p in c['plats']]) for numero, c in commandes] == [
+        (2, 'C1', ['P1', 'P2']), (4, 'C2', ['P1'])]
+
+
+def ndjson(*lignes):
+    return '\n'.join(json.dumps(ligne, ensure_ascii=False) for ligne in lignes)
+
+
+def repondre_import(existants=(), refuse=None):
+    def repondre(sql, params):
+        if sql.startswith('SELECT idplat FROM menu WHERE idplat IN'):
+            return [{'idplat': p} for p in params if p in existants]
+        if sql.startswith('INSERT INTO menu'):
+            if params[0] == refuse:
+                raise mysql.connector.errors.DataError('Data too long for column nomplat')
+            return 1
+        if sql.startswith('INSERT INTO data_version'):
+            return 1
+        return []
+    return repondre
+
+
+@pytest.mark.config(IMPORT_BATCH_SIZE=2)
+def test_import_par_lots_avec_erreurs(client, base):
+    base.repondre = repondre_import(existants={'P0'})
+    corps = ndjson({'idplat': 'P0', 'nomplat': 'Déjà là', 'pu': 1000},
+                   {'idplat': 'P1', 'nomplat': 'Jus naturel', 'pu': 2500},
+                   {'idplat': 'P2', 'nomplat': 'Sans prix'},
+                   {'idplat': 'P3', 'nomplat': 'Thé', 'pu': 'cher'},
+                   {'idplat': 'P4', 'nomplat': 'Café', 'pu': 1500},
+                   {'idplat': 'P5', 'nomplat': 'Soupe', 'pu': 3000})
+
+    rapport = client.post('/import/menu', data=corps, content_type='application/x-ndjson').get_json()
+
+    assert (rapport['enregistrements'], rapport['importees'], rapport['lots']) == (6, 3, 2)
+    assert [e['ligne'] for e in rapport['erreurs']] == [1, 3, 4]
+    # Une transaction par lot, version du menu incrémentée dans chacune
+    sql = [s for s, _ in base.requetes]
+    assert sql.count('COMMIT') == 2
+    assert sum(s.startswith('INSERT INTO data_version') for s in sql) == 2
+
+
+def test_lot_refuse_repris_ligne_par_ligne(client, base):
+    base.repondre = repondre_import(refuse='P2')
+    corps = "idplat,nomplat,pu\nP1,Jus naturel,2500\nP2,Nom trop long,1000\nP3,Thé,500\n"
+
+    rapport = client.post('/import/menu', data=corps, content_type='text/csv').get_json()
+
+    assert rapport['importees'] == 2
+    assert rapport['erreurs'] == [{'ligne': 3, 'error': 'Data too long for column nomplat'}]
+    sql = [s for s, _ in base.requetes]
+    assert sql.count('SAVEPOINT ligne_import') == 3
+    assert sql.count('ROLLBACK TO SAVEPOINT ligne_import') == 1
+
+
+def test_import_commandes_controles(client, base):
+    def repondre(sql, params):
+        if sql == 'SELECT idplat, pu FROM menu':
+            return [{'idplat': 'P1', 'pu': 2500}]
+        if sql == 'SELECT idtable FROM restaurant_tables':
+            return [{'idtable': 'T1'}]
+        if sql.startswith('INSERT') or sql.startswith('UPDATE'):
+            return 1
+        return []
+    base.repondre = repondre
+    corps = ndjson(
+        {'idcom': 'C1', 'nomcli': 'Monja', 'typecom': 'sur place', 'idtable': 'T1', 'statut': 'payé',
+         'datecom': '2024-03-01T12:00:00', 'plats': [{'idplat': 'P1', 'quantite': 2}]},
+        {'idcom': 'C2', 'nomcli': 'Monja', 'typecom': 'sur place', 'plats': []},
+        {'idcom': 'C3', 'nomcli': 'Monja', 'typecom': 'à emporter', 'plats': [{'idplat': 'P9'}]})
+
+    rapport = client.post('/import/commandes', data=corps).get_json()
+
+    assert rapport['importees'] == 1
+    assert rapport['erreurs'] == [{'ligne': 2, 'error': 'Table requise pour commande sur place'},
+                                  {'ligne': 3, 'error': 'Plat P9 introuvable'}]
+    commande = next(p for s, p in base.requetes if s.startswith('INSERT INTO commande ('))
+    assert commande[0] == 'C1' and commande[5:] == ('payé', 5000)
+    # Une commande importée n'occupe pas sa table
+    assert not any(s.startswith('UPDATE restaurant_tables') for s, _ in base.requetes)
+
+
+@pytest.mark.parametrize('commande, message', [
+    ({'plats': 5}, 'plats doit être une liste'),
+    ({'typecom': ['à emporter']}, "typecom invalide : ['à emporter']"),
+    ({'statut': 3}, 'statut invalide : 3'),
+    ({'plats': [{'idplat': 'P1', 'quantite': 2.7}]}, 'quantite invalide : 2.7'),
+    ({'plats': [{'idplat': 'P1', 'quantite': '2.7'}]}, "quantite invalide : '2.7'"),
+])
+def test_import_commandes_types_invalides(client, base, commande, message):
+    # Ligne refusée et signalée, sans interrompre l'import des suivantes
+    base.repondre = lambda sql, params: (
+        [{'idplat': 'P1', 'pu': 2500}] if sql == 'SELECT idplat, pu FROM menu' else
+        1 if sql.startswith('INSERT') else [])
+    valide = {'idcom': 'C1', 'nomcli': 'Monja', 'typecom': 'à emporter', 'plats': [{'idplat': 'P1'}]}
+    corps = ndjson(dict(valide, idcom='C0', **commande), valide)
+
+    reponse = client.post('/import/commandes', data=corps)
+
+    assert reponse.status_code == 200
+    rapport = reponse.get_json()
+    assert rapport['importees'] == 1
+    assert rapport['erreurs'] == [{'ligne': 1, 'error': message}]
+
+
+def test_quantite_entiere_en_flottant(client, base):
+    base.repondre = lambda sql, params: (
+        [{'idplat': 'P1', 'pu': 2500}] if sql == 'SELECT idplat, pu FROM menu' else
+        1 if sql.startswith('INSERT') else [])
+    corps = ndjson({'idcom': 'C1', 'nomcli': 'Monja', 'typecom': 'à emporter',
+                    'plats': [{'idplat': 'P1', 'quantite': 2.0}]})
+    assert client.post('/import/commandes', data=corps).get_json()['importees'] == 1
+    assert ('C1', 'P1', 2, 2500) in [p for s, p in base.requetes if s.startswith('INSERT INTO commande_plats')]
+
+
+def test_entite_inconnue(client):
+    assert client.post('/import/clients', data='').status_code == 404
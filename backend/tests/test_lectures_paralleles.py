@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+
+import app as app_module
+
+# Une seule connexion : une route qui la garde en attendant ses lectures
+# parallèles ne peut jamais les obtenir
+UNE_CONNEXION = pytest.mark.config(DB_POOL_SIZE=1, DB_POOL_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.5,
+                                   FANOUT_TIMEOUT=2.0)
+
+COMMANDE = {'idcom': 'C1', 'nomcli': 'Monja', 'typecom': 'à emporter', 'idtable': None,
+            'datecom': datetime.date(2025, 5, 1), 'montant_total': 2500, 'statut': 'payé',
+            'designation': None}
+
+
+def repondre(sql, params):
+    if sql.startswith('SELECT entity, version FROM data_version'):
+        return [{'entity': e, 'version': 1} for e in ('commandes', 'menu')]
+    if sql.startswith('SELECT SUM(v.montant) as total'):
+        return [{'total': 2500}]
+    if sql.startswith('SELECT c.*, t.designation'):
+        return [COMMANDE]
+    if sql.startswith('SELECT m.nomplat, cp.prix_unitaire'):
+        return [{'nomplat': 'Jus naturel', 'prix_unitaire': 2500, 'quantite': 1}]
+    return []
+
+
+@UNE_CONNEXION
+def test_stats_sans_epuiser_le_pool(client, base):
+    base.repondre = repondre
+    reponse = client.get('/stats/recettes')
+    assert reponse.status_code == 200
+    assert 'erreurs' not in reponse.get_json()
+
+
+@UNE_CONNEXION
+def test_facture_sans_epuiser_le_pool(client, base):
+    base.repondre = repondre
+    reponse = client.get('/facture/C1')
+    assert reponse.status_code in (200, 202)
+    assert reponse.get_json()['total'] == 2500
+
+
+@UNE_CONNEXION
+def test_lectures_limitees_a_la_taille_du_pool(flask_app):
+    assert app_module.get_lectures().workers == 1
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import app as app_module
+from metriques import ARRETES, Metriques, nettoyer_instantanes, nom_instantane
+
+MENU = '[["resto_http_requests_total", [["route", "/menu"]], %d]]'
+
+
+@pytest.fixture
+def dossier(tmp_path):
+    dossier = tmp_path / 'metriques'
+    dossier.mkdir()
+    return str(dossier)
+
+
+def ecrire(dossier, nom, valeur):
+    with open(os.path.join(dossier, nom), 'w') as f:
+        f.write(MENU % valeur)
+
+
+def pid_arrete():
+    processus = subprocess.Popen([sys.executable, '-c', ''])
+    processus.wait()
+    return processus.pid
+
+
+def test_instantanes_ecrits_hors_des_requetes(base, dossier, tmp_path, monkeypatch, request):
+    flask_app = app_module.create_app({
+        'TESTING': True, 'FACTURES_DIR': str(tmp_path / 'factures'), 'SLOW_QUERY_LOG': '',
+        'METRICS_DIR': dossier, 'METRICS_SNAPSHOT_INTERVAL': 0.05, 'DB_POOL_PRE_PING': False,
+    })
+    request.addfinalizer(app_module.arreter)
+    ecrit = threading.Event()
+    threads = []
+    enregistrer = app_module.metriques.enregistrer
+
+    def espion():
+        threads.append(threading.current_thread())
+        enregistrer()
+        ecrit.set()
+    monkeypatch.setattr(app_module.metriques, 'enregistrer', espion)
+
+    assert flask_app.test_client().get('/menu').status_code == 200
+    assert ecrit.wait(5)
+    assert threading.current_thread() not in threads
+    assert nom_instantane() in os.listdir(dossier)
+
+
+def test_processus_arretes_cumules(dossier):
+    mort = pid_arrete()
+    ecrire(dossier, f"{mort}-1.json", 3)
+    ecrire(dossier, f"{mort}-2.json", 2)
+    courant = Metriques(dossier)
+    avant = courant.exposer()
+
+    courant.nettoyer()
+
+    assert sorted(os.listdir(dossier)) == ['.verrou', ARRETES]
+    # Les compteurs ne reculent pas
+    assert 'resto_http_requests_total{route="/menu"} 5' in avant
+    assert courant.exposer() == avant
+
+
+def test_pid_reutilise(dossier):
+    # Instantané plus ancien du même pid : celui d'un processus arrêté
+    ecrire(dossier, f"{os.getpid()}-1.json", 4)
+    courant = Metriques(dossier)
+    courant.compteur('resto_http_requests_total', (('route', '/menu'),))
+    courant.enregistrer()
+
+    courant.nettoyer()
+
+    assert sorted(os.listdir(dossier)) == sorted(['.verrou', ARRETES, nom_instantane()])
+    assert 'resto_http_requests_total{route="/menu"} 5' in courant.exposer()
+    assert nettoyer_instantanes(dossier, list) == 0
@@ -0,0 +1,80 @@
+import os
+import threading
+
+import pytest
+
+import app as app_module
+from metriques import Metriques
+
+
+def test_export_sans_fork(flask_app):
+    # Processus de rendu lancés sans fork() du processus de travail multithreadé
+    executor = app_module.get_export_executor()
+    assert executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+
+
+def test_reinitialiser_ne_prend_pas_le_verrou_copie():
+    # Verrou détenu par un autre thread au moment du fork : copié verrouillé
+    metriques = Metriques()
+    metriques.compteur('resto_http_requests_total', (('route', '/menu'),))
+    metriques._lock.acquire()
+
+    fini = threading.Event()
+    threading.Thread(target=lambda: (metriques.reinitialiser(), fini.set()), daemon=True).start()
+    assert fini.wait(1.0)
+    assert metriques._instantane() == []
+
+
+def test_apres_fork_nouvelles_sessions(flask_app):
+    # Curseurs émis par le parent (ou un autre processus de travail) : resynchronisation
+    bus, cuisine = app_module.event_bus, app_module.file_cuisine
+    cuisine._commandes = {}
+    bus.publier('tables', 'table', {'idtable': 'T1'})
+    ancien_evenement = f"{bus.session}-1"
+    ancienne_file = f"{cuisine.session}-0"
+    bus._lock.acquire()
+    cuisine._lock.acquire()
+
+    app_module.apres_fork()
+
+    assert cuisine.depuis(ancienne_file)['complet'] is True
+    assert cuisine.depuis(f"{cuisine.session}-0")['complet'] is False
+    abonnement = bus.abonner(['tables'], ancien_evenement)
+    assert [e['type'] for e in abonnement.attendre(0)] == ['resync']
+
+
+@pytest.mark.config(LONG_CONNECTIONS_MAX=1)
+def test_connexions_longues_limitees(client):
+    # Place prise par un flux SSE ouvert : les autres connexions longues sont refusées
+    flux = client.get('/evenements?sujets=tables', buffered=False)
+    assert flux.status_code == 200
+    assert app_module.event_bus.stats()['abonnes'] == 1
+
+    refus = client.get('/evenements?sujets=tables')
+    assert refus.status_code == 503
+    assert refus.headers['Retry-After']
+    assert client.get('/cuisine/queue?timeout=0').status_code == 503
+
+    # Client parti avant la première lecture : place et abonnement rendus
+    flux.close()
+    assert app_module.event_bus.stats()['abonnes'] == 0
+    assert client.get('/cuisine/queue?timeout=0').status_code == 200
+    assert client.get('/cuisine/queue?timeout=0').status_code == 200
+
+
+def test_apres_fork_nouveau_verrou_archive(flask_app):
+    # Verrou copié pris et flock sur le descripteur du parent : les deux sont rouverts
+    archive = app_module.facture_archive
+    archive.put('C1', None, b'%PDF-1')
+    ancien_fd = archive._fd_verrou
+    assert ancien_fd is not None
+    archive._lock.acquire()
+
+    app_module.apres_fork()
+
+    assert archive._fd_verrou is None
+    with pytest.raises(OSError):
+        os.fstat(ancien_fd)
+    archive.put('C2', None, b'%PDF-2')
+    assert archive._fd_verrou is not None
+    assert archive.lire('C1') == b'%PDF-1'
@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+
+import app as app_module
+from ventes import GRANULARITES, nombre_periodes, serie_recettes
+
+
+class CurseurVide:
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return []
+
+
+@pytest.mark.parametrize('granularite', GRANULARITES)
+@pytest.mark.parametrize('debut, fin', [
+    (datetime.date(2024, 1, 31), datetime.date(2025, 3, 1)),
+    (datetime.date(2025, 2, 3), datetime.date(2025, 2, 9)),
+    (datetime.date(2025, 2, 9), datetime.date(2025, 2, 3)),
+])
+def test_nombre_periodes(debut, fin, granularite):
+    assert nombre_periodes(debut, fin, granularite) == len(serie_recettes(CurseurVide(), debut, fin, granularite))
+
+
+@pytest.mark.parametrize('url', ['/stats/recettes', '/stats/histogramme'])
+def test_serie_trop_longue(client, base, url):
+    reponse = client.get(url + '?date_debut=2020-01-01&date_fin=2025-01-01&granularite=jour')
+    assert reponse.status_code == 400
+    assert not any('ventes_jour' in sql for sql, _ in base.requetes)
+
+
+def test_serie_longue_par_mois(client, base):
+    reponse = client.get('/stats/histogramme?date_debut=2020-01-01&date_fin=2025-01-01')
+    assert reponse.status_code == 200
+    assert len(reponse.get_json()) == 61
+
+
+def test_serie_depuis_une_date_ancienne(client, base, monkeypatch):
+    # Sans date_fin, la série va jusqu'à aujourd'hui
+    monkeypatch.setattr(app_module, 'STATS_MAX_PERIODES', 30)
+    reponse = client.get('/stats/histogramme?date_debut=2020-01-01&granularite=semaine')
+    assert reponse.status_code == 400
+
+
+def test_serie_jusqu_a_une_date_ancienne(client, base):
+    # Seule date_fin, plus de 6 mois en arrière : la série couvre les 6 mois qui la précèdent
+    reponse = client.get('/stats/histogramme?date_fin=2024-03-15')
+    assert reponse.status_code == 200
+    assert [r['periode'] for r in reponse.get_json()] == [
+        '2023-10', '2023-11', '2023-12', '2024-01', '2024-02', '2024-03']
+
+
+@pytest.mark.parametrize('url', ['/stats/recettes', '/stats/histogramme'])
+def test_debut_apres_fin(client, base, url):
+    reponse = client.get(url + '?date_debut=2025-03-01&date_fin=2025-01-01')
+    assert reponse.status_code == 400
+    assert not any('ventes_jour' in sql for sql, _ in base.requetes)
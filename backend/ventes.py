@@ -0,0 +1,197 @@
+"""Agrégats de ventes pré-calculés (table ``ventes_jour``).
+
+Une ligne par (jour, plat, type de commande) : nombre de lignes de commande,
+quantité vendue et montant. Les routes de commandes les tiennent à jour dans
+leur transaction, les statistiques ne lisent que ces agrégats.
+"""
+import datetime
+
+GRANULARITES = ('jour', 'semaine', 'mois')
+
+# Applique (signe = 1) ou retire (signe = -1) les lignes d'une commande des agrégats
+_MAJ_VENTES = """
+    INSERT INTO ventes_jour (jour, idplat, typecom, nb_lignes, quantite, montant)
+    SELECT * FROM (
+        SELECT
+            DATE(c.datecom) as jour,
+            cp.idplat,
+            c.typecom,
+            %s * COUNT(*) as nb_lignes,
+            %s * SUM(cp.quantite) as quantite,
+            %s * SUM(cp.quantite * cp.prix_unitaire) as montant
+        FROM commande c
+        JOIN commande_plats cp ON c.idcom = cp.idcom
+        WHERE c.idcom = %s
+        GROUP BY DATE(c.datecom), cp.idplat, c.typecom
+    ) as delta
+    ON DUPLICATE KEY UPDATE
+        nb_lignes = nb_lignes + VALUES(nb_lignes),
+        quantite = quantite + VALUES(quantite),
+        montant = montant + VALUES(montant)
+"""
+
+
+# Compteur de ventes par plat (quantités), lu par /recherche/menu
+_MAJ_PLATS_VENTES = """
+    INSERT INTO plats_ventes (idplat, nb_ventes)
+    SELECT * FROM (
+        SELECT cp.idplat, %s * SUM(cp.quantite) as nb_ventes
+        FROM commande_plats cp
+        WHERE cp.idcom = %s
+        GROUP BY cp.idplat
+    ) as delta
+    ON DUPLICATE KEY UPDATE nb_ventes = nb_ventes + VALUES(nb_ventes)
+"""
+
+
+def maj_ventes(cursor, idcom, signe=1, compteurs=True):
+    # compteurs=False quand seul le type de commande change (quantités inchangées)
+    cursor.execute(_MAJ_VENTES, (signe, signe, signe, idcom))
+    if compteurs:
+        cursor.execute(_MAJ_PLATS_VENTES, (signe, idcom))
+
+
+def maj_ventes_lot(cursor, idcoms):
+    # Ajout groupé des commandes importées : une requête par table d'agrégats
+    if not idcoms:
+        return
+    placeholders = ', '.join(['%s'] * len(idcoms))
+    cursor.execute(f"""
+        INSERT INTO ventes_jour (jour, idplat, typecom, nb_lignes, quantite, montant)
+        SELECT * FROM (
+            SELECT
+                DATE(c.datecom) as jour,
+                cp.idplat,
+                c.typecom,
+                COUNT(*) as nb_lignes,
+                SUM(cp.quantite) as quantite,
+                SUM(cp.quantite * cp.prix_unitaire) as montant
+            FROM commande c
+            JOIN commande_plats cp ON c.idcom = cp.idcom
+            WHERE c.idcom IN ({placeholders})
+            GROUP BY DATE(c.datecom), cp.idplat, c.typecom
+        ) as delta
+        ON DUPLICATE KEY UPDATE
+            nb_lignes = nb_lignes + VALUES(nb_lignes),
+            quantite = quantite + VALUES(quantite),
+            montant = montant + VALUES(montant)
+    """, list(idcoms))
+    cursor.execute(f"""
+        INSERT INTO plats_ventes (idplat, nb_ventes)
+        SELECT * FROM (
+            SELECT cp.idplat, SUM(cp.quantite) as nb_ventes
+            FROM commande_plats cp
+            WHERE cp.idcom IN ({placeholders})
+            GROUP BY cp.idplat
+        ) as delta
+        ON DUPLICATE KEY UPDATE nb_ventes = nb_ventes + VALUES(nb_ventes)
+    """, list(idcoms))
+
+
+def reconstruire_ventes(cursor):
+    # Recalcule tous les agrégats depuis commande / commande_plats
+    cursor.execute("DELETE FROM ventes_jour")
+    cursor.execute("""
+        INSERT INTO ventes_jour (jour, idplat, typecom, nb_lignes, quantite, montant)
+        SELECT
+            DATE(c.datecom),
+            cp.idplat,
+            c.typecom,
+            COUNT(*),
+            SUM(cp.quantite),
+            SUM(cp.quantite * cp.prix_unitaire)
+        FROM commande c
+        JOIN commande_plats cp ON c.idcom = cp.idcom
+        GROUP BY DATE(c.datecom), cp.idplat, c.typecom
+    """)
+    lignes = cursor.rowcount
+
+    cursor.execute("DELETE FROM plats_ventes")
+    cursor.execute("""
+        INSERT INTO plats_ventes (idplat, nb_ventes)
+        SELECT idplat, SUM(quantite) FROM commande_plats GROUP BY idplat
+    """)
+    return lignes
+
+
+# ----- Périodes calendaires -----
+def ajouter_mois(jour, n):
+    mois = jour.month - 1 + n
+    return datetime.date(jour.year + mois // 12, mois % 12 + 1, 1)
+
+
+def debut_periode(jour, granularite):
+    if granularite == 'jour':
+        return jour
+    if granularite == 'semaine':
+        return jour - datetime.timedelta(days=jour.weekday())
+    return jour.replace(day=1)
+
+
+def periode_suivante(debut, granularite):
+    if granularite == 'jour':
+        return debut + datetime.timedelta(days=1)
+    if granularite == 'semaine':
+        return debut + datetime.timedelta(days=7)
+    return ajouter_mois(debut, 1)
+
+
+def cle_periode(debut, granularite):
+    if granularite == 'jour':
+        return debut.isoformat()
+    if granularite == 'semaine':
+        annee, semaine, _ = debut.isocalendar()
+        return f"{annee}-S{semaine:02d}"
+    return debut.strftime('%Y-%m')
+
+
+def libelle_periode(debut, granularite):
+    if granularite == 'jour':
+        return debut.strftime('%d/%m/%Y')
+    if granularite == 'semaine':
+        return f"Semaine du {debut.strftime('%d/%m/%Y')}"
+    return debut.strftime('%b %Y')
+
+
+def derniers_mois(n, aujourdhui=None):
+    # Les n derniers mois calendaires, mois en cours compris
+    aujourdhui = aujourdhui or datetime.date.today()
+    return ajouter_mois(aujourdhui, -(n - 1)), aujourdhui
+
+
+def nombre_periodes(debut, fin, granularite):
+    # Nombre d'entrées de serie_recettes(debut, fin, granularite), sans les construire
+    premiere = debut_periode(debut, granularite)
+    if premiere > fin:
+        return 0
+    if granularite == 'jour':
+        return (fin - premiere).days + 1
+    if granularite == 'semaine':
+        return (fin - premiere).days // 7 + 1
+    return (fin.year - premiere.year) * 12 + fin.month - premiere.month + 1
+
+
+def serie_recettes(cursor, debut, fin, granularite='mois'):
+    """Recettes de ``debut`` à ``fin`` inclus, une entrée par période (zéros compris)."""
+    cursor.execute("""
+        SELECT jour, SUM(montant) as montant
+        FROM ventes_jour
+        WHERE jour BETWEEN %s AND %s
+        GROUP BY jour
+    """, (debut, fin))
+
+    montants = {}
+    for row in cursor.fetchall():
+        periode = debut_periode(row['jour'], granularite)
+        montants[periode] = montants.get(periode, 0) + row['montant']
+
+    serie = []
+    periode = debut_periode(debut, granularite)
+    while periode <= fin:
+        serie.append({
+            'periode': cle_periode(periode, granularite),
+            'libelle': libelle_periode(periode, granularite),
+            'montant': montants.get(periode, 0)
+        })
+        periode = periode_suivante(periode, granularite)
+    return serie
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from mysql.connector import Error
+
+
+class DataVersions:
+    """Copie locale des compteurs de la table ``data_version``.
+
+    Relue au plus toutes les ``check_interval`` secondes, ou à la requête
+    suivante après ``invalidate()`` (appelé à la fin de chaque requête qui a
+    incrémenté une version).
+    """
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._versions = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+
+    def get(self, get_conn, entites):
+        versions = self._versions
+        if versions is None or time.monotonic() - self._checked_at >= self.check_interval:
+            versions = self._charger(get_conn)
+        return tuple(versions.get(entite, 0) for entite in entites)
+
+    def _charger(self, get_conn):
+        with self._lock:
+            if self._versions is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._versions
+
+            conn = get_conn()
+            if not conn:
+                raise Error('Database connection failed')
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("SELECT entity, version FROM data_version")
+                self._versions = {r['entity']: r['version'] for r in cursor.fetchall()}
+            finally:
+                cursor.close()
+            self._checked_at = time.monotonic()
+            return self._versions
@@ -0,0 +1,4 @@
+"""Point d'entrée des serveurs WSGI : gunicorn -c gunicorn.conf.py wsgi:app"""
+from app import create_app
+
+app = create_app()
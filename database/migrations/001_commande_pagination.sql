@@ -0,0 +1,5 @@
+-- Pagination par clé de GET /commandes : ORDER BY datecom DESC, idcom DESC
+USE restaurant_db;
+
+ALTER TABLE `commande`
+  ADD KEY `datecom_idcom` (`datecom`, `idcom`);
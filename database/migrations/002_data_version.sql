@@ -0,0 +1,12 @@
+-- Compteurs de version par entité, incrémentés à chaque écriture.
+-- Permettent aux processus de l'API d'invalider leurs caches en mémoire.
+USE restaurant_db;
+
+CREATE TABLE IF NOT EXISTS `data_version` (
+  `entity` varchar(30) NOT NULL,
+  `version` bigint(20) UNSIGNED NOT NULL DEFAULT 0,
+  PRIMARY KEY (`entity`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT IGNORE INTO `data_version` (`entity`, `version`) VALUES
+('menu', 0);
@@ -0,0 +1,8 @@
+-- Détection des chevauchements de réservations :
+-- WHERE idtable = ? AND date_de_reserv < ? AND date_reserve > ?
+-- L'index composite remplace l'index simple sur idtable (il sert aussi la clé étrangère).
+USE restaurant_db;
+
+ALTER TABLE `reserver`
+  ADD KEY `idtable_intervalle` (`idtable`, `date_de_reserv`, `date_reserve`),
+  DROP KEY `idtable`;
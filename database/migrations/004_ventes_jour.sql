@@ -0,0 +1,21 @@
+-- Agrégats de ventes par jour, plat et type de commande pour /stats/*.
+-- Tenus à jour par les routes de commandes ; `flask --app app rebuild-ventes` les recalcule.
+USE restaurant_db;
+
+CREATE TABLE IF NOT EXISTS `ventes_jour` (
+  `jour` date NOT NULL,
+  `idplat` varchar(10) NOT NULL,
+  `typecom` enum('sur place','à emporter') NOT NULL,
+  `nb_lignes` int(11) NOT NULL DEFAULT 0,
+  `quantite` int(11) NOT NULL DEFAULT 0,
+  `montant` decimal(14,2) NOT NULL DEFAULT 0.00,
+  PRIMARY KEY (`jour`, `idplat`, `typecom`),
+  KEY `idplat` (`idplat`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+DELETE FROM `ventes_jour`;
+INSERT INTO `ventes_jour` (`jour`, `idplat`, `typecom`, `nb_lignes`, `quantite`, `montant`)
+SELECT DATE(c.datecom), cp.idplat, c.typecom, COUNT(*), SUM(cp.quantite), SUM(cp.quantite * cp.prix_unitaire)
+FROM commande c
+JOIN commande_plats cp ON c.idcom = cp.idcom
+GROUP BY DATE(c.datecom), cp.idplat, c.typecom;
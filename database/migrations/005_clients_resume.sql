@@ -0,0 +1,37 @@
+-- Résumé par client pour /clients et /recherche/clients.
+-- Tenu à jour par les routes de commandes et de réservations ;
+-- `flask --app app rebuild-clients` le recalcule.
+USE restaurant_db;
+
+ALTER TABLE `commande`
+  ADD KEY `nomcli` (`nomcli`);
+
+ALTER TABLE `reserver`
+  ADD KEY `nomcli` (`nomcli`);
+
+CREATE TABLE IF NOT EXISTS `clients_resume` (
+  `nomcli` varchar(50) NOT NULL,
+  `nb_commandes` int(11) NOT NULL DEFAULT 0,
+  `total_depense` decimal(14,2) NOT NULL DEFAULT 0.00,
+  `derniere_visite` date DEFAULT NULL,
+  `nb_reservations` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`nomcli`),
+  KEY `derniere_visite` (`derniere_visite`),
+  KEY `total_depense` (`total_depense`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+DELETE FROM `clients_resume`;
+INSERT INTO `clients_resume` (`nomcli`, `nb_commandes`, `total_depense`, `derniere_visite`, `nb_reservations`)
+SELECT n.nomcli,
+  COALESCE(c.nb_commandes, 0),
+  COALESCE(c.total_depense, 0),
+  c.derniere_visite,
+  COALESCE(r.nb_reservations, 0)
+FROM (SELECT nomcli FROM commande UNION SELECT nomcli FROM reserver) n
+LEFT JOIN (
+  SELECT nomcli, COUNT(*) as nb_commandes, SUM(montant_total) as total_depense, MAX(datecom) as derniere_visite
+  FROM commande GROUP BY nomcli
+) c ON c.nomcli = n.nomcli
+LEFT JOIN (
+  SELECT nomcli, COUNT(*) as nb_reservations FROM reserver GROUP BY nomcli
+) r ON r.nomcli = n.nomcli;
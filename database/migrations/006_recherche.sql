@@ -0,0 +1,18 @@
+-- Index de recherche en mémoire et compteurs de ventes par plat.
+USE restaurant_db;
+
+-- Synchronisation incrémentale de l'index des noms de clients
+ALTER TABLE `clients_resume`
+  ADD COLUMN `maj_le` datetime(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+  ADD KEY `maj_le` (`maj_le`);
+
+-- Quantités vendues par plat, tenues à jour avec ventes_jour
+CREATE TABLE IF NOT EXISTS `plats_ventes` (
+  `idplat` varchar(10) NOT NULL,
+  `nb_ventes` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`idplat`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+DELETE FROM `plats_ventes`;
+INSERT INTO `plats_ventes` (`idplat`, `nb_ventes`)
+SELECT idplat, SUM(quantite) FROM commande_plats GROUP BY idplat;
@@ -0,0 +1,5 @@
+-- Chargement de la file de la cuisine : commandes en attente ou en cours
+USE restaurant_db;
+
+ALTER TABLE `commande`
+  ADD KEY `statut_datecom` (`statut`, `datecom`);
@@ -0,0 +1,8 @@
+-- Ordre d'arrivée des commandes dans la file de la cuisine : datecom n'est qu'une date.
+-- Les commandes existantes reçoivent minuit de leur date (départagées ensuite par type, table, idcom).
+USE restaurant_db;
+
+ALTER TABLE `commande`
+  ADD COLUMN `creee_le` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) AFTER `datecom`;
+
+UPDATE `commande` SET `creee_le` = `datecom`;